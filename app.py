@@ -1,19 +1,26 @@
 # -*- coding: utf-8 -*-
 """Main Flask application - Modular structure with Blueprints"""
 
-from flask import Flask
+from utils import startup  # 最先匯入，作為啟動計時起點
+
+from flask import Flask, jsonify
 import logging
+import threading
 
 from config import Config
+from utils.logging_config import setup_logging
+from utils.json_provider import ModelJSONProvider
+from utils import metrics
+from utils.readiness import ReadinessCheck
+
+startup.mark('imports')
 
 # 初始化 Flask
 app = Flask(__name__)
+app.json = ModelJSONProvider(app)
 
 # 設定日誌
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # 驗證配置
@@ -24,21 +31,81 @@ except ValueError as e:
     logger.error(f"配置驗證失敗: {e}")
     raise
 
+startup.mark('config_validation')
+
 
 # ===== 註冊 Blueprints =====
 
 from blueprints.linebot_app import linebot_bp
 from blueprints.liff_app import liff_bp
 from blueprints.api_app import api_bp
+from services.storage_backend import get_storage_backend
 
 app.register_blueprint(linebot_bp)
 app.register_blueprint(liff_bp)
 app.register_blueprint(api_bp)
 
+startup.mark('blueprints')
+
 
 @app.route("/", methods=['GET'])
 def index():
     return "LINE Bot 記帳系統運行中", 200
 
+
+readiness_check = ReadinessCheck(
+    get_storage_backend(),
+    timeout=Config.READINESS_TIMEOUT,
+    ttl=Config.READINESS_CACHE_TTL
+)
+
+
+@app.route("/ready", methods=['GET'])
+def readiness():
+    """就緒檢查：儲存後端可連線時回應 200，否則回應 503"""
+    ready, detail = readiness_check.check()
+    return jsonify({'success': ready, **detail}), 200 if ready else 503
+
+
+# ===== 效能量測 =====
+
+if Config.METRICS_ENABLED:
+    metrics.init_app(app)
+
+    @app.route("/metrics", methods=['GET'])
+    def prometheus_metrics():
+        """Prometheus 格式的請求與對外呼叫統計"""
+        return metrics.metrics_response()
+
+
+# ===== 啟動 =====
+
+def _resume_group_deletions():
+    """續刪因 process 結束而中斷的群組刪除；多個 worker 或實例同時啟動時只由取得租約的一個執行"""
+    storage = get_storage_backend()
+    try:
+        if not storage.claim_lease('resume_group_deletions', Config.GROUP_DELETE_RESUME_LEASE):
+            return
+        count = storage.resume_group_deletions()
+        if count:
+            logger.info(f"已重新排程 {count} 個中斷的群組刪除")
+    except Exception as e:
+        logger.error(f"續刪群組失敗: {e}")
+
+
+def start_background_tasks():
+    """啟動後的背景工作（gunicorn 預先載入 app 時由各 worker 在 fork 後呼叫）"""
+    if Config.STORAGE_WARMUP:
+        startup.start_warmup(get_storage_backend())
+    if Config.GROUP_DELETE_RESUME:
+        threading.Thread(target=_resume_group_deletions, name='resume-group-deletions', daemon=True).start()
+
+
+logger.info(startup.report())
+
+if not startup.background_tasks_deferred():
+    start_background_tasks()
+
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=5000, debug=Config.DEBUG)
+    # 開發用伺服器；正式環境請使用 gunicorn（設定見 gunicorn.conf.py）
+    app.run(host='0.0.0.0', port=Config.PORT, debug=Config.DEBUG)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Flex bubble 產生基準測試
+
+比較四種方式產生同一個 bubble 的每次呼叫時間與記憶體配置：
+- scratch：每次重新建立整棵 dict 樹（樣板化之前的做法，不含欄位計算）
+- template：預先編譯的樣板，只複製含變動欄位的路徑（不含欄位計算）
+- scratch_json：欄位計算 + 重新建立整棵樹 + 序列化（樣板化之前的完整流程）
+- template_json：欄位計算 + 樣板填值 + 序列化（目前 API 回應 flexBubble 的完整流程）
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.flex_benchmark --iterations 20000
+    python -m benchmarks.flex_benchmark --splits 12 --json flex.json
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import time
+import tracemalloc
+
+from utils.flex_message import _BUBBLE_TEMPLATES
+from utils.flex_template import Slot
+
+
+def build_from_scratch(node: Any, values: Dict) -> Any:
+    """重新配置整棵樹的每個節點並填入欄位（等同樣板化之前每次呼叫的配置量）"""
+    if isinstance(node, Slot):
+        return values[node.name]
+    if isinstance(node, dict):
+        return {key: build_from_scratch(value, values) for key, value in node.items()}
+    if isinstance(node, list):
+        return [build_from_scratch(item, values) for item in node]
+    return node
+
+
+def sample_cases(split_count: int) -> Dict[str, tuple]:
+    """各種 bubble 的測試輸入"""
+    expense = {
+        'amount': 1280,
+        'description': '週末燒肉',
+        'payer_name': '小明',
+        'split_type': 'equal',
+        'created_at': datetime(2025, 12, 22, 3, 52, 24),
+        'expense_number': 42,
+        'group_id': 'G0001'
+    }
+    splits = [
+        {'user_name': f'成員{i}', 'amount': 1280 / split_count}
+        for i in range(split_count)
+    ]
+    todo = {
+        'title': '訂下次聚餐餐廳',
+        'assignee_name': '小華',
+        'category': '聚餐',
+        'priority': 'high',
+        'status': 'pending',
+        'due_date': '2025-12-31',
+        'group_id': 'G0001'
+    }
+    balances = {
+        f'U{i}': {'user_name': f'成員{i}', 'net_amount': (i - split_count / 2) * 100}
+        for i in range(split_count)
+    }
+    plans = [
+        {'from_user_name': f'成員{i}', 'to_user_name': f'成員{split_count - 1 - i}', 'amount': 100 * (i + 1)}
+        for i in range(split_count // 2)
+    ]
+    return {
+        'expense_success': (expense, splits),
+        'expense_deleted': (expense,),
+        'todo_action': (todo, 'created'),
+        'settlement': (balances, plans),
+    }
+
+
+def measure(func: Callable[[], Any], iterations: int) -> Dict:
+    """量測每次呼叫的平均時間與記憶體配置"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - started
+
+    # 記憶體配置另外量測（tracemalloc 會拖慢執行速度）
+    samples = min(iterations, 1000)
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    results = [func() for _ in range(samples)]
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del results
+
+    stats = snapshot_after.compare_to(snapshot_before, 'filename')
+    allocated = sum(max(stat.size_diff, 0) for stat in stats)
+    blocks = sum(max(stat.count_diff, 0) for stat in stats)
+
+    return {
+        'us_per_call': elapsed / iterations * 1_000_000,
+        'bytes_per_call': allocated / samples,
+        'blocks_per_call': blocks / samples
+    }
+
+
+def run(iterations: int, split_count: int) -> List[Dict]:
+    """執行基準測試並回傳每種 bubble 的統計結果"""
+    results = []
+    for kind, args in sample_cases(split_count).items():
+        values_func, template = _BUBBLE_TEMPLATES[kind]
+        values = values_func(*args)
+
+        row = {'bubble': kind}
+        row['scratch'] = measure(lambda: build_from_scratch(template.skeleton, values), iterations)
+        row['template'] = measure(lambda: template.render(values), iterations)
+        row['scratch_json'] = measure(
+            lambda: json.dumps(build_from_scratch(template.skeleton, values_func(*args)),
+                               ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+            iterations
+        )
+        row['template_json'] = measure(
+            lambda: json.dumps(template.render(values_func(*args)),
+                               ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+            iterations
+        )
+        results.append(row)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flex bubble 產生基準測試')
+    parser.add_argument('--iterations', type=int, default=10000)
+    parser.add_argument('--splits', type=int, default=6, help='分帳人數 / 結算成員數')
+    parser.add_argument('--json', help='將結果輸出為 JSON 檔案')
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.splits)
+
+    header = f"{'bubble':<16} | {'mode':<13} | {'us/call':>9} | {'bytes/call':>10} | {'blocks/call':>11}"
+    print(header)
+    print('-' * len(header))
+    for row in results:
+        for mode in ('scratch', 'template', 'scratch_json', 'template_json'):
+            stats = row[mode]
+            print(f"{row['bubble']:<16} | {mode:<13} | {stats['us_per_call']:>9.2f} | "
+                  f"{stats['bytes_per_call']:>10.0f} | {stats['blocks_per_call']:>11.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
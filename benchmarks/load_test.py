@@ -0,0 +1,691 @@
+# -*- coding: utf-8 -*-
+"""API 與 Webhook 端對端壓力測試
+
+以記憶體儲存後端（STORAGE_BACKEND=memory）與本機 LINE API 模擬伺服器執行，不需網路與 Firebase 憑證。
+先產生指定規模的群組、成員、帳目與待辦事項，再依序對各路由送出請求，
+統計每個路由的 p50 / p95 / p99 延遲與每秒請求數。
+
+請求方式：
+- client：Flask test client（同一個 process 內呼叫，不經過網路）
+- wsgi：在本機啟動 werkzeug 多執行緒伺服器，以 keep-alive HTTP 連線送出請求
+- gunicorn：以 gunicorn.conf.py 的設定在子 process 啟動 gunicorn（可用 --workers、--threads 覆寫），
+  以 keep-alive HTTP 連線送出請求。測試資料在 fork 前產生，每個 worker 各自複製一份記憶體資料，
+  因此需要在同一個 process 內準備資料的 settlement_clear 不會執行
+
+路由依下列順序執行（寫入型路由會改變資料量，因此放在讀取路由之後）：
+groups_list、expenses_list、expenses_fields、settlement、settlement_304、todos_list、todo_stats、
+expense_create、todo_create、settlement_clear、callback
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.load_test --groups 20 --members 8 --expenses 500 --requests 300
+    python -m benchmarks.load_test --mode wsgi --concurrency 8 --json benchmarks/baselines/local.json
+    python -m benchmarks.load_test --mode gunicorn --workers 2 --threads 8 --concurrency 8
+    python -m benchmarks.load_test --baseline benchmarks/baselines/local.json --tolerance 0.2
+
+每個路由重複執行 --repeat 次，各項統計取中位數，降低單次執行的雜訊。
+指定 --baseline 時會與先前輸出的 JSON 比較，p95 延遲或每個請求的平均耗時（由每秒請求數換算）
+變慢超過 tolerance，且增加的時間超過 --min-delta-ms 的路由視為退步，並以結束碼 1 結束；
+次毫秒等級的路由差異多半是量測雜訊，不會只因比例變化而判定為退步。
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import base64
+import hashlib
+import hmac
+import http.client
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import signal
+import socket
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+# 專案根目錄（gunicorn.conf.py 所在位置）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 壓力測試使用的 channel secret（僅用於產生與驗證本機請求的簽章）
+BENCHMARK_CHANNEL_SECRET = 'load-test-channel-secret'
+
+ROUTES = (
+    'groups_list', 'expenses_list', 'expenses_fields', 'settlement', 'settlement_304',
+    'todos_list', 'todo_stats', 'expense_create', 'todo_create', 'settlement_clear', 'callback'
+)
+
+# 準備請求時需要直接寫入儲存後端的路由（gunicorn 模式下 worker 看不到這些資料）
+IN_PROCESS_ROUTES = ('settlement_clear',)
+
+# (method, path, body, headers)
+Request = Tuple[str, str, Optional[bytes], Dict[str, str]]
+
+
+# ===== LINE API 模擬伺服器 =====
+
+class _LineApiHandler(BaseHTTPRequestHandler):
+    """回應 LINE Messaging API 的最小模擬伺服器（支援 keep-alive）"""
+
+    protocol_version = 'HTTP/1.1'
+    # 標頭與內容分兩次寫出，避免 Nagle 演算法與 delayed ACK 造成約 40ms 的延遲
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def _respond(self, payload: Dict):
+        if self.latency:
+            time.sleep(self.latency)
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith('/v2/bot/profile/'):
+            user_id = self.path.rsplit('/', 1)[-1]
+            self._respond({'userId': user_id, 'displayName': f'成員{user_id[-4:]}'})
+        else:
+            self._respond({})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        if self.path == '/v2/bot/message/reply':
+            self._respond({'sentMessages': [{'id': uuid.uuid4().hex[:18], 'quoteToken': 'q'}]})
+        else:
+            self._respond({})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_line_stub(latency_ms: float = 0) -> ThreadingHTTPServer:
+    """在本機隨機埠啟動 LINE API 模擬伺服器"""
+    handler = type('LineApiHandler', (_LineApiHandler,), {'latency': latency_ms / 1000})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='line-api-stub', daemon=True).start()
+    return server
+
+
+def configure_environment(line_api_host: str):
+    """設定壓力測試環境（必須在匯入 app 之前呼叫）"""
+    os.environ['STORAGE_BACKEND'] = 'memory'
+    os.environ['LINE_API_HOST'] = line_api_host
+    os.environ['CHANNEL_SECRET'] = BENCHMARK_CHANNEL_SECRET
+    os.environ['CHANNEL_ACCESS_TOKEN'] = 'load-test-access-token'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+# ===== 測試資料 =====
+
+class Dataset:
+    """產生的測試資料（群組 ID 與各群組成員）"""
+
+    def __init__(self):
+        self.groups: List[str] = []
+        self.members: Dict[str, List[str]] = {}
+
+    def random_group(self, rng: random.Random) -> Tuple[str, List[str]]:
+        group_id = rng.choice(self.groups)
+        return group_id, self.members[group_id]
+
+
+def make_expense(group_id: str, members: List[str], rng: random.Random) -> Dict:
+    """產生一筆平均分攤的支出"""
+    payer_id = rng.choice(members)
+    participants = rng.sample(members, rng.randint(1, len(members)))
+    amount = rng.randint(50, 5000)
+    return {
+        'group_id': group_id,
+        'payer_id': payer_id,
+        'payer_name': f'成員{payer_id[-4:]}',
+        'amount': amount,
+        'description': f'支出 {rng.randint(1, 9999)}',
+        'split_type': 'equal',
+        'splits': [
+            {'user_id': user_id, 'user_name': f'成員{user_id[-4:]}',
+             'amount': round(amount / len(participants), 2), 'is_paid': False}
+            for user_id in participants
+        ],
+        'created_by': payer_id
+    }
+
+
+def make_todo(group_id: str, members: List[str], rng: random.Random) -> Dict:
+    """產生一筆待辦事項"""
+    assignee_id = rng.choice(members)
+    return {
+        'group_id': group_id,
+        'title': f'待辦 {rng.randint(1, 9999)}',
+        'category': rng.choice(('一般', '購物', '生活', '工作')),
+        'assignee_id': assignee_id,
+        'assignee_name': f'成員{assignee_id[-4:]}',
+        'status': rng.choice(('pending', 'in_progress', 'completed')),
+        'priority': 'medium',
+        'created_by': members[0]
+    }
+
+
+def seed(storage, todo_service, groups: int, members: int, expenses: int, todos: int,
+         settled_ratio: float, rng: random.Random) -> Dataset:
+    """產生群組、成員、帳目與待辦事項
+
+    每個群組先建立 expenses * settled_ratio 筆帳目並結算（歷史記錄），其餘帳目保持未結算
+    """
+    dataset = Dataset()
+    for g in range(groups):
+        member_ids = [f'U{g:04d}{m:04d}' for m in range(members)]
+        for user_id in member_ids:
+            storage.create_or_update_user(user_id, f'成員{user_id[-4:]}')
+
+        group_id = storage.create_group(f'群組 {g}', member_ids[0])['id']
+        for user_id in member_ids[1:]:
+            storage.join_group(group_id, user_id)
+
+        settled = int(expenses * settled_ratio)
+        expense_ids = []
+        for i in range(expenses):
+            expense_ids.append(storage.create_expense(make_expense(group_id, member_ids, rng)))
+            if i + 1 == settled:
+                settlement_id = storage.create_settlement({
+                    'group_id': group_id, 'expense_count': settled, 'expense_ids': expense_ids
+                })
+                storage.settle_expenses(group_id, settlement_id, expense_ids)
+
+        for _ in range(todos):
+            todo_service.create_todo(make_todo(group_id, member_ids, rng))
+
+        dataset.groups.append(group_id)
+        dataset.members[group_id] = member_ids
+
+    return dataset
+
+
+# ===== 請求產生 =====
+
+def _json(method: str, path: str, payload: Dict, headers: Optional[Dict] = None) -> Request:
+    return method, path, json.dumps(payload, ensure_ascii=False).encode('utf-8'), {
+        'Content-Type': 'application/json', **(headers or {})
+    }
+
+
+def signed_callback(user_id: str, text: str = '選單') -> Request:
+    """產生帶有正確 X-Line-Signature 的文字訊息 webhook"""
+    now_ms = int(time.time() * 1000)
+    body = json.dumps({
+        'destination': 'Ubenchmark',
+        'events': [{
+            'type': 'message',
+            'mode': 'active',
+            'timestamp': now_ms,
+            'source': {'type': 'user', 'userId': user_id},
+            'webhookEventId': uuid.uuid4().hex.upper()[:26],
+            'deliveryContext': {'isRedelivery': False},
+            'replyToken': uuid.uuid4().hex,
+            'message': {'id': str(now_ms), 'type': 'text', 'quoteToken': 'q', 'text': text}
+        }]
+    }, ensure_ascii=False).encode('utf-8')
+    signature = base64.b64encode(
+        hmac.new(BENCHMARK_CHANNEL_SECRET.encode('utf-8'), body, hashlib.sha256).digest()
+    ).decode('ascii')
+    return 'POST', '/callback', body, {'Content-Type': 'application/json', 'X-Line-Signature': signature}
+
+
+def build_request_factories(dataset: Dataset, storage, group_versions,
+                            unsettled: int) -> Dict[str, Callable[[random.Random], Request]]:
+    """各路由的請求產生函式（函式內的準備工作不列入計時）
+
+    Args:
+        unsettled: 清帳測試時每個群組的未結算帳目數
+    """
+    from utils.etag import make_etag
+
+    def groups_list(rng):
+        _, members = dataset.random_group(rng)
+        return 'GET', f'/api/groups?user_id={rng.choice(members)}', None, {}
+
+    def expenses_list(rng):
+        group_id, _ = dataset.random_group(rng)
+        return 'GET', f'/api/groups/{group_id}/expenses?page_size=50', None, {}
+
+    def expenses_fields(rng):
+        group_id, _ = dataset.random_group(rng)
+        fields = 'description,amount,payer_name,split_type,split_count,is_settled,created_at'
+        return 'GET', f'/api/groups/{group_id}/expenses?page_size=50&fields={fields}', None, {}
+
+    def settlement(rng):
+        group_id, _ = dataset.random_group(rng)
+        return 'GET', f'/api/groups/{group_id}/settlement', None, {}
+
+    def settlement_304(rng):
+        group_id, _ = dataset.random_group(rng)
+        path = f'/api/groups/{group_id}/settlement'
+        etag = make_etag(group_versions.get(group_id), f'{path}?')
+        return 'GET', path, None, {'If-None-Match': f'"{etag}"'}
+
+    def todos_list(rng):
+        group_id, _ = dataset.random_group(rng)
+        return 'GET', f'/api/groups/{group_id}/todos', None, {}
+
+    def todo_stats(rng):
+        group_id, _ = dataset.random_group(rng)
+        return 'GET', f'/api/groups/{group_id}/todos/stats', None, {}
+
+    def expense_create(rng):
+        group_id, members = dataset.random_group(rng)
+        payload = make_expense(group_id, members, rng)
+        return _json('POST', f'/api/groups/{group_id}/expenses', payload)
+
+    def todo_create(rng):
+        group_id, members = dataset.random_group(rng)
+        return _json('POST', f'/api/groups/{group_id}/todos', make_todo(group_id, members, rng))
+
+    def settlement_clear(rng):
+        # 每次清帳使用新的群組，避免並行時多個請求清同一個群組
+        _, members = dataset.random_group(rng)
+        group_id = storage.create_group('清帳測試', members[0])['id']
+        for user_id in members[1:]:
+            storage.join_group(group_id, user_id)
+        for _ in range(max(unsettled, 1)):
+            storage.create_expense(make_expense(group_id, members, rng))
+        return _json('POST', f'/api/groups/{group_id}/settlement/clear',
+                     {'user_id': members[0], 'user_name': f'成員{members[0][-4:]}'})
+
+    def callback(rng):
+        _, members = dataset.random_group(rng)
+        return signed_callback(rng.choice(members))
+
+    return {
+        'groups_list': groups_list,
+        'expenses_list': expenses_list,
+        'expenses_fields': expenses_fields,
+        'settlement': settlement,
+        'settlement_304': settlement_304,
+        'todos_list': todos_list,
+        'todo_stats': todo_stats,
+        'expense_create': expense_create,
+        'todo_create': todo_create,
+        'settlement_clear': settlement_clear,
+        'callback': callback,
+    }
+
+
+# ===== 請求送出方式 =====
+
+class TestClientDriver:
+    """以 Flask test client 送出請求（每個執行緒各自一個 client）"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, request: Request) -> int:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        method, path, body, headers = request
+        response = client.open(path, method=method, data=body, headers=headers)
+        response.get_data()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class HttpDriver:
+    """以 keep-alive HTTP 連線送出請求（每個執行緒各自一條連線）"""
+
+    def __init__(self, port: int):
+        self.port = port
+        self._local = threading.local()
+
+    def send(self, request: Request) -> int:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection('127.0.0.1', self.port)
+        method, path, body, headers = request
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, ConnectionError):
+            # 連線被伺服器關閉時重新連線
+            connection.close()
+            self._local.connection = None
+            raise
+        return response.status
+
+    def close(self):
+        pass
+
+
+class WsgiDriver(HttpDriver):
+    """在本機啟動 werkzeug 多執行緒伺服器"""
+
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        handler = type('KeepAliveHandler', (WSGIRequestHandler,), {
+            'protocol_version': 'HTTP/1.1',
+            'log_request': lambda self, *args, **kwargs: None
+        })
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=handler)
+        super().__init__(self.server.server_port)
+        threading.Thread(target=self.server.serve_forever, name='load-test-wsgi', daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+class GunicornDriver(HttpDriver):
+    """在子 process 以 gunicorn 執行已載入的 app（使用 gunicorn.conf.py 的設定）
+
+    子 process 由目前的 process fork 而來，gunicorn 再 fork 出 worker，
+    每個 worker 都帶有 fork 前產生的記憶體測試資料。
+    """
+
+    def __init__(self, app, workers: Optional[int] = None, threads: Optional[int] = None,
+                 startup_timeout: float = 30):
+        from gunicorn.app.base import Application
+
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+
+        overrides = {'bind': f'127.0.0.1:{port}', 'loglevel': 'warning'}
+        if workers:
+            overrides['workers'] = workers
+        if threads:
+            overrides['threads'] = threads
+
+        class _Application(Application):
+            def init(self, parser, opts, args):
+                pass
+
+            def load_config(self):
+                self.load_config_from_file(os.path.join(PROJECT_ROOT, 'gunicorn.conf.py'))
+                for key, value in overrides.items():
+                    self.cfg.set(key, value)
+
+            def load(self):
+                return app
+
+        self.settings = _Application().cfg
+        self.process = multiprocessing.get_context('fork').Process(
+            target=lambda: _Application().run(), name='load-test-gunicorn'
+        )
+        self.process.start()
+        super().__init__(port)
+        self._wait_until_ready(startup_timeout)
+
+    def _wait_until_ready(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.process.is_alive():
+                raise RuntimeError('gunicorn 啟動失敗')
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+                connection.request('GET', '/ready')
+                if connection.getresponse().status == 200:
+                    connection.close()
+                    return
+                connection.close()
+            except OSError:
+                pass
+            time.sleep(0.1)
+        self.close()
+        raise RuntimeError(f'gunicorn 未在 {timeout} 秒內就緒')
+
+    def close(self):
+        if self.process.is_alive():
+            os.kill(self.process.pid, signal.SIGTERM)
+        self.process.join(timeout=30)
+
+
+# ===== 量測 =====
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """線性內插的百分位數（sorted_values 需已排序）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def run_route(driver, factory: Callable[[random.Random], Request], requests: int, warmup: int,
+              concurrency: int, seed_value: int) -> Dict:
+    """對單一路由送出請求並統計延遲（準備請求的時間不列入計時）"""
+    warmup_rng = random.Random(seed_value)
+    for _ in range(warmup):
+        driver.send(factory(warmup_rng))
+
+    counter = itertools.count()
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    lock = threading.Lock()
+
+    def worker(index: int):
+        rng = random.Random(seed_value + index + 1)
+        local_latencies = []
+        local_statuses = {}
+        while next(counter) < requests:
+            request = factory(rng)
+            started = time.perf_counter()
+            try:
+                status = driver.send(request)
+            except Exception:
+                status = 0
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not 200 <= status < 400)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'rps': len(latencies) / elapsed if elapsed > 0 else 0,
+        'mean_ms': statistics.mean(latencies) * 1000 if latencies else 0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000 if latencies else 0
+    }
+
+
+def aggregate(runs: List[Dict]) -> Dict:
+    """合併同一路由的多次執行結果：延遲與每秒請求數取中位數，錯誤數取最大值"""
+    statuses: Dict[str, int] = {}
+    for result in runs:
+        for status, count in result['statuses'].items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    merged = {
+        key: statistics.median(result[key] for result in runs)
+        for key in ('rps', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+    }
+    return {
+        'runs': len(runs),
+        'requests': runs[0]['requests'],
+        'errors': max(result['errors'] for result in runs),
+        'statuses': statuses,
+        **merged
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float, min_delta_ms: float) -> List[str]:
+    """與基準結果比較，回傳退步的路由說明
+
+    變慢的比例超過 tolerance 且增加的時間超過 min_delta_ms 才視為退步
+    """
+    def slower(base_ms: float, current_ms: float) -> bool:
+        return current_ms > base_ms * (1 + tolerance) and current_ms - base_ms > min_delta_ms
+
+    concurrency = results['meta']['concurrency']
+    regressions = []
+    for route, current in results['routes'].items():
+        base = baseline.get('routes', {}).get(route)
+        if not base:
+            continue
+        if base['p95_ms'] > 0 and slower(base['p95_ms'], current['p95_ms']):
+            regressions.append(f"{route}: p95 {base['p95_ms']:.2f} → {current['p95_ms']:.2f} ms")
+        # 每秒請求數換算為每個請求的平均耗時，才能套用同樣的絕對門檻
+        if base['rps'] > 0 and current['rps'] > 0 and \
+                slower(concurrency * 1000 / base['rps'], concurrency * 1000 / current['rps']):
+            regressions.append(f"{route}: rps {base['rps']:.1f} → {current['rps']:.1f}")
+        if current['errors'] > base.get('errors', 0):
+            regressions.append(f"{route}: errors {base.get('errors', 0)} → {current['errors']}")
+    return regressions
+
+
+def run(args) -> Dict:
+    """建立測試環境、產生資料並依序執行各路由"""
+    line_stub = start_line_stub(args.line_latency)
+    configure_environment(f'http://127.0.0.1:{line_stub.server_port}')
+
+    # 環境變數設定完成後才匯入 app（Config 於匯入時讀取環境變數）
+    from app import app
+    from blueprints.api_app import group_versions, todo_service
+    from services.storage_backend import get_storage_backend
+
+    storage = get_storage_backend()
+    rng = random.Random(args.seed)
+
+    started = time.perf_counter()
+    dataset = seed(storage, todo_service, args.groups, args.members, args.expenses, args.todos,
+                   args.settled_ratio, rng)
+    seed_seconds = time.perf_counter() - started
+
+    factories = build_request_factories(dataset, storage, group_versions,
+                                        args.expenses - int(args.expenses * args.settled_ratio))
+    if args.mode == 'client':
+        driver = TestClientDriver(app)
+    elif args.mode == 'wsgi':
+        driver = WsgiDriver(app)
+    else:
+        driver = GunicornDriver(app, args.workers, args.threads)
+
+    routes = {}
+    try:
+        for route in ROUTES:
+            if args.routes and route not in args.routes:
+                continue
+            if args.mode == 'gunicorn' and route in IN_PROCESS_ROUTES:
+                continue
+            routes[route] = aggregate([
+                run_route(driver, factories[route], args.requests, args.warmup,
+                          args.concurrency, args.seed + repeat)
+                for repeat in range(args.repeat)
+            ])
+    finally:
+        driver.close()
+        line_stub.shutdown()
+
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'mode': args.mode,
+            'workers': driver.settings.workers if args.mode == 'gunicorn' else 1,
+            'threads': driver.settings.threads if args.mode == 'gunicorn' else None,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'repeat': args.repeat,
+            'warmup': args.warmup,
+            'groups': args.groups,
+            'members': args.members,
+            'expenses': args.expenses,
+            'todos': args.todos,
+            'settled_ratio': args.settled_ratio,
+            'line_latency_ms': args.line_latency,
+            'seed': args.seed,
+            'seed_seconds': seed_seconds
+        },
+        'routes': routes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API 與 Webhook 端對端壓力測試')
+    parser.add_argument('--mode', choices=('client', 'wsgi', 'gunicorn'), default='client')
+    parser.add_argument('--workers', type=int, help='gunicorn worker 數（預設依 gunicorn.conf.py）')
+    parser.add_argument('--threads', type=int, help='gunicorn 每個 worker 的執行緒數（預設依 gunicorn.conf.py）')
+    parser.add_argument('--concurrency', type=int, default=1, help='同時送出請求的執行緒數')
+    parser.add_argument('--requests', type=int, default=500, help='每個路由每次執行的請求數')
+    parser.add_argument('--repeat', type=int, default=3, help='每個路由的執行次數（統計取中位數）')
+    parser.add_argument('--warmup', type=int, default=20, help='每個路由正式量測前的暖身請求數')
+    parser.add_argument('--groups', type=int, default=10)
+    parser.add_argument('--members', type=int, default=6, help='每個群組的成員數')
+    parser.add_argument('--expenses', type=int, default=200, help='每個群組的帳目數')
+    parser.add_argument('--todos', type=int, default=50, help='每個群組的待辦事項數')
+    parser.add_argument('--settled-ratio', type=float, default=0.5, help='已結算帳目的比例')
+    parser.add_argument('--line-latency', type=float, default=0, help='LINE API 模擬延遲（毫秒）')
+    parser.add_argument('--routes', nargs='+', choices=ROUTES, help='只執行指定的路由')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='將結果輸出為 JSON 檔案（可作為之後比較的基準）')
+    parser.add_argument('--baseline', help='與先前輸出的 JSON 基準比較')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允許的退步比例')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='視為退步所需增加的最少毫秒數（低於此值視為量測雜訊）')
+    args = parser.parse_args()
+
+    results = run(args)
+
+    meta = results['meta']
+    server = f" workers={meta['workers']} threads={meta['threads']}" if meta['mode'] == 'gunicorn' else ''
+    print(f"mode={meta['mode']}{server} concurrency={meta['concurrency']} "
+          f"requests={meta['requests']}x{meta['repeat']} groups={meta['groups']} "
+          f"members={meta['members']} expenses={meta['expenses']} todos={meta['todos']} "
+          f"(seed {meta['seed_seconds']:.1f}s)")
+    header = (f"{'route':<17} | {'req/s':>8} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | "
+              f"{'max ms':>7} | {'errors':>6}")
+    print(header)
+    print('-' * len(header))
+    for route, stats in results['routes'].items():
+        print(f"{route:<17} | {stats['rps']:>8.1f} | {stats['p50_ms']:>7.2f} | {stats['p95_ms']:>7.2f} | "
+              f"{stats['p99_ms']:>7.2f} | {stats['max_ms']:>7.2f} | {stats['errors']:>6}")
+
+    if args.json:
+        directory = os.path.dirname(args.json)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n與基準相比退步（容許 {args.tolerance:.0%} 且 {args.min_delta_ms} ms）：")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\n與基準相比沒有退步（容許 {args.tolerance:.0%} 且 {args.min_delta_ms} ms）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""列表讀取路徑基準測試
+
+以 DocumentSnapshot 模擬 Firestore 查詢結果，比較調整前後列出待辦事項與支出記錄的
+CPU 時間與記憶體峰值：
+- todos legacy：to_dict() → 加 id → Todo.from_dict → 建立整份字典列表 → json.dumps
+- todos snapshot：Todo.from_snapshot → ModelJSONProvider 序列化時才轉換
+- expenses：FirebaseService._document_to_dict（to_dict() → 時間欄位轉換 → 加 id）
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.model_benchmark --items 500 2000 --rounds 5
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+from google.cloud.firestore_v1.base_document import DocumentSnapshot
+
+from models.todo import Todo
+from services.firebase_service import FirebaseService
+from utils.json_provider import ModelJSONProvider
+
+
+def make_snapshot(doc_id: str, data: Dict) -> DocumentSnapshot:
+    """建立不需連線的 DocumentSnapshot"""
+    now = datetime.now(timezone.utc)
+    reference = SimpleNamespace(id=doc_id, _path=('benchmark', doc_id))
+    return DocumentSnapshot(reference, data, True, now, now, now)
+
+
+def make_todo_snapshots(count: int) -> List[DocumentSnapshot]:
+    created_at = datetime(2025, 12, 22, 3, 52, 24, tzinfo=timezone.utc)
+    return [
+        make_snapshot(f'T{i:06d}', {
+            'group_id': 'G0001',
+            'title': f'待辦事項 {i}',
+            'description': '記得帶收據' * 3,
+            'category': ('一般', '購物', '生活')[i % 3],
+            'assignee_id': f'U{i % 8:04d}',
+            'assignee_name': f'成員{i % 8}',
+            'status': ('pending', 'in_progress', 'completed')[i % 3],
+            'priority': 'medium',
+            'due_date': '2025-12-31',
+            'created_by': 'U0000',
+            'created_at': created_at,
+            'updated_at': created_at
+        })
+        for i in range(count)
+    ]
+
+
+def make_expense_snapshots(count: int, split_count: int = 6) -> List[DocumentSnapshot]:
+    created_at = datetime(2025, 12, 22, 3, 52, 24, tzinfo=timezone.utc)
+    return [
+        make_snapshot(f'E{i:06d}', {
+            'group_id': 'G0001',
+            'payer_id': 'U0000',
+            'payer_name': '成員0',
+            'amount': 1200,
+            'description': f'支出 {i}',
+            'split_type': 'equal',
+            'splits': [
+                {'user_id': f'U{j:04d}', 'user_name': f'成員{j}', 'amount': 1200 / split_count, 'is_paid': False}
+                for j in range(split_count)
+            ],
+            'created_by': 'U0000',
+            'expense_number': i + 1,
+            'is_settled': False,
+            'created_at': created_at
+        })
+        for i in range(count)
+    ]
+
+
+def todos_legacy(snapshots: List[DocumentSnapshot]) -> str:
+    rows = []
+    for snapshot in snapshots:
+        data = snapshot.to_dict()
+        data['id'] = snapshot.id
+        rows.append(Todo.from_dict(data))
+    return json.dumps({'success': True, 'todos': [todo.to_dict() for todo in rows]},
+                      ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def todos_snapshot(snapshots: List[DocumentSnapshot]) -> str:
+    rows = [Todo.from_snapshot(snapshot) for snapshot in snapshots]
+    return json.dumps({'success': True, 'todos': rows}, default=ModelJSONProvider.default,
+                      ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def expenses(snapshots: List[DocumentSnapshot]) -> List[Dict]:
+    return [FirebaseService._document_to_dict(snapshot) for snapshot in snapshots]
+
+
+def measure(func: Callable, snapshots: List[DocumentSnapshot], rounds: int) -> Dict:
+    """量測平均執行時間與記憶體峰值"""
+    durations = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func(snapshots)
+        durations.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    result = func(snapshots)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return {
+        'avg_ms': statistics.mean(durations) * 1000,
+        'us_per_item': statistics.mean(durations) / len(snapshots) * 1_000_000,
+        'peak_kb': peak / 1024,
+        'bytes_per_item': peak / len(snapshots)
+    }
+
+
+def run(item_counts: List[int], rounds: int) -> List[Dict]:
+    """執行基準測試並回傳每個資料量的統計結果"""
+    results = []
+    for count in item_counts:
+        todo_snapshots = make_todo_snapshots(count)
+        expense_snapshots = make_expense_snapshots(count)
+        results.append({
+            'items': count,
+            'todos_legacy': measure(todos_legacy, todo_snapshots, rounds),
+            'todos_snapshot': measure(todos_snapshot, todo_snapshots, rounds),
+            'expenses': measure(expenses, expense_snapshots, rounds),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='列表讀取路徑基準測試')
+    parser.add_argument('--items', type=int, nargs='+', default=[500, 2000])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--json', help='將結果輸出為 JSON 檔案')
+    args = parser.parse_args()
+
+    results = run(args.items, args.rounds)
+
+    header = f"{'items':>6} | {'path':<18} | {'avg ms':>8} | {'us/item':>8} | {'peak KB':>9} | {'B/item':>7}"
+    print(header)
+    print('-' * len(header))
+    for row in results:
+        for name in ('todos_legacy', 'todos_snapshot', 'expenses'):
+            stats = row[name]
+            print(f"{row['items']:>6} | {name:<18} | {stats['avg_ms']:>8.2f} | {stats['us_per_item']:>8.2f} | "
+                  f"{stats['peak_kb']:>9.1f} | {stats['bytes_per_item']:>7.0f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
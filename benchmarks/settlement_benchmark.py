@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""結算演算法基準測試
+
+比較舊版浮點數貪婪演算法、heap 貪婪演算法與精確最少轉帳模式的轉帳次數與執行時間。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.settlement_benchmark --members 5 10 15 18 --rounds 50
+    python -m benchmarks.settlement_benchmark --clusters 4
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from services.settlement_service import SettlementService
+
+
+def generate_balances(member_count: int, rng: random.Random, clusters: int = 1,
+                      expense_count: int = 30) -> Dict[str, Dict]:
+    """以隨機帳目產生一份群組淨收支
+
+    clusters > 1 時成員會被分成數個小圈圈，帳目只在圈內分攤，
+    模擬「同一群組內分頭出遊」的情境，此時存在總和為零的子集合
+    """
+    members = [f'U{i:04d}' for i in range(member_count)]
+    rng.shuffle(members)
+    cluster_count = max(1, min(clusters, member_count // 2))
+    groups = [members[i::cluster_count] for i in range(cluster_count)]
+
+    expenses = []
+    for _ in range(expense_count):
+        group = rng.choice(groups)
+        payer_id = rng.choice(group)
+        participants = rng.sample(group, rng.randint(1, len(group)))
+        amount = rng.randint(10, 5000)
+        per_person = amount / len(participants)
+        expenses.append({
+            'payer_id': payer_id,
+            'payer_name': payer_id,
+            'amount': amount,
+            'splits': [
+                {'user_id': user_id, 'user_name': user_id, 'amount': per_person}
+                for user_id in participants
+            ]
+        })
+
+    return SettlementService.calculate_balances(expenses)
+
+
+def sub_cent_transfers(plans: List[Dict]) -> int:
+    """計算金額不是整數分的轉帳筆數（浮點演算法會留下零頭）"""
+    return sum(
+        1 for plan in plans
+        if abs(plan['amount'] * SettlementService.MINOR_UNITS - round(plan['amount'] * SettlementService.MINOR_UNITS)) > 1e-6
+    )
+
+
+def run(member_sizes: List[int], rounds: int, seed: int, clusters: int = 1) -> List[Dict]:
+    """執行基準測試並回傳每個成員數的統計結果"""
+    algorithms = {
+        'legacy_float': SettlementService.calculate_greedy_payments_float,
+        'heap': SettlementService.calculate_optimal_payments,
+        'exact': lambda balances: SettlementService.calculate_optimal_payments(balances, exact=True),
+    }
+
+    results = []
+    for member_count in member_sizes:
+        rng = random.Random(seed + member_count)
+        ledgers = [generate_balances(member_count, rng, clusters) for _ in range(rounds)]
+
+        row = {'members': member_count, 'clusters': clusters, 'rounds': rounds}
+        for name, algorithm in algorithms.items():
+            transfers = []
+            durations = []
+            sub_cents = []
+            for balances in ledgers:
+                started = time.perf_counter()
+                plans = algorithm(balances)
+                durations.append(time.perf_counter() - started)
+                transfers.append(len(plans))
+                sub_cents.append(sub_cent_transfers(plans))
+
+            row[name] = {
+                'avg_transfers': statistics.mean(transfers),
+                'avg_ms': statistics.mean(durations) * 1000,
+                'max_ms': max(durations) * 1000,
+                'sub_cent_transfers': sum(sub_cents)
+            }
+        results.append(row)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='結算演算法基準測試')
+    parser.add_argument('--members', type=int, nargs='+', default=[5, 10, 15, 18])
+    parser.add_argument('--rounds', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--clusters', type=int, default=1, help='帳目分攤的小圈圈數量')
+    parser.add_argument('--json', help='將結果輸出為 JSON 檔案')
+    args = parser.parse_args()
+
+    results = run(args.members, args.rounds, args.seed, args.clusters)
+
+    header = f"{'members':>7} | {'algorithm':<12} | {'transfers':>9} | {'avg ms':>8} | {'max ms':>8} | {'sub-cent':>8}"
+    print(header)
+    print('-' * len(header))
+    for row in results:
+        for name in ('legacy_float', 'heap', 'exact'):
+            stats = row[name]
+            print(f"{row['members']:>7} | {name:<12} | {stats['avg_transfers']:>9.2f} | "
+                  f"{stats['avg_ms']:>8.3f} | {stats['max_ms']:>8.3f} | {stats['sub_cent_transfers']:>8}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
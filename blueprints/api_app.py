@@ -5,10 +5,13 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime
 import logging
 
-from services.firebase_service import firebase_service
+from config import Config
+from services.storage_backend import get_storage_backend
 from services.todo_service import TodoService
 from services.settlement_service import SettlementService
 from utils.flex_message import FlexMessageHelper
+from utils.logging_config import log_payload
+from utils.etag import GroupVersionCache, group_etag
 
 logger = logging.getLogger(__name__)
 
@@ -16,9 +19,25 @@ logger = logging.getLogger(__name__)
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 # 初始化服務
+storage = get_storage_backend()
 todo_service = TodoService()
 settlement_service = SettlementService()
 
+# 群組資料版本戳記（ETag 使用）
+group_versions = GroupVersionCache(storage, ttl=Config.ETAG_VERSION_TTL)
+
+# 分頁設定
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+def _get_fields_param():
+    """解析 ?fields=a,b,c 欄位投影參數，未指定時回傳 None（取得完整文件）"""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field for field in fields.split(',') if field.strip()]
+
 
 # ===== 群組 API =====
 
@@ -35,8 +54,14 @@ def groups():
                     'error': '缺少 user_id 參數'
                 }), 400
 
-            # 取得使用者加入的所有群組
-            groups_list = firebase_service.get_user_groups(user_id)
+            # 取得使用者加入的所有群組（可用 fields 只取得列表需要的欄位）
+            try:
+                groups_list = storage.get_user_groups(user_id, fields=_get_fields_param())
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
 
             return jsonify({
                 'success': True,
@@ -64,7 +89,7 @@ def groups():
                     }), 400
 
             # 建立群組
-            group = firebase_service.create_group(
+            group = storage.create_group(
                 group_name=data['group_name'],
                 created_by=data['created_by']
             )
@@ -73,7 +98,7 @@ def groups():
             display_name = data.get('display_name', '')
             picture_url = data.get('picture_url', '')
             if display_name:
-                firebase_service.create_or_update_user(
+                storage.create_or_update_user(
                     line_user_id=data['created_by'],
                     display_name=display_name,
                     picture_url=picture_url
@@ -108,7 +133,7 @@ def join_group():
                 }), 400
 
         # 查詢群組
-        group = firebase_service.get_group_by_code(data['group_code'])
+        group = storage.get_group_by_code(data['group_code'])
 
         if not group:
             return jsonify({
@@ -125,14 +150,16 @@ def join_group():
             })
 
         # 加入群組
-        success = firebase_service.join_group(group['id'], data['user_id'])
+        success = storage.join_group(group['id'], data['user_id'])
 
         if success:
+            group_versions.bump(group['id'])
+
             # 將使用者資料記錄到 users 集合
             display_name = data.get('display_name', '')
             picture_url = data.get('picture_url', '')
             if display_name:
-                firebase_service.create_or_update_user(
+                storage.create_or_update_user(
                     line_user_id=data['user_id'],
                     display_name=display_name,
                     picture_url=picture_url
@@ -157,6 +184,7 @@ def join_group():
 
 
 @api_bp.route("/groups/<group_id>", methods=['GET', 'DELETE'])
+@group_etag(group_versions, deletes_group=True)
 def group_detail(group_id):
     """群組詳細資訊 API"""
     if request.method == 'GET':
@@ -172,12 +200,12 @@ def group_detail(group_id):
 
             if by == 'code':
                 # 透過 group_code 查詢
-                group = firebase_service.get_group_by_code(group_id)
+                group = storage.get_group_by_code(group_id)
             else:
                 # 透過 group_id 查詢
-                group = firebase_service.get(collection='groups', doc_id=group_id)
+                group = storage.get(collection='groups', doc_id=group_id)
 
-            if not group:
+            if not group or group.get('deletion_status'):
                 return jsonify({
                     'success': False,
                     'error': '群組不存在'
@@ -203,7 +231,7 @@ def group_detail(group_id):
         """刪除群組及其所有相關資料"""
         try:
             # 先檢查群組是否存在
-            group = firebase_service.get(collection='groups', doc_id=group_id)
+            group = storage.get(collection='groups', doc_id=group_id)
 
             if not group:
                 return jsonify({
@@ -212,7 +240,17 @@ def group_detail(group_id):
                 }), 404
 
             # 刪除群組及其所有相關資料
-            success = firebase_service.delete_group(group_id)
+            if Config.GROUP_DELETE_ASYNC:
+                # 背景刪除：立即回應，群組已從列表中移除
+                if storage.start_group_deletion(group_id):
+                    return jsonify({
+                        'success': True,
+                        'message': '群組刪除中',
+                        'pending': True
+                    }), 202
+                success = False
+            else:
+                success = storage.delete_group(group_id)
 
             if success:
                 return jsonify({
@@ -238,7 +276,7 @@ def get_group_members(group_id):
     """取得群組成員 API"""
     try:
         # 取得群組資料
-        group = firebase_service.get(collection='groups', doc_id=group_id)
+        group = storage.get(collection='groups', doc_id=group_id)
 
         if not group:
             return jsonify({
@@ -246,18 +284,8 @@ def get_group_members(group_id):
                 'error': '群組不存在'
             }), 404
 
-        member_ids = group.get('members', [])
-        members = []
-
-        # 從 users 集合取得每個成員的詳細資料
-        for user_id in member_ids:
-            user = firebase_service.get_user(user_id)
-            if user:
-                members.append({
-                    'id': user_id,
-                    'name': user.get('display_name', '未知用戶'),
-                    'picture_url': user.get('picture_url', '')
-                })
+        # 從 users 集合批次取得成員的詳細資料
+        members = storage.get_member_profiles(group.get('members', []))
 
         return jsonify({
             'success': True,
@@ -275,6 +303,7 @@ def get_group_members(group_id):
 # ===== 支出 API =====
 
 @api_bp.route("/groups/<group_id>/expenses", methods=['GET', 'POST'])
+@group_etag(group_versions)
 def expenses(group_id):
     """支出記錄列表與建立 API"""
     if request.method == 'GET':
@@ -295,12 +324,33 @@ def expenses(group_id):
                     'error': '缺少 group_id 參數'
                 }), 400
 
-            # 取得群組的支出記錄
-            expenses_list = firebase_service.get_group_expenses(group_id, is_settled)
+            # 分頁參數：cursor 為上一頁回傳的 next_cursor
+            cursor = request.args.get('cursor') or None
+            try:
+                page_size = int(request.args.get('page_size', DEFAULT_PAGE_SIZE))
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': 'page_size 必須為整數'
+                }), 400
+            page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+            # 取得群組的支出記錄（可用 fields 只取得列表需要的欄位）
+            try:
+                expenses_list, next_cursor = storage.get_group_expenses_page(
+                    group_id, is_settled, page_size=page_size, cursor=cursor,
+                    fields=_get_fields_param()
+                )
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
 
             return jsonify({
                 'success': True,
-                'expenses': expenses_list
+                'expenses': expenses_list,
+                'next_cursor': next_cursor
             })
 
         except Exception as e:
@@ -326,10 +376,16 @@ def expenses(group_id):
                     }), 400
 
             # 建立支出記錄
-            expense_id = firebase_service.create_expense(data)
+            try:
+                expense_id = storage.create_expense(data)
+            except LookupError:
+                return jsonify({
+                    'success': False,
+                    'error': '群組不存在'
+                }), 404
 
             # 取得完整記錄
-            expense = firebase_service.get_expense(expense_id)
+            expense = storage.get_expense(expense_id)
 
             # 建立 Flex Message bubble 供前端使用
             flex_bubble = FlexMessageHelper.create_expense_success(
@@ -358,7 +414,7 @@ def expense_detail(expense_id):
     """單一支出記錄的取得、更新、刪除 API"""
     if request.method == 'GET':
         try:
-            expense = firebase_service.get_expense(expense_id)
+            expense = storage.get_expense(expense_id)
 
             if not expense:
                 return jsonify({
@@ -382,16 +438,13 @@ def expense_detail(expense_id):
         try:
             updates = request.json
 
-            # 更新支出記錄
-            success = firebase_service.update(
-                collection='expenses',
-                doc_id=expense_id,
-                data=updates
-            )
+            # 更新支出記錄（同步更新群組收支帳本）
+            success = storage.update_expense(expense_id, updates)
 
             if success:
                 # 取得更新後的記錄
-                expense = firebase_service.get_expense(expense_id)
+                expense = storage.get_expense(expense_id)
+                group_versions.bump(expense.get('group_id'))
 
                 # 建立 Flex Message bubble 供前端使用
                 flex_bubble = FlexMessageHelper.create_expense_success(
@@ -421,7 +474,7 @@ def expense_detail(expense_id):
     elif request.method == 'DELETE':
         try:
             # 先取得要刪除的記錄（刪除後就取不到了）
-            expense = firebase_service.get_expense(expense_id)
+            expense = storage.get_expense(expense_id)
 
             if not expense:
                 return jsonify({
@@ -430,12 +483,13 @@ def expense_detail(expense_id):
                 }), 404
 
             # 刪除記錄
-            success = firebase_service.delete_expense(expense_id)
-            import json
+            success = storage.delete_expense(expense_id)
             if success:
+                group_versions.bump(expense.get('group_id'))
+
                 # 建立刪除通知的 Flex Message bubble
                 flex_bubble = FlexMessageHelper.create_expense_deleted_message(expense)
-                logger.info(f"flex_bubble: {json.dumps(flex_bubble, ensure_ascii=False)}")
+                log_payload(logger, 'expense_detail', "flex_bubble: %s", flex_bubble, level=logging.DEBUG)
 
                 return jsonify({
                     'success': True,
@@ -460,6 +514,7 @@ def expense_detail(expense_id):
 # ===== 待辦事項 API =====
 
 @api_bp.route("/groups/<group_id>/todos", methods=['GET', 'POST'])
+@group_etag(group_versions)
 def todos(group_id):
     """待辦事項列表與建立 API"""
     if request.method == 'GET':
@@ -479,12 +534,10 @@ def todos(group_id):
             else:
                 todos_list = todo_service.get_group_todos(group_id, status, category)
 
-            # 轉換為字典
-            todos_data = [todo.to_dict() for todo in todos_list]
-
+            # Todo 由 ModelJSONProvider 於序列化時直接轉換
             return jsonify({
                 'success': True,
-                'todos': todos_data
+                'todos': todos_list
             })
 
         except Exception as e:
@@ -575,6 +628,8 @@ def todo_detail(todo_id):
 
             todo_obj = todo_service.get_todo(todo_id)
             todo_dict = todo_obj.to_dict() if todo_obj else None
+            if todo_obj:
+                group_versions.bump(todo_obj.group_id)
             flex_bubble = None
             if todo_dict:
                 flex_bubble = FlexMessageHelper.create_todo_action_bubble(todo_dict, action='updated')
@@ -609,6 +664,8 @@ def todo_detail(todo_id):
             if not result.get('success'):
                 return jsonify(result), 500
 
+            group_versions.bump(todo_obj.group_id)
+
             flex_bubble = FlexMessageHelper.create_todo_action_bubble(todo_dict, action='deleted')
 
             return jsonify({
@@ -632,6 +689,11 @@ def complete_todo(todo_id):
     try:
         result = todo_service.mark_completed(todo_id)
 
+        if result.get('success'):
+            todo_obj = todo_service.get_todo(todo_id)
+            if todo_obj:
+                group_versions.bump(todo_obj.group_id)
+
         return jsonify(result)
 
     except Exception as e:
@@ -643,6 +705,7 @@ def complete_todo(todo_id):
 
 
 @api_bp.route("/groups/<group_id>/todos/categories", methods=['GET'])
+@group_etag(group_versions)
 def get_todo_categories(group_id):
     """取得待辦事項類別列表 API"""
     try:
@@ -661,9 +724,30 @@ def get_todo_categories(group_id):
         }), 500
 
 
+@api_bp.route("/groups/<group_id>/todos/stats", methods=['GET'])
+@group_etag(group_versions)
+def get_todo_stats(group_id):
+    """取得待辦事項統計 API"""
+    try:
+        stats = todo_service.get_statistics(group_id)
+
+        return jsonify({
+            'success': True,
+            'stats': stats
+        })
+
+    except Exception as e:
+        logger.error(f"取得待辦事項統計失敗: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 # ===== 結算 API =====
 
 @api_bp.route("/groups/<group_id>/settlement", methods=['GET'])
+@group_etag(group_versions)
 def get_settlement(group_id):
     """取得結算資訊 API"""
     try:
@@ -673,10 +757,11 @@ def get_settlement(group_id):
                 'error': '缺少 group_id 參數'
             }), 400
 
-        # 取得未結算的支出
-        expenses = firebase_service.get_group_expenses(group_id, is_settled=False)
+        # 取得群組收支帳本（未結算帳目的淨收支）
+        ledger = storage.get_group_balances(group_id)
+        expense_count = ledger['expense_count']
 
-        if not expenses:
+        if expense_count <= 0:
             return jsonify({
                 'success': True,
                 'has_expenses': False,
@@ -685,18 +770,19 @@ def get_settlement(group_id):
                 'message': '目前沒有未結算的帳目'
             })
 
-        # 計算淨收支
-        balances = settlement_service.calculate_balances(expenses)
+        balances = ledger['balances']
 
         # 計算最優化還款方案
-        payment_plans = settlement_service.calculate_optimal_payments(balances)
+        payment_plans = settlement_service.calculate_optimal_payments(
+            balances, exact=Config.SETTLEMENT_EXACT_MODE
+        )
 
         return jsonify({
             'success': True,
             'has_expenses': True,
             'balances': balances,
             'payment_plans': payment_plans,
-            'expense_count': len(expenses)
+            'expense_count': expense_count
         })
 
     except Exception as e:
@@ -708,6 +794,7 @@ def get_settlement(group_id):
 
 
 @api_bp.route("/groups/<group_id>/settlement/clear", methods=['POST'])
+@group_etag(group_versions)
 def clear_settlement(group_id):
     """清帳 API - 將所有帳目標記為已結算"""
     try:
@@ -725,35 +812,59 @@ def clear_settlement(group_id):
         user_id = data['user_id']
         user_name = data['user_name']
 
-        # 取得未結算的支出
-        expenses = firebase_service.get_group_expenses(group_id, is_settled=False)
+        # 若上次清帳中途失敗，沿用既有的結算記錄繼續標記，不重新計算
+        pending = storage.get_pending_settlement(group_id)
+
+        if pending:
+            settlement_id = pending['id']
+            balances = pending.get('balance_summary', {})
+            payment_plans = pending.get('settlement_data', [])
+            count = pending.get('expense_count', 0)
+            expense_ids = pending.get('expense_ids')
+            if expense_ids is None:
+                # 舊版結算記錄沒有 expense_ids：只標記結算記錄建立前新增的帳目
+                settled_at = pending.get('settled_at')
+                expense_ids = [
+                    expense['id']
+                    for expense in storage.get_group_expenses(group_id, is_settled=False, limit=None,
+                                                              fields=['created_at'])
+                    if settled_at and expense.get('created_at') and expense['created_at'] <= settled_at
+                ]
+            logger.info(f"繼續未完成的結算 {settlement_id}")
+        else:
+            # 取得所有未結算的支出
+            expenses = storage.get_group_expenses(group_id, is_settled=False, limit=None)
 
-        if not expenses:
-            return jsonify({
-                'success': False,
-                'error': '目前沒有未結算的帳目'
-            }), 400
+            if not expenses:
+                return jsonify({
+                    'success': False,
+                    'error': '目前沒有未結算的帳目'
+                }), 400
 
-        count = len(expenses)
+            count = len(expenses)
+            expense_ids = [expense['id'] for expense in expenses]
 
-        # 計算結算資料
-        balances = settlement_service.calculate_balances(expenses)
-        payment_plans = settlement_service.calculate_optimal_payments(balances)
+            # 計算結算資料
+            balances = settlement_service.calculate_balances(expenses)
+            payment_plans = settlement_service.calculate_optimal_payments(
+                balances, exact=Config.SETTLEMENT_EXACT_MODE
+            )
 
-        # 建立結算記錄
-        settlement_data = settlement_service.create_settlement_data(
-            group_id=group_id,
-            balances=balances,
-            payment_plans=payment_plans,
-            settled_by=user_id,
-            settled_by_name=user_name
-        )
+            # 建立結算記錄
+            settlement_data = settlement_service.create_settlement_data(
+                group_id=group_id,
+                balances=balances,
+                payment_plans=payment_plans,
+                settled_by=user_id,
+                settled_by_name=user_name,
+                expense_ids=expense_ids
+            )
 
-        # 儲存結算記錄
-        firebase_service.create_settlement(settlement_data)
+            # 儲存結算記錄
+            settlement_id = storage.create_settlement(settlement_data)
 
-        # 將所有支出標記為已結算
-        firebase_service.settle_expenses(group_id)
+        # 將結算包含的支出標記為已結算（標記 settlement_id），並從群組收支帳本扣除
+        storage.settle_expenses(group_id, settlement_id, expense_ids)
 
         # 使用 FlexMessageHelper 建立結算結果的 Flex bubble，供前端 LIFF 發送
         flex_bubble = FlexMessageHelper.create_settlement_bubble(balances, payment_plans)
@@ -762,6 +873,7 @@ def clear_settlement(group_id):
             'success': True,
             'message': f'已清帳 {count} 筆帳目',
             'expense_count': count,
+            'settlement_id': settlement_id,
             'flexBubble': flex_bubble
         })
 
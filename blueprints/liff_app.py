@@ -3,7 +3,7 @@
 
 from flask import Blueprint, render_template, abort, request
 from utils.liff_enum import LIFF
-from services.firebase_service import firebase_service
+from services.storage_backend import get_storage_backend
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,6 +11,9 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 liff_bp = Blueprint('liff', __name__, url_prefix='/liff')
 
+# 資料儲存後端
+storage = get_storage_backend()
+
 
 @liff_bp.route("/<size>")
 def liff_redirect(size):
@@ -65,20 +68,11 @@ def liff_expense_form(size, group_id):
     if group_id:
         try:
             # 取得群組資料
-            group = firebase_service.get(collection='groups', doc_id=group_id)
+            group = storage.get(collection='groups', doc_id=group_id)
 
             if group:
-                member_ids = group.get('members', [])
-
-                # 從 users 集合取得每個成員的詳細資料
-                for user_id in member_ids:
-                    user = firebase_service.get_user(user_id)
-                    if user:
-                        members.append({
-                            'id': user_id,
-                            'name': user.get('display_name', '未知用戶'),
-                            'picture_url': user.get('picture_url', '')
-                        })
+                # 從 users 集合批次取得成員的詳細資料
+                members = storage.get_member_profiles(group.get('members', []))
 
                 logger.info(f"載入 {len(members)} 位群組成員")
             else:
@@ -111,7 +105,7 @@ def liff_expense_edit(size, expense_id):
 
     # 載入支出資料
     try:
-        expense = firebase_service.get_expense(expense_id)
+        expense = storage.get_expense(expense_id)
         if expense:
             group_id = expense.get('group_id')
             logger.info(f"載入支出資料 - expense_id: {expense_id}, group_id: {group_id}")
@@ -124,17 +118,9 @@ def liff_expense_edit(size, expense_id):
     members = []
     if group_id:
         try:
-            group = firebase_service.get(collection='groups', doc_id=group_id)
+            group = storage.get(collection='groups', doc_id=group_id)
             if group:
-                member_ids = group.get('members', [])
-                for user_id in member_ids:
-                    user = firebase_service.get_user(user_id)
-                    if user:
-                        members.append({
-                            'id': user_id,
-                            'name': user.get('display_name', '未知用戶'),
-                            'picture_url': user.get('picture_url', '')
-                        })
+                members = storage.get_member_profiles(group.get('members', []))
                 logger.info(f"載入 {len(members)} 位群組成員")
         except Exception as e:
             logger.error(f"取得群組成員失敗: {e}", exc_info=True)
@@ -160,20 +146,11 @@ def liff_todo_form(size, group_id):
     if group_id:
         try:
             # 取得群組資料
-            group = firebase_service.get(collection='groups', doc_id=group_id)
+            group = storage.get(collection='groups', doc_id=group_id)
 
             if group:
-                member_ids = group.get('members', [])
-
-                # 從 users 集合取得每個成員的詳細資料
-                for user_id in member_ids:
-                    user = firebase_service.get_user(user_id)
-                    if user:
-                        members.append({
-                            'id': user_id,
-                            'name': user.get('display_name', '未知用戶'),
-                            'picture_url': user.get('picture_url', '')
-                        })
+                # 從 users 集合批次取得成員的詳細資料
+                members = storage.get_member_profiles(group.get('members', []))
 
                 logger.info(f"載入 {len(members)} 位群組成員")
             else:
@@ -1,13 +1,10 @@
 # -*- coding: utf-8 -*-
 """LINE Bot Blueprint - Webhook and event handlers"""
 
-from flask import Blueprint, request, abort
+from flask import Blueprint, request, abort, jsonify
 from linebot.v3 import WebhookHandler
 from linebot.v3.exceptions import InvalidSignatureError
 from linebot.v3.messaging import (
-    Configuration,
-    ApiClient,
-    MessagingApi,
     ReplyMessageRequest,
     TextMessage
 )
@@ -16,12 +13,19 @@ from linebot.v3.webhooks import (
     TextMessageContent,
     FollowEvent
 )
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 import logging
 
 from config import Config
-from services.firebase_service import firebase_service
+from services.storage_backend import get_storage_backend
 from handlers.message_handler import MessageHandler
+from handlers.webhook_dispatcher import WebhookDispatcher
+from handlers.event_deduplicator import EventDeduplicator
+from services.profile_service import ProfileService
 from utils.line_helper import show_loading_animation
+from utils.line_client import line_client
+from utils.logging_config import log_payload, logging_stats
+from utils.metrics import submit_in_context
 
 logger = logging.getLogger(__name__)
 
@@ -29,11 +33,42 @@ logger = logging.getLogger(__name__)
 linebot_bp = Blueprint('linebot', __name__)
 
 # LINE Bot 設定
-configuration = Configuration(access_token=Config.CHANNEL_ACCESS_TOKEN)
 line_handler = WebhookHandler(Config.CHANNEL_SECRET)
 
+# 資料儲存後端
+storage = get_storage_backend()
+
 # 初始化訊息處理器
-message_handler = MessageHandler(firebase_service)
+message_handler = MessageHandler(storage)
+
+# 使用者名稱快取
+profile_service = ProfileService(
+    storage,
+    line_client,
+    ttl=Config.LINE_PROFILE_CACHE_TTL,
+    stale_ttl=Config.LINE_PROFILE_STALE_TTL,
+    maxsize=Config.LINE_PROFILE_CACHE_SIZE
+)
+
+# Webhook 事件去重（LINE 逾時會重送事件）
+event_deduplicator = EventDeduplicator(
+    ttl=Config.WEBHOOK_DEDUP_TTL,
+    store=storage if Config.WEBHOOK_DEDUP_FIRESTORE else None
+)
+
+# 對外呼叫的執行緒池（WEBHOOK_FANOUT=true 時使用）
+outbound_executor = ThreadPoolExecutor(
+    max_workers=Config.OUTBOUND_WORKERS,
+    thread_name_prefix='line-outbound'
+)
+
+# Webhook 非同步處理器（WEBHOOK_ASYNC=true 時使用）
+webhook_dispatcher = WebhookDispatcher(
+    line_handler,
+    max_workers=Config.WEBHOOK_WORKERS,
+    max_queue_size=Config.WEBHOOK_QUEUE_SIZE,
+    drain_timeout=Config.WEBHOOK_DRAIN_TIMEOUT
+)
 
 
 @linebot_bp.route("/callback", methods=['POST'])
@@ -43,10 +78,17 @@ def callback():
 
     # get request body as text
     body = request.get_data(as_text=True)
-    logger.info("Request body: " + body)
+    log_payload(logger, 'callback', "Request body: %s", body)
 
     # handle webhook body
     try:
+        if Config.WEBHOOK_ASYNC:
+            # 非同步模式：驗證簽章後放入佇列，立即回應 LINE
+            if not line_handler.parser.signature_validator.validate(body, signature):
+                raise InvalidSignatureError(f"Invalid signature. signature={signature}")
+            if webhook_dispatcher.submit(body, signature):
+                return 'OK'
+
         line_handler.handle(body, signature)
     except InvalidSignatureError:
         logger.info("Invalid signature. Please check your channel access token/channel secret.")
@@ -54,9 +96,37 @@ def callback():
 
     return 'OK'
 
+
+@linebot_bp.route("/callback/metrics", methods=['GET'])
+def callback_metrics():
+    """Webhook 非同步佇列統計"""
+    return jsonify({
+        'async': Config.WEBHOOK_ASYNC,
+        'dispatcher': webhook_dispatcher.metrics(),
+        'line_client': line_client.stats(),
+        'profile_cache': profile_service.stats(),
+        'deduplication': event_deduplicator.stats(),
+        'logging': logging_stats()
+    })
+
+
+def _wait_for(future, description: str):
+    """等待單一對外呼叫完成（每個呼叫各自最多等待 OUTBOUND_TIMEOUT 秒），逾時或失敗時回傳 None"""
+    try:
+        return future.result(timeout=Config.OUTBOUND_TIMEOUT)
+    except FuturesTimeoutError:
+        logger.warning(f"{description}逾時")
+    except Exception as e:
+        logger.warning(f"{description}失敗: {e}")
+    return None
+
+
 @line_handler.add(MessageEvent, message=TextMessageContent)
 def handle_message(event):
     """處理文字訊息事件"""
+    if event_deduplicator.is_duplicate(event):
+        return
+
     try:
         # 取得訊息內容
         text = event.message.text
@@ -64,43 +134,49 @@ def handle_message(event):
         # 取得使用者資訊
         user_id = event.source.user_id
 
-        # 顯示 loading animation（僅限一對一聊天）
-        show_loading_animation(configuration, event, loading_seconds=10)
-
-        # 取得使用者名稱
-        user_name = "使用者"
-        with ApiClient(configuration) as api_client:
-            line_bot_api = MessagingApi(api_client)
-            try:
-                # 一對一取得使用者名稱
-                profile = line_bot_api.get_profile(user_id)
-                user_name = profile.display_name
-            except Exception as e:
-                # 如果無法取得名稱，使用預設值
-                logger.warning(f"無法取得使用者名稱: {e}")
-                user_name = "使用者"
-
-        # 處理訊息
-        result = message_handler.handle_text_message(
-            text=text,
-            user_id=user_id,
-            user_name=user_name
-        )
+        line_bot_api = line_client.messaging_api
+
+        if Config.WEBHOOK_FANOUT:
+            # 並行模式：loading animation 與使用者名稱查詢同時送出，建立回覆期間在背景執行；
+            # 回覆前逐一等待，每個呼叫各自有逾時上限
+            loading_future = submit_in_context(outbound_executor, show_loading_animation, event, 10)
+            name_future = submit_in_context(outbound_executor, profile_service.get_display_name,
+                                            user_id, default="使用者")
+
+            result = message_handler.build_reply(text)
+
+            user_name = _wait_for(name_future, f"取得使用者名稱（{user_id}）")
+            if user_name is not None:
+                store_future = submit_in_context(outbound_executor, message_handler.ensure_user,
+                                                 user_id, user_name)
+                _wait_for(store_future, f"更新使用者資料（{user_id}）")
+            _wait_for(loading_future, "顯示 loading animation")
+        else:
+            # 顯示 loading animation（僅限一對一聊天）
+            show_loading_animation(event, loading_seconds=10)
+
+            # 取得使用者名稱（快取 → users 集合 → LINE）
+            user_name = profile_service.get_display_name(user_id, default="使用者")
+
+            # 處理訊息
+            result = message_handler.handle_text_message(
+                text=text,
+                user_id=user_id,
+                user_name=user_name
+            )
 
         # 準備回覆訊息
         if isinstance(result, str):
             # 一般文字回應
-            reply_message = TextMessage(text=result)            
+            reply_message = TextMessage(text=result)
 
             # 回覆訊息
-            with ApiClient(configuration) as api_client:
-                line_bot_api = MessagingApi(api_client)
-                line_bot_api.reply_message(
-                    ReplyMessageRequest(
-                        reply_token=event.reply_token,
-                        messages=[reply_message]
-                    )
+            line_bot_api.reply_message(
+                ReplyMessageRequest(
+                    reply_token=event.reply_token,
+                    messages=[reply_message]
                 )
+            )
 
             logger.info(f"處理訊息成功: {text[:20]}...")
 
@@ -108,14 +184,12 @@ def handle_message(event):
         logger.error(f"處理訊息時發生錯誤: {e}")
         # 嘗試回覆錯誤訊息
         try:
-            with ApiClient(configuration) as api_client:
-                line_bot_api = MessagingApi(api_client)
-                line_bot_api.reply_message(
-                    ReplyMessageRequest(
-                        reply_token=event.reply_token,
-                        messages=[TextMessage(text="處理訊息時發生錯誤，請稍後再試")]
-                    )
+            line_client.messaging_api.reply_message(
+                ReplyMessageRequest(
+                    reply_token=event.reply_token,
+                    messages=[TextMessage(text="處理訊息時發生錯誤，請稍後再試")]
                 )
+            )
         except Exception as e:
             logger.error(f"回覆錯誤訊息失敗: {e}")
 
@@ -123,24 +197,21 @@ def handle_message(event):
 @line_handler.add(FollowEvent)
 def handle_follow(event):
     """處理使用者加入好友事件"""
+    if event_deduplicator.is_duplicate(event):
+        return
+
     try:
         user_id = event.source.user_id
 
-        with ApiClient(configuration) as api_client:
-            line_bot_api = MessagingApi(api_client)
+        line_bot_api = line_client.messaging_api
 
-            # 取得使用者資料
-            try:
-                profile = line_bot_api.get_profile(user_id)
-                user_name = profile.display_name
-            except Exception as e:
-                logger.error(f"取得使用者資料失敗: {e}")
-                user_name = "使用者"
+        # 取得使用者名稱（快取 → users 集合 → LINE）
+        user_name = profile_service.get_display_name(user_id, default="使用者")
 
-            # 建立使用者和聊天記錄
-            firebase_service.create_or_update_user(user_id, user_name)
+        # 建立使用者和聊天記錄
+        storage.create_or_update_user(user_id, user_name)
 
-            welcome_message = """👋 你好！我是記帳與待辦機器人
+        welcome_message = """👋 你好！我是記帳與待辦機器人
 
 我可以幫助你：
 💰 記錄個人支出
@@ -148,12 +219,12 @@ def handle_follow(event):
 
 請使用 LINE 選單開啟功能頁面"""
 
-            line_bot_api.reply_message(
-                ReplyMessageRequest(
-                    reply_token=event.reply_token,
-                    messages=[TextMessage(text=welcome_message)]
-                )
+        line_bot_api.reply_message(
+            ReplyMessageRequest(
+                reply_token=event.reply_token,
+                messages=[TextMessage(text=welcome_message)]
             )
+        )
 
         logger.info(f"使用者加入好友: {user_name} ({user_id})")
 
@@ -12,15 +12,87 @@ class Config:
     CHANNEL_ACCESS_TOKEN = os.getenv('CHANNEL_ACCESS_TOKEN')
     LIFF_ID = os.getenv('LIFF_ID', '')  # LIFF 應用程式 ID
 
+    # LINE API 連線配置
+    LINE_POOL_SIZE = int(os.getenv('LINE_POOL_SIZE', '10'))
+    LINE_CONNECT_TIMEOUT = float(os.getenv('LINE_CONNECT_TIMEOUT', '3'))  # 秒
+    LINE_READ_TIMEOUT = float(os.getenv('LINE_READ_TIMEOUT', '10'))  # 秒
+    LINE_API_HOST = os.getenv('LINE_API_HOST', '')  # 留空使用 https://api.line.me（壓力測試時可指向本機）
+
+    # LINE 使用者名稱快取配置
+    LINE_PROFILE_CACHE_SIZE = int(os.getenv('LINE_PROFILE_CACHE_SIZE', '2048'))
+    LINE_PROFILE_CACHE_TTL = int(os.getenv('LINE_PROFILE_CACHE_TTL', '3600'))  # 秒
+    LINE_PROFILE_STALE_TTL = int(os.getenv('LINE_PROFILE_STALE_TTL', '86400'))  # 秒
+
+    # Webhook 非同步處理配置
+    WEBHOOK_ASYNC = os.getenv('WEBHOOK_ASYNC', 'False').lower() == 'true'
+    WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '4'))
+    WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '100'))
+    WEBHOOK_DRAIN_TIMEOUT = float(os.getenv('WEBHOOK_DRAIN_TIMEOUT', '10'))  # 秒
+
+    # Webhook 事件去重配置（多實例部署時可啟用 Firestore 共用記錄）
+    WEBHOOK_DEDUP_TTL = int(os.getenv('WEBHOOK_DEDUP_TTL', '3600'))  # 秒
+    WEBHOOK_DEDUP_FIRESTORE = os.getenv('WEBHOOK_DEDUP_FIRESTORE', 'False').lower() == 'true'
+
+    # 事件內對外呼叫並行配置
+    WEBHOOK_FANOUT = os.getenv('WEBHOOK_FANOUT', 'True').lower() == 'true'
+    OUTBOUND_WORKERS = int(os.getenv('OUTBOUND_WORKERS', '8'))
+    OUTBOUND_TIMEOUT = float(os.getenv('OUTBOUND_TIMEOUT', '5'))  # 秒，回覆前等待每個對外呼叫的上限
+
     # Firebase 配置
     FIREBASE_CREDENTIALS = os.getenv('FIREBASE_CREDENTIALS', '')
 
+    # 資料儲存後端（firestore 或 memory；memory 僅供離線基準測試，資料不會保存）
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'firestore')
+    # 啟動時於背景執行緒預先建立儲存後端連線（true 時第一個請求不必等待客戶端建立）
+    STORAGE_WARMUP = os.getenv('STORAGE_WARMUP', 'False').lower() == 'true'
+
+    # 使用者資料快取配置
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '1024'))
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '600'))  # 秒
+
+    # 帳目編號配發配置（大於 1 時每個 worker 一次預留多個編號）
+    EXPENSE_NUMBER_BLOCK_SIZE = int(os.getenv('EXPENSE_NUMBER_BLOCK_SIZE', '1'))
+
+    # 群組刪除配置（true 時於背景分段刪除，API 立即回應）
+    GROUP_DELETE_ASYNC = os.getenv('GROUP_DELETE_ASYNC', 'True').lower() == 'true'
+    # 啟動時續刪中斷的群組刪除；租約期限內其他 worker 或實例不會重複續刪
+    GROUP_DELETE_RESUME = os.getenv('GROUP_DELETE_RESUME', 'True').lower() == 'true'
+    GROUP_DELETE_RESUME_LEASE = float(os.getenv('GROUP_DELETE_RESUME_LEASE', '300'))  # 秒
+
+    # ETag 配置（群組版本戳記於本機快取的秒數，多個 worker 時其他 worker 的寫入最多延遲此秒數才生效，
+    # 這段時間內其他 worker 仍可能回應 304；設為 0 則每次都讀取 Firestore）
+    ETAG_VERSION_TTL = float(os.getenv('ETAG_VERSION_TTL', '2'))
+
+    # 結算配置（true 時使用精確最少轉帳模式）
+    SETTLEMENT_EXACT_MODE = os.getenv('SETTLEMENT_EXACT_MODE', 'False').lower() == 'true'
+
     # Flask 配置
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 
+    # 正式環境 Web 伺服器配置（gunicorn.conf.py 使用）
+    PORT = int(os.getenv('PORT', '5000'))
+    WEB_WORKERS = int(os.getenv('WEB_CONCURRENCY', str(max(2, os.cpu_count() or 1))))
+    WEB_THREADS = int(os.getenv('WEB_THREADS', '8'))  # 每個 worker 的執行緒數（請求多在等待 Firestore 與 LINE API）
+    WEB_KEEPALIVE = int(os.getenv('WEB_KEEPALIVE', '75'))  # 秒，應大於前端負載平衡器的閒置逾時
+    WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', '30'))  # 秒，worker 無回應超過此時間即重啟
+    WEB_PRELOAD = os.getenv('WEB_PRELOAD', 'True').lower() == 'true'
+
+    # 就緒檢查配置（/ready）
+    READINESS_TIMEOUT = float(os.getenv('READINESS_TIMEOUT', '2'))  # 秒
+    READINESS_CACHE_TTL = float(os.getenv('READINESS_CACHE_TTL', '10'))  # 秒，避免頻繁檢查消耗讀取額度
+
+    # 效能量測配置（/metrics 與 Server-Timing 標頭）
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'True').lower() == 'true'
+
     # 日誌配置
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # text 或 json
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    LOG_PAYLOAD_MAX = int(os.getenv('LOG_PAYLOAD_MAX', '512'))
+    # 依路由設定內容日誌取樣率，例如 'callback=0.01,expense_detail=0.1'
+    LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', 'callback=0.01,expense_detail=0.1')
 
     @staticmethod
     def validate():
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""gunicorn 正式環境設定（數值來自 Config，可用環境變數調整）
+
+啟動方式（於專案根目錄，gunicorn 會自動讀取此檔案）：
+    gunicorn app:app
+
+- gthread worker：每個 worker process 以多個執行緒處理請求，等待 Firestore 與 LINE API 時不佔用整個 process
+- preload_app：master 先載入 app 再 fork，worker 共用已匯入的模組（啟動較快、記憶體較省）。
+  Firestore 與 LINE API 客戶端在 fork 後第一次使用時才於各 worker 建立（依 process ID 判斷），
+  日誌背景執行緒也會在 fork 後重新建立，因此不會在 process 之間共用連線
+- 啟動後的背景工作（STORAGE_WARMUP 預熱、續刪中斷的群組刪除）由各 worker 在 fork 後啟動
+"""
+
+from config import Config
+from utils import startup
+
+bind = f'0.0.0.0:{Config.PORT}'
+worker_class = 'gthread'
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+keepalive = Config.WEB_KEEPALIVE
+timeout = Config.WEB_TIMEOUT
+# 關閉 worker 時需等待 webhook 佇列處理完畢
+graceful_timeout = max(Config.WEB_TIMEOUT, int(Config.WEBHOOK_DRAIN_TIMEOUT) + 5)
+preload_app = Config.WEB_PRELOAD
+
+accesslog = None
+errorlog = '-'
+loglevel = Config.LOG_LEVEL.lower()
+
+# 背景工作改由 worker 啟動（master 不建立 gRPC 連線）
+startup.defer_background_tasks()
+
+
+def post_fork(server, worker):
+    from app import start_background_tasks
+    start_background_tasks()
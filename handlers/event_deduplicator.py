@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Webhook 事件去重 - 以 webhookEventId 過濾 LINE 重送的事件"""
+
+from typing import Dict
+import logging
+import threading
+
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class EventDeduplicator:
+    """以 webhookEventId 判斷事件是否已處理過
+
+    - 行程內以具 TTL 的集合記錄已處理的事件 ID
+    - 多實例部署時可啟用 Firestore 儲存（store），讓其他實例也能辨識重送事件：
+      本機未見過的每個事件（不論 isRedelivery）都會以一次 create 寫入記錄，
+      已存在時視為重複；首次送達的事件也必須寫入，重送到其他實例時才查得到
+    - isRedelivery 只用於統計，不影響是否查詢儲存
+    """
+
+    def __init__(self, ttl: float = 3600, maxsize: int = 10000, store=None):
+        self.ttl = ttl
+        self.store = store
+        self._seen = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._duplicates = 0
+        self._redeliveries = 0
+
+    def is_duplicate(self, event) -> bool:
+        """檢查並記錄事件，已處理過的事件回傳 True"""
+        event_id = getattr(event, 'webhook_event_id', None)
+        if not event_id:
+            return False
+
+        delivery_context = getattr(event, 'delivery_context', None)
+        is_redelivery = bool(delivery_context and delivery_context.is_redelivery)
+
+        with self._lock:
+            if is_redelivery:
+                self._redeliveries += 1
+            if event_id in self._seen:
+                self._duplicates += 1
+                logger.info(f"略過重複的 webhook 事件: {event_id}")
+                return True
+            self._seen.set(event_id, True)
+
+        if self.store is not None and not self._claim_in_store(event_id):
+            with self._lock:
+                self._duplicates += 1
+            logger.info(f"略過其他實例已處理的 webhook 事件: {event_id}")
+            return True
+
+        return False
+
+    def _claim_in_store(self, event_id: str) -> bool:
+        """於共用儲存記錄事件；儲存失敗時視為未處理過，避免遺漏事件"""
+        try:
+            return self.store.claim_webhook_event(event_id, self.ttl)
+        except Exception as e:
+            logger.warning(f"記錄 webhook 事件失敗: {e}")
+            return True
+
+    def stats(self) -> Dict:
+        """取得去重統計"""
+        with self._lock:
+            return {
+                'tracked': len(self._seen),
+                'redeliveries': self._redeliveries,
+                'duplicates': self._duplicates,
+                'shared_store': self.store is not None
+            }
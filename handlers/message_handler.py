@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from services.firebase_service import FirebaseService
+from services.storage_backend import StorageBackend
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,7 +9,7 @@ class MessageHandler:
     """訊息處理器（僅支援一對一聊天）"""
 
     def __init__(self, firebase_service):
-        self.firebase_service: FirebaseService = firebase_service
+        self.firebase_service: StorageBackend = firebase_service
 
     def handle_text_message(
         self,
@@ -22,8 +22,17 @@ class MessageHandler:
         返回回覆訊息
         """
         # 確保聊天和使用者存在
+        self.ensure_user(user_id, user_name)
+
+        return self.build_reply(text)
+
+    def ensure_user(self, user_id: str, user_name: str):
+        """確保使用者資料存在並為最新"""
         self.firebase_service.create_or_update_user(user_id, user_name)
 
+    @staticmethod
+    def build_reply(text: str) -> str:
+        """依文字指令產生回覆訊息"""
         # 主選單
         if text.strip() in ['主選單', '選單', 'menu', '說明', '幫助', 'help']:
             return '👋 歡迎使用記帳與待辦機器人\n\n請使用 LINE 選單開啟功能頁面'
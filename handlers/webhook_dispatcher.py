@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Webhook 非同步處理器 - 驗證簽章後放入佇列，由背景執行緒池處理事件"""
+
+from typing import Dict
+import atexit
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookDispatcher:
+    """以有界佇列與執行緒池處理 LINE webhook
+
+    - callback 只負責驗證簽章並呼叫 submit，立即回應 200
+    - 佇列已滿時 submit 回傳 False，由呼叫端改為同步處理（backpressure）
+    - 程式結束時會停止接收並等待佇列處理完畢
+    """
+
+    def __init__(self, line_handler, max_workers: int = 4, max_queue_size: int = 100,
+                 drain_timeout: float = 10):
+        self.line_handler = line_handler
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.drain_timeout = drain_timeout
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._workers = []
+        self._lock = threading.Lock()
+        self._accepting = True
+
+        # 統計資料
+        self._in_flight = 0
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._high_watermark = 0
+        self._total_wait = 0.0
+        self._total_processing = 0.0
+
+    def _ensure_workers(self):
+        """第一次使用時才啟動 worker（避免在 gunicorn preload 的 fork 前建立執行緒）"""
+        if self._workers:
+            return
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f'webhook-worker-{i}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+            atexit.register(self.shutdown)
+            logger.info(f"Webhook worker 已啟動: {self.max_workers} 個執行緒, 佇列上限 {self.max_queue_size}")
+
+    def submit(self, body: str, signature: str) -> bool:
+        """將已驗證簽章的 webhook 放入佇列
+
+        Returns:
+            是否成功放入佇列；False 表示佇列已滿或正在關閉
+        """
+        if not self._accepting:
+            return False
+
+        self._ensure_workers()
+
+        try:
+            self._queue.put_nowait((body, signature, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            logger.warning("Webhook 佇列已滿，改為同步處理")
+            return False
+
+        size = self._queue.qsize()
+        with self._lock:
+            if size > self._high_watermark:
+                self._high_watermark = size
+        return True
+
+    def _worker_loop(self):
+        """Worker 主迴圈"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+
+            body, signature, enqueued_at = item
+            started = time.monotonic()
+            with self._lock:
+                self._in_flight += 1
+                self._total_wait += started - enqueued_at
+
+            try:
+                self.line_handler.handle(body, signature)
+                failed = False
+            except Exception as e:
+                logger.error(f"背景處理 webhook 失敗: {e}", exc_info=True)
+                failed = True
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    self._total_processing += time.monotonic() - started
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._processed += 1
+                self._queue.task_done()
+
+    def shutdown(self, timeout: float = None):
+        """停止接收新的 webhook，並等待佇列中的事件處理完畢"""
+        if not self._accepting:
+            return
+        self._accepting = False
+
+        if not self._workers:
+            return
+
+        timeout = self.drain_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        remaining = self._queue.unfinished_tasks
+        if remaining:
+            logger.warning(f"Webhook 佇列關閉時仍有 {remaining} 筆未處理")
+        else:
+            logger.info("Webhook 佇列已處理完畢")
+
+        for _ in self._workers:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+
+    def metrics(self) -> Dict:
+        """取得佇列與處理統計"""
+        with self._lock:
+            completed = self._processed + self._failed
+            return {
+                'accepting': self._accepting,
+                'workers': len(self._workers),
+                'queue_size': self._queue.qsize(),
+                'max_queue_size': self.max_queue_size,
+                'high_watermark': self._high_watermark,
+                'in_flight': self._in_flight,
+                'processed': self._processed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'avg_wait_ms': (self._total_wait / completed * 1000) if completed else 0,
+                'avg_processing_ms': (self._total_processing / completed * 1000) if completed else 0
+            }
@@ -1,9 +1,16 @@
 from typing import Dict, List
 
+from models.snapshot import snapshot_data
+
 
 class Expense:
     """支出記錄資料模型"""
 
+    __slots__ = (
+        'id', 'group_id', 'payer_id', 'payer_name', 'amount', 'description',
+        'split_type', 'splits', 'created_by', 'expense_number', 'is_settled'
+    )
+
     def __init__(
         self,
         group_id: str,
@@ -65,10 +72,19 @@ class Expense:
             is_settled=data.get('is_settled', False)
         )
 
+    @staticmethod
+    def from_snapshot(snapshot) -> 'Expense':
+        """直接從 Firestore 文件快照建立"""
+        expense = Expense.from_dict(snapshot_data(snapshot))
+        expense.id = snapshot.id
+        return expense
+
 
 class ExpenseSplit:
     """分帳明細資料模型"""
 
+    __slots__ = ('user_id', 'user_name', 'amount', 'is_paid')
+
     def __init__(self, user_id: str, user_name: str, amount: float, is_paid: bool = False):
         self.user_id = user_id
         self.user_name = user_name
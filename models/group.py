@@ -7,6 +7,8 @@ import string
 class Group:
     """群組資料模型"""
 
+    __slots__ = ('group_name', 'created_by', 'group_code', 'members', 'is_active', 'created_at')
+
     def __init__(
         self,
         group_name: str,
@@ -1,9 +1,13 @@
 from typing import Dict, List
 
+from models.snapshot import snapshot_data
+
 
 class Settlement:
     """結算記錄資料模型"""
 
+    __slots__ = ('id', 'group_id', 'settlement_data', 'balance_summary', 'settled_by', 'settled_by_name')
+
     def __init__(
         self,
         group_id: str,
@@ -45,10 +49,19 @@ class Settlement:
             settled_by_name=data['settled_by_name']
         )
 
+    @staticmethod
+    def from_snapshot(snapshot) -> 'Settlement':
+        """直接從 Firestore 文件快照建立"""
+        settlement = Settlement.from_dict(snapshot_data(snapshot))
+        settlement.id = snapshot.id
+        return settlement
+
 
 class PaymentPlan:
     """還款計畫資料模型"""
 
+    __slots__ = ('from_user_id', 'from_user_name', 'to_user_id', 'to_user_name', 'amount')
+
     def __init__(
         self,
         from_user_id: str,
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""Firestore 文件快照轉接工具"""
+
+from typing import Any, Dict
+
+
+def snapshot_data(snapshot: Any) -> Dict:
+    """取得快照的欄位資料（透過公開的 to_dict()，文件不存在時回傳空字典）
+
+    回傳的字典為呼叫端獨有的複本，可直接修改。
+    """
+    return snapshot.to_dict() or {}
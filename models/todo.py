@@ -2,10 +2,18 @@
 from datetime import datetime
 from typing import Dict, Optional
 
+from models.snapshot import snapshot_data
+from utils.timestamp import to_datetime
+
 
 class Todo:
     """待辦事項模型"""
 
+    __slots__ = (
+        'id', 'group_id', 'title', 'description', 'category', 'assignee_id', 'assignee_name',
+        'status', 'priority', 'due_date', 'created_by', 'created_at', 'updated_at', 'completed_at'
+    )
+
     def __init__(self,
                  id: str,
                  group_id: str,
@@ -58,35 +66,6 @@ class Todo:
     @classmethod
     def from_dict(cls, data: Dict) -> 'Todo':
         """從字典建立"""
-        # 處理日期時間字串
-        created_at = None
-        updated_at = None
-        completed_at = None
-
-        if 'created_at' in data and data['created_at']:
-            if isinstance(data['created_at'], str):
-                created_at = datetime.fromisoformat(data['created_at'])
-            elif hasattr(data['created_at'], 'to_pydatetime'):
-                created_at = data['created_at'].to_pydatetime()
-            else:
-                created_at = data['created_at']
-
-        if 'updated_at' in data and data['updated_at']:
-            if isinstance(data['updated_at'], str):
-                updated_at = datetime.fromisoformat(data['updated_at'])
-            elif hasattr(data['updated_at'], 'to_pydatetime'):
-                updated_at = data['updated_at'].to_pydatetime()
-            else:
-                updated_at = data['updated_at']
-
-        if 'completed_at' in data and data['completed_at']:
-            if isinstance(data['completed_at'], str):
-                completed_at = datetime.fromisoformat(data['completed_at'])
-            elif hasattr(data['completed_at'], 'to_pydatetime'):
-                completed_at = data['completed_at'].to_pydatetime()
-            else:
-                completed_at = data['completed_at']
-
         return cls(
             id=data.get('id', ''),
             group_id=data.get('group_id', ''),
@@ -99,7 +78,14 @@ class Todo:
             priority=data.get('priority', 'medium'),
             due_date=data.get('due_date'),
             created_by=data.get('created_by', ''),
-            created_at=created_at,
-            updated_at=updated_at,
-            completed_at=completed_at
+            created_at=to_datetime(data.get('created_at')),
+            updated_at=to_datetime(data.get('updated_at')),
+            completed_at=to_datetime(data.get('completed_at'))
         )
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> 'Todo':
+        """直接從 Firestore 文件快照建立"""
+        todo = cls.from_dict(snapshot_data(snapshot))
+        todo.id = snapshot.id
+        return todo
@@ -4,6 +4,8 @@ from typing import Dict
 class User:
     """使用者資料模型"""
 
+    __slots__ = ('line_user_id', 'display_name')
+
     def __init__(self, line_user_id: str, display_name: str):
         self.line_user_id = line_user_id
         self.display_name = display_name
@@ -2,18 +2,47 @@ import firebase_admin
 from firebase_admin import credentials, firestore
 from google.cloud.firestore_v1 import Query
 from google.cloud.firestore_v1.base_query import FieldFilter
-from google.cloud.firestore import SERVER_TIMESTAMP, ArrayUnion
-from typing import Optional, Dict, List, Any
+from google.cloud.firestore import SERVER_TIMESTAMP, ArrayUnion, Client
+from google.api_core.exceptions import AlreadyExists
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, List, Any, Callable
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import os
+import socket
+import threading
+
+from services.storage_backend import StorageBackend
+from utils.cache import TTLCache
+from utils.timestamp import normalize_timestamps
+from models.snapshot import snapshot_data
 
 logger = logging.getLogger(__name__)
 
 
-class FirebaseService:
-    """Firebase Firestore 服務類"""
+class FirebaseService(StorageBackend):
+    """Firebase Firestore 服務類（Firestore 儲存後端）"""
 
     _instance = None
     _db = None
+    # 建立 _db 的 process（fork 後需在子 process 重新建立 gRPC 連線）
+    _db_pid = None
+    _init_lock = threading.Lock()
+    _user_cache = None
+
+    # 區塊配發模式下，各群組尚未使用的帳目編號 {group_id: [next, end]}
+    _expense_blocks: Dict[str, List[int]] = {}
+    _expense_block_lock = threading.Lock()
+
+    # 背景刪除中的群組
+    _deleting_groups = set()
+    _deletion_lock = threading.Lock()
+
+    # db.get_all 單次批次讀取的文件數上限
+    USERS_BATCH_SIZE = 100
+
+    # 單一 WriteBatch 的寫入數上限（Firestore 限制為 500）
+    DELETE_BATCH_SIZE = 500
 
     def __new__(cls):
         """單例模式確保只有一個 Firebase 連接"""
@@ -22,45 +51,92 @@ class FirebaseService:
         return cls._instance
 
     def __init__(self):
-        """初始化 Firebase"""
-        if self._db is None:
-            self._initialize_firebase()
+        """初始化快取；Firestore 客戶端延遲到第一次使用時才建立"""
+        if self._user_cache is None:
+            from config import Config
+            self._user_cache = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
 
     def _initialize_firebase(self):
-        """初始化 Firebase Admin SDK"""
+        """初始化 Firebase Admin SDK 並建立目前 process 的 Firestore 客戶端"""
         try:
             from config import Config
+            from utils import startup
             import json
-
-            firebase_config = Config.FIREBASE_CREDENTIALS
-
-            if not firebase_config:
-                raise ValueError("FIREBASE_CREDENTIALS 環境變數未設定")
-
-            # 解析 JSON 字串
-            cred_dict = json.loads(firebase_config)
-
-            cred = credentials.Certificate(cred_dict)
-            firebase_admin.initialize_app(cred)
-            self._db = firestore.client()
-            logger.info("Firebase 初始化成功")
+            import time
+
+            started = time.perf_counter()
+            try:
+                app = firebase_admin.get_app()
+            except ValueError:
+                firebase_config = Config.FIREBASE_CREDENTIALS
+
+                if not firebase_config:
+                    raise ValueError("FIREBASE_CREDENTIALS 環境變數未設定")
+
+                # 解析 JSON 字串
+                cred_dict = json.loads(firebase_config)
+
+                cred = credentials.Certificate(cred_dict)
+                app = firebase_admin.initialize_app(cred)
+
+            # 不使用 firestore.client() 的快取，fork 後的子 process 需要各自的 gRPC 連線
+            FirebaseService._db = Client(
+                credentials=app.credential.get_credential(),
+                project=app.project_id,
+            )
+            FirebaseService._db_pid = os.getpid()
+            elapsed = time.perf_counter() - started
+            startup.record('storage_client', elapsed)
+            logger.info(f"Firebase 初始化成功 ({elapsed:.3f}s)")
         except Exception as e:
             logger.error(f"Firebase 初始化失敗: {e}")
             raise
 
     @property
     def db(self):
-        """取得 Firestore 資料庫實例"""
+        """取得 Firestore 資料庫實例（第一次使用時建立，執行緒安全）"""
+        if self._db is None or self._db_pid != os.getpid():
+            with self._init_lock:
+                if self._db is None or self._db_pid != os.getpid():
+                    self._initialize_firebase()
         return self._db
 
+    def ping(self, timeout: Optional[float] = None):
+        """讀取一份文件確認 Firestore 可連線（第一次呼叫時會建立客戶端）"""
+        self.db.collection('group_versions').document('_ping').get(timeout=timeout)
+
+    @staticmethod
+    def _document_to_dict(snapshot) -> Dict:
+        """將文件轉為字典並加上 id，時間欄位於讀取時統一轉為 datetime"""
+        data = normalize_timestamps(snapshot_data(snapshot))
+        data['id'] = snapshot.id
+        return data
+
     # ===== 使用者相關操作 =====
 
     def create_or_update_user(self, line_user_id: str, display_name: str, picture_url: str = '') -> Dict:
-        """建立或更新使用者"""
-        user_ref = self._db.collection('users').document(line_user_id)
-        user_data = user_ref.get()
+        """建立或更新使用者
 
-        if user_data.exists:
+        若快取中的資料與傳入的 display_name / picture_url 相同，則略過 Firestore 寫入
+        """
+        cached = self._user_cache.get(line_user_id)
+        if cached is not None and self._is_same_profile(cached, display_name, picture_url):
+            return {'line_user_id': line_user_id, 'display_name': display_name}
+
+        user_ref = self.db.collection('users').document(line_user_id)
+        if cached is None:
+            user_data = user_ref.get()
+            exists = user_data.exists
+            if exists:
+                # 與 get_user / get_users 相同，快取前先統一時間欄位型別
+                cached = normalize_timestamps(user_data.to_dict())
+                if self._is_same_profile(cached, display_name, picture_url):
+                    self._user_cache.set(line_user_id, cached)
+                    return {'line_user_id': line_user_id, 'display_name': display_name}
+        else:
+            exists = True
+
+        if exists:
             # 更新使用者
             update_data = {
                 'display_name': display_name,
@@ -69,6 +145,11 @@ class FirebaseService:
             if picture_url:
                 update_data['picture_url'] = picture_url
             user_ref.update(update_data)
+
+            profile = dict(cached)
+            profile['display_name'] = display_name
+            if picture_url:
+                profile['picture_url'] = picture_url
         else:
             # 建立新使用者
             user_ref.set({
@@ -79,17 +160,76 @@ class FirebaseService:
                 'updated_at': SERVER_TIMESTAMP
             })
 
+            profile = {
+                'line_user_id': line_user_id,
+                'display_name': display_name,
+                'picture_url': picture_url
+            }
+
+        self._user_cache.set(line_user_id, profile)
+
         return {'line_user_id': line_user_id, 'display_name': display_name}
 
     def get_user(self, line_user_id: str) -> Optional[Dict]:
-        """取得使用者資料"""
-        user_ref = self._db.collection('users').document(line_user_id)
+        """取得使用者資料（優先使用快取）"""
+        cached = self._user_cache.get(line_user_id)
+        if cached is not None:
+            return dict(cached)
+
+        user_ref = self.db.collection('users').document(line_user_id)
         user_data = user_ref.get()
 
         if user_data.exists:
-            return user_data.to_dict()
+            data = normalize_timestamps(user_data.to_dict())
+            self._user_cache.set(line_user_id, data)
+            return dict(data)
         return None
 
+    def invalidate_user(self, line_user_id: str):
+        """使快取中的使用者資料失效"""
+        self._user_cache.invalidate(line_user_id)
+
+    def get_user_cache_stats(self) -> Dict:
+        """取得使用者快取的命中統計"""
+        return self._user_cache.stats()
+
+    def get_users(self, line_user_ids: List[str]) -> Dict[str, Dict]:
+        """批次取得多位使用者資料
+
+        使用 db.get_all 一次取回多筆文件，並依 USERS_BATCH_SIZE 分段，
+        避免逐一呼叫 get_user 造成 N 次往返。
+
+        Args:
+            line_user_ids: 使用者 ID 列表
+
+        Returns:
+            {user_id: 使用者資料}，不存在的使用者不會出現在結果中
+        """
+        # 去除重複與空值，保留原始順序
+        unique_ids = list(dict.fromkeys(uid for uid in line_user_ids if uid))
+
+        # 先從快取取得，僅讀取未命中的使用者
+        result = {}
+        missing_ids = []
+        for uid in unique_ids:
+            cached = self._user_cache.get(uid)
+            if cached is not None:
+                result[uid] = dict(cached)
+            else:
+                missing_ids.append(uid)
+
+        users_ref = self.db.collection('users')
+        for start in range(0, len(missing_ids), self.USERS_BATCH_SIZE):
+            chunk = missing_ids[start:start + self.USERS_BATCH_SIZE]
+            refs = [users_ref.document(uid) for uid in chunk]
+            for snapshot in self.db.get_all(refs):
+                if snapshot.exists:
+                    data = normalize_timestamps(snapshot.to_dict())
+                    self._user_cache.set(snapshot.id, data)
+                    result[snapshot.id] = dict(data)
+
+        return result
+
     # ===== 群組相關操作 =====
 
     def create_group(self, group_name: str, created_by: str) -> Dict:
@@ -110,9 +250,11 @@ class FirebaseService:
 
             # created_at 使用 SERVER_TIMESTAMP
             group_data['created_at'] = SERVER_TIMESTAMP
+            # 帳目編號計數器
+            group_data['expense_counter'] = 0
 
             # 建立文件
-            doc_ref = self._db.collection('groups').document()
+            doc_ref = self.db.collection('groups').document()
             doc_ref.set(group_data)
 
             logger.info(f"群組 {group_name} (code: {group.group_code}) 建立成功")
@@ -137,14 +279,13 @@ class FirebaseService:
             群組資料或 None
         """
         try:
-            groups = self._db.collection('groups')\
+            groups = self.db.collection('groups')\
                 .where(filter=FieldFilter('group_code', '==', group_code))\
                 .limit(1)\
                 .stream()
 
             for group in groups:
-                data = group.to_dict()
-                data['id'] = group.id
+                data = self._document_to_dict(group)
                 return data
 
             return None
@@ -163,7 +304,7 @@ class FirebaseService:
             是否成功加入
         """
         try:
-            group_ref = self._db.collection('groups').document(group_id)
+            group_ref = self.db.collection('groups').document(group_id)
             group_ref.update({
                 'members': ArrayUnion([user_id])
             })
@@ -173,26 +314,31 @@ class FirebaseService:
             logger.error(f"加入群組失敗: {e}")
             return False
 
-    def get_user_groups(self, user_id: str) -> List[Dict]:
+    def get_user_groups(self, user_id: str, fields: Optional[List[str]] = None) -> List[Dict]:
         """取得使用者加入的所有群組
 
         Args:
             user_id: 使用者 ID
+            fields: 只取得指定欄位（Firestore select），None 表示取得完整文件
 
         Returns:
             群組列表
         """
+        fields = self._normalize_fields(fields)
         try:
-            groups = self._db.collection('groups')\
+            query = self.db.collection('groups')\
                 .where(filter=FieldFilter('members', 'array_contains', user_id))\
                 .where(filter=FieldFilter('is_active', '==', True))\
-                .order_by('created_at', direction=Query.DESCENDING)\
-                .stream()
+                .order_by('created_at', direction=Query.DESCENDING)
+
+            if fields is not None:
+                query = query.select(fields)
+
+            groups = query.stream()
 
             result = []
             for group in groups:
-                data = group.to_dict()
-                data['id'] = group.id
+                data = self._document_to_dict(group)
                 result.append(data)
 
             return result
@@ -200,179 +346,601 @@ class FirebaseService:
             logger.error(f"取得使用者群組失敗: {e}")
             return []
 
-    def delete_group(self, group_id: str) -> bool:
+    def delete_group(self, group_id: str, parallel: bool = False,
+                     progress_callback: Optional[Callable[[str, int], None]] = None) -> bool:
         """刪除群組及其所有相關資料
 
+        各集合以 key-only 查詢分段讀取，每段以不超過 DELETE_BATCH_SIZE 筆的 batch 提交，
+        避免超過 Firestore 單一 batch 500 筆寫入的限制。刪除過程可重複執行（中斷後可續刪）。
+
         Args:
             group_id: 群組 ID
+            parallel: 是否平行刪除各集合
+            progress_callback: 進度回呼 (collection, 已刪除筆數)
 
         Returns:
             是否成功刪除
         """
         try:
-            # 使用 batch 操作確保原子性
-            batch = self._db.batch()
-
-            # 1. 刪除群組的所有 expenses
-            expenses = self._db.collection('expenses')\
-                .where(filter=FieldFilter('group_id', '==', group_id))\
-                .stream()
+            collections = ['expenses', 'todos', 'settlements']
+
+            if parallel:
+                with ThreadPoolExecutor(max_workers=len(collections)) as executor:
+                    futures = [
+                        executor.submit(self._delete_group_documents, collection, group_id, progress_callback)
+                        for collection in collections
+                    ]
+                    deleted = {collection: future.result() for collection, future in zip(collections, futures)}
+            else:
+                deleted = {
+                    collection: self._delete_group_documents(collection, group_id, progress_callback)
+                    for collection in collections
+                }
+
+            # 最後刪除群組收支帳本與群組本身（群組文件保留到最後，作為續刪的標記）
+            batch = self.db.batch()
+            batch.delete(self._balances_ref(group_id))
+            batch.delete(self._todo_meta_ref(group_id))
+            batch.delete(self.db.collection('group_versions').document(group_id))
+            batch.delete(self.db.collection('groups').document(group_id))
+            batch.commit()
 
-            for expense in expenses:
-                batch.delete(expense.reference)
+            logger.info(f"群組 {group_id} 及其所有相關資料已刪除: {deleted}")
+            return True
+        except Exception as e:
+            logger.error(f"刪除群組失敗: {e}")
+            return False
 
-            # 2. 刪除群組的所有 todos
-            todos = self._db.collection('todos')\
-                .where(filter=FieldFilter('group_id', '==', group_id))\
-                .stream()
+    def _delete_group_documents(self, collection: str, group_id: str,
+                                progress_callback: Optional[Callable[[str, int], None]] = None) -> int:
+        """分段刪除集合中屬於群組的所有文件
 
-            for todo in todos:
-                batch.delete(todo.reference)
+        Returns:
+            刪除的文件數
+        """
+        query = self.db.collection(collection)\
+            .where(filter=FieldFilter('group_id', '==', group_id))\
+            .select([])\
+            .limit(self.DELETE_BATCH_SIZE)
+
+        deleted = 0
+        while True:
+            docs = list(query.stream())
+            if not docs:
+                break
+
+            batch = self.db.batch()
+            for doc in docs:
+                batch.delete(doc.reference)
+            batch.commit()
 
-            # 3. 刪除群組的所有 settlements
-            settlements = self._db.collection('settlements')\
-                .where(filter=FieldFilter('group_id', '==', group_id))\
-                .stream()
+            deleted += len(docs)
+            if progress_callback:
+                progress_callback(collection, deleted)
 
-            for settlement in settlements:
-                batch.delete(settlement.reference)
+        return deleted
 
-            # 4. 刪除群組本身
-            group_ref = self._db.collection('groups').document(group_id)
-            batch.delete(group_ref)
+    def start_group_deletion(self, group_id: str) -> bool:
+        """將群組標記為刪除中，並於背景執行緒完成刪除
 
-            # 提交批次操作
-            batch.commit()
+        群組會立即設為 is_active=False，不再出現在群組列表中；
+        若背景刪除因 process 結束而中斷，下次啟動時由 resume_group_deletions 續刪（見 app.py）。
 
-            logger.info(f"群組 {group_id} 及其所有相關資料已刪除")
-            return True
+        Returns:
+            是否成功排程刪除
+        """
+        try:
+            self.db.collection('groups').document(group_id).update({
+                'is_active': False,
+                'deletion_status': 'pending',
+                'deletion_requested_at': SERVER_TIMESTAMP
+            })
         except Exception as e:
-            logger.error(f"刪除群組失敗: {e}")
+            logger.error(f"標記群組刪除失敗: {e}")
             return False
 
+        with self._deletion_lock:
+            if group_id in self._deleting_groups:
+                return True
+            self._deleting_groups.add(group_id)
+
+        def _run():
+            try:
+                self.delete_group(
+                    group_id,
+                    parallel=True,
+                    progress_callback=lambda collection, count: logger.info(
+                        f"群組 {group_id} 刪除進度 - {collection}: {count}"
+                    )
+                )
+            finally:
+                with self._deletion_lock:
+                    self._deleting_groups.discard(group_id)
+
+        threading.Thread(target=_run, name=f'delete-group-{group_id}', daemon=True).start()
+        return True
+
+    def resume_group_deletions(self) -> int:
+        """重新排程所有尚未完成的群組刪除（啟動時由取得租約的一個 process 呼叫）
+
+        Returns:
+            重新排程的群組數
+        """
+        groups = self.db.collection('groups')\
+            .where(filter=FieldFilter('deletion_status', '==', 'pending'))\
+            .select([])\
+            .stream()
+
+        count = 0
+        for group in groups:
+            if self.start_group_deletion(group.id):
+                count += 1
+
+        return count
+
     # ===== 支出記錄相關操作 =====
 
     def create_expense(self, expense_data: Dict) -> str:
-        """建立支出記錄"""
-        # 取得群組內的下一個帳目編號
-        expense_number = self._get_next_expense_number(expense_data['group_id'])
+        """建立支出記錄
+
+        帳目編號由群組文件上的 expense_counter 計數器配發：
+        - 預設模式：在同一個 transaction 內遞增計數器並寫入支出記錄
+        - 區塊配發模式（EXPENSE_NUMBER_BLOCK_SIZE > 1）：每個 worker 一次預留多個編號，
+          之後的新增不需再經過群組文件（編號可能因 worker 重啟而不連續）
+
+        Raises:
+            LookupError: 群組不存在
+        """
+        from config import Config
 
-        expense_data['expense_number'] = expense_number
+        group_id = expense_data['group_id']
         expense_data['created_at'] = SERVER_TIMESTAMP
         expense_data['is_settled'] = False
+        expense_data['split_count'] = len(expense_data.get('splits', []))
 
-        doc_ref = self._db.collection('expenses').add(expense_data)
-        return doc_ref[1].id
+        expense_ref = self.db.collection('expenses').document()
+
+        if Config.EXPENSE_NUMBER_BLOCK_SIZE > 1:
+            expense_data['expense_number'] = self._allocate_expense_number(
+                group_id, Config.EXPENSE_NUMBER_BLOCK_SIZE
+            )
+
+            @firestore.transactional
+            def _create_with_reserved_number(transaction):
+                ledger = self._read_ledger(transaction, group_id)
+                transaction.set(expense_ref, expense_data)
+                self._apply_balance_delta(transaction, group_id, ledger, new_expense=expense_data)
+
+            _create_with_reserved_number(self.db.transaction())
+            return expense_ref.id
+
+        group_ref = self.db.collection('groups').document(group_id)
+
+        @firestore.transactional
+        def _create_in_transaction(transaction):
+            # transaction 內所有讀取必須在寫入之前
+            expense_number = self._read_expense_counter(transaction, group_id) + 1
+            ledger = self._read_ledger(transaction, group_id)
+            expense_data['expense_number'] = expense_number
+            transaction.update(group_ref, {'expense_counter': expense_number})
+            transaction.set(expense_ref, expense_data)
+            self._apply_balance_delta(transaction, group_id, ledger, new_expense=expense_data)
+
+        _create_in_transaction(self.db.transaction())
+        return expense_ref.id
+
+    def _read_expense_counter(self, transaction, group_id: str) -> int:
+        """在 transaction 內讀取群組目前的帳目編號計數器
+
+        舊群組尚未有 expense_counter 時，以既有帳目的最大編號作為初始值
+
+        Raises:
+            LookupError: 群組不存在（避免之後寫入計數器時建立沒有其他欄位的群組文件）
+        """
+        group_ref = self.db.collection('groups').document(group_id)
+        group_snapshot = group_ref.get(transaction=transaction)
+        if not group_snapshot.exists:
+            raise LookupError(f'群組不存在: {group_id}')
+        counter = snapshot_data(group_snapshot).get('expense_counter')
+
+        if counter is None:
+            counter = self._get_next_expense_number(group_id, transaction=transaction) - 1
+
+        return counter
 
-    def _get_next_expense_number(self, group_id: str) -> int:
-        """取得群組內的下一個帳目編號"""
-        expenses = self._db.collection('expenses')\
+    def _allocate_expense_number(self, group_id: str, block_size: int) -> int:
+        """從本 worker 預留的編號區塊配發帳目編號，區塊用盡時再向群組計數器預留
+
+        鎖只保護本機的區塊資料；預留新區塊的 transaction 在鎖外執行，不會阻塞其他群組的新增。
+        同一群組同時預留多個區塊時，未使用的編號會被捨棄（編號不連續但不會重複）
+        """
+        with self._expense_block_lock:
+            number = self._take_reserved_number(group_id)
+        if number is not None:
+            return number
+
+        group_ref = self.db.collection('groups').document(group_id)
+
+        @firestore.transactional
+        def _reserve_block(transaction):
+            start = self._read_expense_counter(transaction, group_id) + 1
+            end = start + block_size - 1
+            transaction.update(group_ref, {'expense_counter': end})
+            return start, end
+
+        start, end = _reserve_block(self.db.transaction())
+        logger.info(f"群組 {group_id} 預留帳目編號 {start}-{end}")
+
+        with self._expense_block_lock:
+            block = self._expense_blocks.get(group_id)
+            # 其他執行緒已預留新區塊時沿用該區塊，本次區塊只使用第一個編號
+            if not block or block[0] > block[1]:
+                self._expense_blocks[group_id] = [start + 1, end]
+        return start
+
+    def _take_reserved_number(self, group_id: str) -> Optional[int]:
+        """從已預留的區塊取出下一個編號，區塊用盡時回傳 None（呼叫端需持有 _expense_block_lock）"""
+        block = self._expense_blocks.get(group_id)
+        if block and block[0] <= block[1]:
+            number = block[0]
+            block[0] += 1
+            return number
+        return None
+
+    def _get_next_expense_number(self, group_id: str, transaction=None) -> int:
+        """以既有帳目的最大編號推算下一個帳目編號（僅用於初始化計數器）"""
+        query = self.db.collection('expenses')\
             .where(filter=FieldFilter('group_id', '==', group_id))\
             .order_by('expense_number', direction=Query.DESCENDING)\
-            .limit(1)\
-            .stream()
+            .limit(1)
 
-        for expense in expenses:
+        for expense in query.stream(transaction=transaction):
             return expense.to_dict().get('expense_number', 0) + 1
 
         return 1
 
     def get_expense(self, expense_id: str) -> Optional[Dict]:
         """取得單筆支出記錄"""
-        expense_ref = self._db.collection('expenses').document(expense_id)
+        expense_ref = self.db.collection('expenses').document(expense_id)
         expense_data = expense_ref.get()
 
         if expense_data.exists:
-            data = expense_data.to_dict()
-            data['id'] = expense_id
+            data = self._document_to_dict(expense_data)
             return data
         return None
 
-    def get_group_expenses(self, group_id: str, is_settled: bool = None, limit: int = 50) -> List[Dict]:
-        """取得群組的支出記錄
+    def get_group_expenses(self, group_id: str, is_settled: bool = None, limit: int = 50,
+                           start_after: Optional[str] = None,
+                           fields: Optional[List[str]] = None) -> List[Dict]:
+        """取得群組的支出記錄（依 created_at 由新到舊）
 
         Args:
             group_id: 群組 ID
             is_settled: 是否已結算。None 表示取得所有帳目（不過濾）
             limit: 限制回傳數量
+            start_after: 分頁游標，從此支出記錄 ID 之後開始取得
+            fields: 只取得指定欄位（Firestore select），None 表示取得完整文件
 
         Returns:
             支出記錄列表
+
+        Raises:
+            ValueError: 分頁游標或欄位名稱不合法
         """
-        # 如果 is_settled 為 None，分別查詢未結算和已結算的帳目，然後合併
-        if is_settled is None:
-            unsettled = self.get_group_expenses(group_id, is_settled=False, limit=limit)
-            settled = self.get_group_expenses(group_id, is_settled=True, limit=limit)
-            # 合併並按 created_at 排序
-            all_expenses = unsettled + settled
-            all_expenses.sort(key=lambda x: x.get('created_at'), reverse=True)
-            return all_expenses[:limit]
-
-        # 原有邏輯：查詢特定 is_settled 狀態的帳目
-        expenses = self._db.collection('expenses')\
-            .where(filter=FieldFilter('group_id', '==', group_id))\
-            .where(filter=FieldFilter('is_settled', '==', is_settled))\
-            .order_by('created_at', direction=Query.DESCENDING)\
-            .limit(limit)\
-            .stream()
+        fields = self._normalize_fields(fields)
+
+        query = self.db.collection('expenses')\
+            .where(filter=FieldFilter('group_id', '==', group_id))
+
+        if is_settled is not None:
+            query = query.where(filter=FieldFilter('is_settled', '==', is_settled))
+
+        query = query.order_by('created_at', direction=Query.DESCENDING)
+
+        if start_after:
+            cursor_snapshot = self.db.collection('expenses').document(start_after).get()
+            if not cursor_snapshot.exists or cursor_snapshot.to_dict().get('group_id') != group_id:
+                raise ValueError('無效的分頁游標')
+            query = query.start_after(cursor_snapshot)
+
+        if limit:
+            query = query.limit(limit)
+
+        if fields is not None:
+            query = query.select(fields)
 
         result = []
-        for expense in expenses:
-            data = expense.to_dict()
-            data['id'] = expense.id
+        for expense in query.stream():
+            data = self._document_to_dict(expense)
             result.append(data)
 
+        if fields is not None and 'split_count' in fields:
+            self._fill_split_counts(result)
+
         return result
 
+    def _fill_split_counts(self, expenses: List[Dict]):
+        """舊支出記錄沒有 split_count：只對這些記錄讀取 splits 並於記憶體計算（不寫回）"""
+        missing = {expense['id']: expense for expense in expenses if 'split_count' not in expense}
+        if not missing:
+            return
+
+        expenses_ref = self.db.collection('expenses')
+        refs = [expenses_ref.document(expense_id) for expense_id in missing]
+        for snapshot in self.db.get_all(refs, field_paths=['splits']):
+            if snapshot.exists:
+                missing[snapshot.id]['split_count'] = len(snapshot_data(snapshot).get('splits') or [])
+
     def get_expense_by_number(self, group_id: str, expense_number: int) -> Optional[Dict]:
         """根據帳目編號取得支出記錄"""
-        expenses = self._db.collection('expenses')\
+        expenses = self.db.collection('expenses')\
             .where(filter=FieldFilter('group_id', '==', group_id))\
             .where(filter=FieldFilter('expense_number', '==', expense_number))\
             .limit(1)\
             .stream()
 
         for expense in expenses:
-            data = expense.to_dict()
-            data['id'] = expense.id
+            data = self._document_to_dict(expense)
             return data
 
         return None
 
+    def update_expense(self, expense_id: str, updates: Dict) -> bool:
+        """更新支出記錄，並同步更新群組收支帳本"""
+        try:
+            expense_ref = self.db.collection('expenses').document(expense_id)
+
+            @firestore.transactional
+            def _update_in_transaction(transaction):
+                snapshot = expense_ref.get(transaction=transaction)
+                if not snapshot.exists:
+                    raise ValueError('支出記錄不存在')
+
+                old_expense = snapshot.to_dict()
+                ledger = self._read_ledger(transaction, old_expense['group_id'])
+                if 'splits' in updates:
+                    updates['split_count'] = len(updates['splits'])
+                new_expense = {**old_expense, **updates}
+
+                transaction.update(expense_ref, updates)
+                self._apply_balance_delta(
+                    transaction,
+                    old_expense['group_id'],
+                    ledger,
+                    old_expense=old_expense,
+                    new_expense=new_expense
+                )
+
+            _update_in_transaction(self.db.transaction())
+            return True
+        except Exception as e:
+            logger.error(f"更新支出記錄失敗: {e}")
+            return False
+
     def delete_expense(self, expense_id: str) -> bool:
-        """刪除支出記錄"""
+        """刪除支出記錄，並同步更新群組收支帳本"""
         try:
-            self._db.collection('expenses').document(expense_id).delete()
+            expense_ref = self.db.collection('expenses').document(expense_id)
+
+            @firestore.transactional
+            def _delete_in_transaction(transaction):
+                snapshot = expense_ref.get(transaction=transaction)
+                if not snapshot.exists:
+                    return
+
+                old_expense = snapshot.to_dict()
+                ledger = self._read_ledger(transaction, old_expense['group_id'])
+                transaction.delete(expense_ref)
+                self._apply_balance_delta(transaction, old_expense['group_id'], ledger, old_expense=old_expense)
+
+            _delete_in_transaction(self.db.transaction())
             return True
         except Exception as e:
             logger.error(f"刪除支出記錄失敗: {e}")
             return False
 
-    def settle_expenses(self, group_id: str):
-        """將群組的所有未結算支出標記為已結算"""
-        expenses = self._db.collection('expenses')\
+    def settle_expenses(self, group_id: str, settlement_id: str, expense_ids: List[str]) -> int:
+        """將結算記錄包含的支出標記為已結算，並從群組收支帳本扣除
+
+        只處理計算結算時包含的支出（expense_ids），之後新增的支出不會被標記，收支也保留在帳本中。
+        每段在同一個 transaction 內標記 settlement_id 並扣除這些支出的收支；
+        已結算或已刪除的支出會略過，因此中途失敗後以相同參數重試即可從中斷處繼續。
+
+        Args:
+            group_id: 群組 ID
+            settlement_id: create_settlement 回傳的結算記錄 ID
+            expense_ids: 結算包含的支出記錄 ID
+
+        Returns:
+            本次標記的支出數量
+        """
+        expenses_ref = self.db.collection('expenses')
+        # 保留一筆寫入給帳本（單一 transaction 的寫入數上限為 500）
+        chunk_size = self.DELETE_BATCH_SIZE - 1
+
+        @firestore.transactional
+        def _settle_chunk(transaction, refs) -> int:
+            # transaction 內所有讀取必須在寫入之前
+            ledger = self._read_ledger(transaction, group_id)
+            snapshots = list(self.db.get_all(refs, transaction=transaction))
+
+            settled = 0
+            for snapshot in snapshots:
+                if not snapshot.exists:
+                    continue
+                expense = snapshot.to_dict()
+                if expense.get('group_id') != group_id or expense.get('is_settled'):
+                    continue
+                transaction.update(snapshot.reference, {
+                    'is_settled': True,
+                    'settlement_id': settlement_id
+                })
+                ledger = self._apply_to_ledger(ledger, *self._balance_delta(old_expense=expense))
+                settled += 1
+
+            if settled:
+                self._write_ledger(transaction, group_id, ledger)
+            return settled
+
+        settled = 0
+        for start in range(0, len(expense_ids), chunk_size):
+            refs = [expenses_ref.document(expense_id) for expense_id in expense_ids[start:start + chunk_size]]
+            settled += _settle_chunk(self.db.transaction(), refs)
+
+        # 全部標記完成後，將結算記錄標記為完成
+        self.db.collection('settlements').document(settlement_id).update({'status': 'completed'})
+
+        logger.info(f"群組 {group_id} 已結算 {settled} 筆支出（settlement: {settlement_id}）")
+        return settled
+
+    # ===== 群組收支帳本相關操作 =====
+    #
+    # group_balances/{group_id} 以整數分儲存群組所有未結算帳目的淨收支（balances_cents），
+    # 支出的新增、更新、刪除與結算在同一個 transaction 內讀取帳本並寫回，結算頁面只需讀取一份文件。
+    # 帳本不存在或為舊格式（沒有 balances_cents）時，由未結算帳目重新計算後再套用異動。
+
+    def _balances_ref(self, group_id: str):
+        """取得群組收支帳本的文件參考"""
+        return self.db.collection('group_balances').document(group_id)
+
+    def _unsettled_expenses_query(self, group_id: str):
+        """群組未結算支出的查詢"""
+        return self.db.collection('expenses')\
             .where(filter=FieldFilter('group_id', '==', group_id))\
-            .where(filter=FieldFilter('is_settled', '==', False))\
-            .stream()
+            .where(filter=FieldFilter('is_settled', '==', False))
 
-        batch = self._db.batch()
-        for expense in expenses:
-            batch.update(expense.reference, {'is_settled': True})
+    def _read_ledger(self, transaction, group_id: str) -> Dict:
+        """在 transaction 內讀取群組收支帳本（呼叫端需在任何寫入之前呼叫）
+
+        帳本不存在或為舊格式時，於同一個 transaction 內由未結算帳目計算
+        """
+        snapshot = self._balances_ref(group_id).get(transaction=transaction)
+        ledger = snapshot.to_dict() if snapshot.exists else None
+        if self._is_current_ledger(ledger):
+            return ledger
+
+        expenses = [expense.to_dict() for expense in
+                    self._unsettled_expenses_query(group_id).stream(transaction=transaction)]
+        return self._ledger_from_expenses(expenses)
+
+    def _write_ledger(self, writer, group_id: str, ledger: Dict):
+        """覆寫群組收支帳本"""
+        writer.set(self._balances_ref(group_id), {
+            self.LEDGER_FIELD: ledger[self.LEDGER_FIELD],
+            'expense_count': ledger['expense_count'],
+            'updated_at': SERVER_TIMESTAMP
+        })
+
+    def _apply_balance_delta(self, writer, group_id: str, ledger: Dict,
+                             old_expense: Optional[Dict] = None,
+                             new_expense: Optional[Dict] = None):
+        """將支出異動造成的收支差額套用到帳本並寫回
+
+        Args:
+            writer: Transaction
+            group_id: 群組 ID
+            ledger: 同一個 transaction 內以 _read_ledger 讀取的帳本
+            old_expense: 異動前的支出（新增時為 None）
+            new_expense: 異動後的支出（刪除時為 None）
+        """
+        delta, count_delta = self._balance_delta(old_expense, new_expense)
+        if not delta and count_delta == 0:
+            return
+
+        self._write_ledger(writer, group_id, self._apply_to_ledger(ledger, delta, count_delta))
+
+    def get_group_balances(self, group_id: str) -> Dict:
+        """取得群組收支帳本，帳本不存在或為舊格式時由未結算帳目重建
+
+        Returns:
+            {balances: {user_id: {user_name, net_amount}}, expense_count}
+        """
+        snapshot = self._balances_ref(group_id).get()
+        ledger = snapshot.to_dict() if snapshot.exists else None
+        if not self._is_current_ledger(ledger):
+            return self.rebuild_group_balances(group_id)
+
+        return self._ledger_view(ledger)
+
+    def rebuild_group_balances(self, group_id: str) -> Dict:
+        """由未結算的支出記錄重新計算並覆寫群組收支帳本"""
+
+        @firestore.transactional
+        def _rebuild_in_transaction(transaction):
+            # 先讀取帳本，與同時進行的帳目異動互斥（任一方寫入後另一方會重試）
+            self._balances_ref(group_id).get(transaction=transaction)
+            expenses = [expense.to_dict() for expense in
+                        self._unsettled_expenses_query(group_id).stream(transaction=transaction)]
+            ledger = self._ledger_from_expenses(expenses)
+            self._write_ledger(transaction, group_id, ledger)
+            return ledger
+
+        ledger = _rebuild_in_transaction(self.db.transaction())
+        logger.info(f"群組 {group_id} 收支帳本已重建（{ledger['expense_count']} 筆帳目）")
+        return self._ledger_view(ledger)
 
-        batch.commit()
+    def verify_group_balances(self, group_id: str, repair: bool = False) -> bool:
+        """檢查群組收支帳本是否與未結算的支出記錄一致
+
+        Args:
+            group_id: 群組 ID
+            repair: 不一致時是否重建帳本
+
+        Returns:
+            帳本是否一致
+        """
+        snapshot = self._balances_ref(group_id).get()
+        ledger = snapshot.to_dict() if snapshot.exists else None
+        expenses = self.get_group_expenses(group_id, is_settled=False, limit=None)
+
+        consistent = self._ledger_matches(ledger, expenses)
+        if not consistent:
+            logger.warning(f"群組 {group_id} 收支帳本與帳目不一致")
+            if repair:
+                self.rebuild_group_balances(group_id)
+
+        return consistent
 
     # ===== 結算記錄相關操作 =====
 
     def create_settlement(self, settlement_data: Dict) -> str:
-        """建立結算記錄"""
+        """建立結算記錄（狀態為 pending，待 settle_expenses 完成後改為 completed）"""
         settlement_data['settled_at'] = SERVER_TIMESTAMP
+        settlement_data['status'] = 'pending'
 
-        doc_ref = self._db.collection('settlements').add(settlement_data)
+        doc_ref = self.db.collection('settlements').add(settlement_data)
         return doc_ref[1].id
 
+    def get_pending_settlement(self, group_id: str) -> Optional[Dict]:
+        """取得群組尚未完成標記的結算記錄（用於清帳失敗後續作）"""
+        settlements = self.db.collection('settlements')\
+            .where(filter=FieldFilter('group_id', '==', group_id))\
+            .where(filter=FieldFilter('status', '==', 'pending'))\
+            .limit(1)\
+            .stream()
+
+        for settlement in settlements:
+            data = self._document_to_dict(settlement)
+            return data
+
+        return None
+
+    def get_settlement_expenses(self, settlement_id: str) -> List[Dict]:
+        """取得某次結算所包含的支出記錄"""
+        expenses = self.db.collection('expenses')\
+            .where(filter=FieldFilter('settlement_id', '==', settlement_id))\
+            .stream()
+
+        result = []
+        for expense in expenses:
+            data = self._document_to_dict(expense)
+            result.append(data)
+
+        return result
+
     def get_group_settlements(self, group_id: str, limit: int = 10) -> List[Dict]:
         """取得群組的結算記錄"""
-        settlements = self._db.collection('settlements')\
+        settlements = self.db.collection('settlements')\
             .where(filter=FieldFilter('group_id', '==', group_id))\
             .order_by('settled_at', direction=Query.DESCENDING)\
             .limit(limit)\
@@ -380,34 +948,200 @@ class FirebaseService:
 
         result = []
         for settlement in settlements:
-            data = settlement.to_dict()
-            data['id'] = settlement.id
+            data = self._document_to_dict(settlement)
             result.append(data)
 
         return result
 
+    # ===== 群組版本戳記相關操作 =====
+
+    def get_group_version(self, group_id: str) -> str:
+        """取得群組資料的版本戳記（從未寫入過時為 '0'）"""
+        snapshot = self.db.collection('group_versions').document(group_id).get()
+        if not snapshot.exists:
+            return '0'
+        return str(snapshot_data(snapshot).get('version', '0'))
+
+    def set_group_version(self, group_id: str, version: str):
+        """寫入群組資料的版本戳記"""
+        self.db.collection('group_versions').document(group_id).set({
+            'version': version,
+            'updated_at': SERVER_TIMESTAMP
+        })
+
+    # ===== 待辦事項索引相關操作 =====
+
+    def _todo_meta_ref(self, group_id: str):
+        """群組待辦事項索引文件（類別集合與負責人）"""
+        return self.db.collection('todo_meta').document(group_id)
+
+    def add_todo_meta(self, group_id: str, category: Optional[str] = None,
+                      assignee_id: Optional[str] = None, assignee_name: Optional[str] = None):
+        """將類別與負責人加入群組的待辦事項索引（只增不減）
+
+        索引文件不存在時會建立只含此筆資料的文件（沒有 rebuilt 標記），
+        下次讀取時由 get_todo_meta 以群組現有的待辦事項補齊
+        """
+        data = {}
+        if category:
+            data['categories'] = ArrayUnion([category])
+        if assignee_id:
+            data['assignees'] = {assignee_id: assignee_name or ''}
+        if not data:
+            return
+
+        data['updated_at'] = SERVER_TIMESTAMP
+        self._todo_meta_ref(group_id).set(data, merge=True)
+
+    def get_todo_meta(self, group_id: str) -> Dict:
+        """取得群組的待辦事項索引，不存在或尚未以現有待辦事項重建過（沒有 rebuilt 標記）時重建
+
+        Returns:
+            {'categories': [類別], 'assignees': {assignee_id: assignee_name}}
+        """
+        snapshot = self._todo_meta_ref(group_id).get()
+        data = snapshot_data(snapshot)
+        if not data.get('rebuilt'):
+            return self.rebuild_todo_meta(group_id)
+
+        return {
+            'categories': list(data.get('categories', [])),
+            'assignees': dict(data.get('assignees', {}))
+        }
+
+    def rebuild_todo_meta(self, group_id: str) -> Dict:
+        """以群組現有的待辦事項重建索引（只讀取類別與負責人欄位）
+
+        以 merge 與 ArrayUnion 寫入，不會覆蓋重建前後其他請求以 add_todo_meta 加入的項目；
+        完成後標記 rebuilt，之後讀取不再重建
+        """
+        categories = set()
+        assignees = {}
+
+        todos = self.db.collection('todos')\
+            .where(filter=FieldFilter('group_id', '==', group_id))\
+            .select(['category', 'assignee_id', 'assignee_name'])\
+            .stream()
+
+        for todo in todos:
+            data = snapshot_data(todo)
+            if data.get('category'):
+                categories.add(data['category'])
+            if data.get('assignee_id'):
+                assignees[data['assignee_id']] = data.get('assignee_name') or ''
+
+        meta = {'categories': sorted(categories), 'assignees': assignees}
+        data = {'assignees': assignees, 'rebuilt': True, 'updated_at': SERVER_TIMESTAMP}
+        if categories:
+            data['categories'] = ArrayUnion(meta['categories'])
+        self._todo_meta_ref(group_id).set(data, merge=True)
+
+        # 回傳合併後的完整索引（包含重建期間由 add_todo_meta 加入的項目）
+        merged = snapshot_data(self._todo_meta_ref(group_id).get())
+        meta = {
+            'categories': list(merged.get('categories', [])),
+            'assignees': dict(merged.get('assignees', {}))
+        }
+        logger.info(f"群組 {group_id} 的待辦事項索引已重建")
+        return meta
+
+    # ===== Webhook 事件相關操作 =====
+
+    def claim_webhook_event(self, event_id: str, ttl_seconds: float) -> bool:
+        """記錄已處理的 webhook 事件
+
+        Args:
+            event_id: webhookEventId
+            ttl_seconds: 記錄保留時間（供 Firestore TTL 政策以 expire_at 清除）
+
+        Returns:
+            True 表示首次記錄；False 表示已被記錄過（重複事件）
+        """
+        try:
+            self.db.collection('webhook_events').document(event_id).create({
+                'created_at': SERVER_TIMESTAMP,
+                'expire_at': datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+            })
+            return True
+        except AlreadyExists:
+            return False
+
+    def claim_lease(self, name: str, ttl_seconds: float) -> bool:
+        """取得 leases/{name} 租約（用於只需由一個實例執行的啟動工作）
+
+        Args:
+            name: 租約名稱
+            ttl_seconds: 租約期限，期限內其他 process 無法取得
+
+        Returns:
+            是否取得租約
+        """
+        lease_ref = self.db.collection('leases').document(name)
+        now = datetime.now(timezone.utc)
+
+        @firestore.transactional
+        def _claim_in_transaction(transaction):
+            snapshot = lease_ref.get(transaction=transaction)
+            if snapshot.exists:
+                expire_at = snapshot.to_dict().get('expire_at')
+                if expire_at is not None and expire_at > now:
+                    return False
+            transaction.set(lease_ref, {
+                'holder': f'{socket.gethostname()}:{os.getpid()}',
+                'claimed_at': SERVER_TIMESTAMP,
+                'expire_at': now + timedelta(seconds=ttl_seconds)
+            })
+            return True
+
+        try:
+            return _claim_in_transaction(self.db.transaction())
+        except Exception as e:
+            logger.error(f"取得租約 {name} 失敗: {e}")
+            return False
+
     # ===== 通用 CRUD 操作 =====
 
     def create(self, collection: str, data: Dict) -> str:
         """建立文件（通用）"""
-        doc_ref = self._db.collection(collection).add(data)
+        doc_ref = self.db.collection(collection).add(data)
         return doc_ref[1].id
 
-    def get(self, collection: str, doc_id: str) -> Optional[Dict]:
-        """取得文件（通用）"""
-        doc_ref = self._db.collection(collection).document(doc_id)
+    def get(self, collection: str, doc_id: str, model: Optional[type] = None) -> Optional[Any]:
+        """取得文件（通用）
+
+        Args:
+            model: 指定時以 model.from_snapshot 直接建立模型物件，而非回傳字典
+        """
+        doc_ref = self.db.collection(collection).document(doc_id)
         doc_data = doc_ref.get()
 
         if doc_data.exists:
-            data = doc_data.to_dict()
-            data['id'] = doc_id
+            if model is not None:
+                return model.from_snapshot(doc_data)
+            data = self._document_to_dict(doc_data)
             return data
         return None
 
+    def count(self, collection: str, conditions: List[tuple]) -> int:
+        """以 count() 聚合查詢計算符合條件的文件數（不讀取文件內容）
+
+        Args:
+            collection: Collection 名稱
+            conditions: 查詢條件列表 [('field', 'operator', 'value'), ...]
+        """
+        query = self.db.collection(collection)
+        for field, operator, value in conditions:
+            query = query.where(filter=FieldFilter(field, operator, value))
+
+        results = query.count(alias='count').get()
+        return int(results[0][0].value)
+
     def update(self, collection: str, doc_id: str, data: Dict) -> bool:
         """更新文件（通用）"""
         try:
-            self._db.collection(collection).document(doc_id).update(data)
+            self.db.collection(collection).document(doc_id).update(data)
+            if collection == 'users':
+                self.invalidate_user(doc_id)
             return True
         except Exception as e:
             logger.error(f"更新文件失敗: {e}")
@@ -416,7 +1150,9 @@ class FirebaseService:
     def delete(self, collection: str, doc_id: str) -> bool:
         """刪除文件（通用）"""
         try:
-            self._db.collection(collection).document(doc_id).delete()
+            self.db.collection(collection).document(doc_id).delete()
+            if collection == 'users':
+                self.invalidate_user(doc_id)
             return True
         except Exception as e:
             logger.error(f"刪除文件失敗: {e}")
@@ -425,7 +1161,9 @@ class FirebaseService:
     def query(self, collection: str, conditions: List[tuple],
               order_by: Optional[str] = None,
               order_direction: str = 'asc',
-              limit: Optional[int] = None) -> List[Dict]:
+              limit: Optional[int] = None,
+              model: Optional[type] = None,
+              fields: Optional[List[str]] = None) -> List[Any]:
         """查詢文件（通用）
 
         Args:
@@ -434,11 +1172,14 @@ class FirebaseService:
             order_by: 排序欄位
             order_direction: 排序方向 ('asc' or 'desc')
             limit: 限制數量
+            model: 指定時以 model.from_snapshot 直接建立模型物件，而非回傳字典
+            fields: 只取得指定欄位（Firestore select），None 表示取得完整文件
 
         Returns:
             文件列表
         """
-        query = self._db.collection(collection)
+        fields = self._normalize_fields(fields)
+        query = self.db.collection(collection)
 
         # 加入查詢條件
         for field, operator, value in conditions:
@@ -453,15 +1194,18 @@ class FirebaseService:
         if limit:
             query = query.limit(limit)
 
+        # 欄位投影
+        if fields is not None:
+            query = query.select(fields)
+
         # 執行查詢
         result = []
         for doc in query.stream():
-            data = doc.to_dict()
-            data['id'] = doc.id
+            if model is not None:
+                result.append(model.from_snapshot(doc))
+                continue
+            data = self._document_to_dict(doc)
             result.append(data)
 
         return result
 
-
-# 建立全域實例
-firebase_service = FirebaseService()
@@ -0,0 +1,735 @@
+# -*- coding: utf-8 -*-
+"""記憶體儲存後端
+
+以 Python 字典保存所有集合，不需網路與 Firebase 憑證，供離線基準測試與壓力測試使用。
+查詢語意比照 FirebaseService（Firestore）：
+- 依 order_by 排序時，缺少排序欄位的文件不會出現在結果中
+- 讀取回傳淺層複製的字典（巢狀的 list / dict 與儲存的資料共用，必須視為唯讀）
+- 寫入時複製整份資料，並將時間欄位正規化為帶時區的 datetime
+
+group_id、group_code、is_settled 與 members（陣列）建有次要索引，
+查詢時由最小的索引候選集合開始過濾，不需掃描整個集合。
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, List, Any, Callable, Iterable, Set, Tuple
+import copy
+import heapq
+import logging
+import threading
+import uuid
+
+from services.storage_backend import StorageBackend
+from utils.timestamp import normalize_timestamps
+
+logger = logging.getLogger(__name__)
+
+# 缺少欄位時的標記（與 None 值區分）
+_MISSING = object()
+
+
+class _Snapshot:
+    """供 model.from_snapshot 使用的輕量文件快照（介面與 Firestore DocumentSnapshot 相同）"""
+
+    __slots__ = ('id', '_data')
+
+    exists = True
+
+    def __init__(self, doc_id: str, data: Dict):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self) -> Dict:
+        return copy.deepcopy(self._data)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _matches(value: Any, operator: str, expected: Any) -> bool:
+    """判斷欄位值是否符合查詢條件（value 為 _MISSING 表示文件沒有此欄位）"""
+    if value is _MISSING:
+        # 缺少欄位的文件不符合任何條件（與 Firestore 相同）
+        return False
+    try:
+        if operator == '==':
+            return value == expected
+        if operator == '!=':
+            return value != expected
+        if operator == '<':
+            return value < expected
+        if operator == '<=':
+            return value <= expected
+        if operator == '>':
+            return value > expected
+        if operator == '>=':
+            return value >= expected
+        if operator == 'in':
+            return value in expected
+        if operator == 'not-in':
+            return value not in expected
+        if operator == 'array_contains':
+            return isinstance(value, list) and expected in value
+        if operator == 'array_contains_any':
+            return isinstance(value, list) and any(item in value for item in expected)
+    except TypeError:
+        # 型別無法比較時視為不符合（與 Firestore 依型別分開排序的行為一致）
+        return False
+    raise ValueError(f"不支援的查詢運算子: {operator}")
+
+
+class MemoryBackend(StorageBackend):
+    """記憶體儲存後端（以單一可重入鎖保護所有讀寫）"""
+
+    # 建立次要索引的純量欄位（支援 == 與 in 查詢）
+    INDEXED_FIELDS = ('group_id', 'group_code', 'is_settled')
+
+    # 建立次要索引的陣列欄位（支援 array_contains 查詢）
+    ARRAY_INDEXED_FIELDS = ('members',)
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # {collection: {doc_id: data}}
+        self._collections: Dict[str, Dict[str, Dict]] = {}
+        # {collection: {field: {value: {doc_id}}}}
+        self._indexes: Dict[str, Dict[str, Dict[Any, Set[str]]]] = {}
+
+    def clear(self):
+        """清除所有資料"""
+        with self._lock:
+            self._collections.clear()
+            self._indexes.clear()
+
+    def collection_sizes(self) -> Dict[str, int]:
+        """取得各集合的文件數"""
+        with self._lock:
+            return {name: len(docs) for name, docs in self._collections.items()}
+
+    # ===== 儲存與索引 =====
+
+    @staticmethod
+    def _new_id() -> str:
+        return uuid.uuid4().hex[:20]
+
+    @staticmethod
+    def _prepare(data: Dict) -> Dict:
+        """複製寫入的資料，並將時間欄位正規化為帶時區的 datetime（未帶時區者視為 UTC）"""
+        data = normalize_timestamps(copy.deepcopy(data))
+        for field, value in data.items():
+            if isinstance(value, datetime) and value.tzinfo is None:
+                data[field] = value.replace(tzinfo=timezone.utc)
+        return data
+
+    def _docs(self, collection: str) -> Dict[str, Dict]:
+        return self._collections.setdefault(collection, {})
+
+    def _index_keys(self, data: Dict) -> Iterable[Tuple[str, Any]]:
+        """文件在各索引中的 (欄位, 值)"""
+        for field in self.INDEXED_FIELDS:
+            if field in data:
+                yield field, data[field]
+        for field in self.ARRAY_INDEXED_FIELDS:
+            for item in data.get(field) or ():
+                yield field, item
+
+    def _put(self, collection: str, doc_id: str, data: Dict):
+        """寫入整份文件並更新索引（data 必須已經過 _prepare）"""
+        docs = self._docs(collection)
+        old = docs.get(doc_id)
+        if old is not None:
+            self._unindex(collection, doc_id, old)
+        docs[doc_id] = data
+
+        indexes = self._indexes.setdefault(collection, {})
+        for field, value in self._index_keys(data):
+            indexes.setdefault(field, {}).setdefault(value, set()).add(doc_id)
+
+    def _unindex(self, collection: str, doc_id: str, data: Dict):
+        indexes = self._indexes.get(collection, {})
+        for field, value in self._index_keys(data):
+            ids = indexes.get(field, {}).get(value)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del indexes[field][value]
+
+    def _remove(self, collection: str, doc_id: str) -> bool:
+        data = self._docs(collection).pop(doc_id, None)
+        if data is None:
+            return False
+        self._unindex(collection, doc_id, data)
+        return True
+
+    def _merge(self, collection: str, doc_id: str, updates: Dict) -> bool:
+        """以頂層欄位合併更新文件，文件不存在時回傳 False"""
+        data = self._docs(collection).get(doc_id)
+        if data is None:
+            return False
+        merged = dict(data)
+        merged.update(self._prepare(updates))
+        self._put(collection, doc_id, merged)
+        return True
+
+    def _read(self, collection: str, doc_id: str) -> Optional[Dict]:
+        """讀取文件（淺層複製並加上 id）"""
+        data = self._docs(collection).get(doc_id)
+        if data is None:
+            return None
+        result = dict(data)
+        result['id'] = doc_id
+        return result
+
+    # ===== 查詢 =====
+
+    def _candidates(self, collection: str, conditions: List[tuple]) -> Tuple[Iterable[str], Optional[int]]:
+        """由索引選出候選文件
+
+        Returns:
+            (候選文件 ID, 已由索引完全滿足的條件位置)，沒有可用索引時回傳整個集合
+        """
+        indexes = self._indexes.get(collection, {})
+        best = None
+        best_position = None
+
+        for position, (field, operator, value) in enumerate(conditions):
+            if field in self.INDEXED_FIELDS and operator == '==':
+                ids = indexes.get(field, {}).get(value, set())
+            elif field in self.INDEXED_FIELDS and operator == 'in':
+                index = indexes.get(field, {})
+                ids = set().union(*(index.get(item, set()) for item in value))
+            elif field in self.ARRAY_INDEXED_FIELDS and operator == 'array_contains':
+                ids = indexes.get(field, {}).get(value, set())
+            else:
+                continue
+
+            if best is None or len(ids) < len(best):
+                best = ids
+                best_position = position
+
+        if best is None:
+            return self._docs(collection).keys(), None
+        return best, best_position
+
+    def _select(self, collection: str, conditions: List[tuple],
+                order_by: Optional[str] = None, descending: bool = False,
+                limit: Optional[int] = None,
+                start_after: Optional[Tuple[Any, str]] = None) -> List[Tuple[str, Dict]]:
+        """執行查詢，回傳 [(doc_id, data)]（data 為儲存的原始字典）
+
+        Args:
+            start_after: 分頁游標 (排序欄位值, 文件 ID)，只回傳排在游標之後的文件
+        """
+        docs = self._docs(collection)
+        candidates, indexed_position = self._candidates(collection, conditions)
+        remaining = [
+            condition for position, condition in enumerate(conditions)
+            if position != indexed_position
+        ]
+
+        rows = []
+        for doc_id in candidates:
+            data = docs[doc_id]
+            if all(_matches(data.get(field, _MISSING), operator, value)
+                   for field, operator, value in remaining):
+                rows.append((doc_id, data))
+
+        if not order_by:
+            rows.sort(key=lambda row: row[0])
+            return rows[:limit] if limit else rows
+
+        # 缺少排序欄位的文件不列入（與 Firestore 相同）
+        rows = [row for row in rows if row[1].get(order_by) is not None]
+
+        def sort_key(row):
+            return row[1][order_by], row[0]
+
+        if start_after is not None:
+            if descending:
+                rows = [row for row in rows if sort_key(row) < start_after]
+            else:
+                rows = [row for row in rows if sort_key(row) > start_after]
+
+        if limit:
+            select = heapq.nlargest if descending else heapq.nsmallest
+            return select(limit, rows, key=sort_key)
+        rows.sort(key=sort_key, reverse=descending)
+        return rows
+
+    @staticmethod
+    def _project(doc_id: str, data: Dict, fields: Optional[List[str]]) -> Dict:
+        """轉為回傳用的字典（淺層複製並加上 id），指定 fields 時只保留這些欄位"""
+        if fields is None:
+            result = dict(data)
+        else:
+            result = {field: data[field] for field in fields if field in data}
+        result['id'] = doc_id
+        return result
+
+    # ===== 使用者相關操作 =====
+
+    def create_or_update_user(self, line_user_id: str, display_name: str, picture_url: str = '') -> Dict:
+        """建立或更新使用者（資料相同時不寫入）"""
+        with self._lock:
+            user = self._docs('users').get(line_user_id)
+            if user is None:
+                now = _now()
+                self._put('users', line_user_id, {
+                    'line_user_id': line_user_id,
+                    'display_name': display_name,
+                    'picture_url': picture_url,
+                    'created_at': now,
+                    'updated_at': now
+                })
+            elif not self._is_same_profile(user, display_name, picture_url):
+                updates = {'display_name': display_name, 'updated_at': _now()}
+                if picture_url:
+                    updates['picture_url'] = picture_url
+                self._merge('users', line_user_id, updates)
+
+        return {'line_user_id': line_user_id, 'display_name': display_name}
+
+    def get_user(self, line_user_id: str) -> Optional[Dict]:
+        with self._lock:
+            user = self._docs('users').get(line_user_id)
+            return dict(user) if user is not None else None
+
+    def invalidate_user(self, line_user_id: str):
+        """記憶體後端沒有使用者快取，不需處理"""
+
+    def get_user_cache_stats(self) -> Dict:
+        """記憶體後端沒有使用者快取，回傳空的統計"""
+        return {'size': 0, 'maxsize': 0, 'ttl': 0, 'hits': 0, 'misses': 0, 'hit_ratio': 0}
+
+    def get_users(self, line_user_ids: List[str]) -> Dict[str, Dict]:
+        with self._lock:
+            users = self._docs('users')
+            return {
+                uid: dict(users[uid])
+                for uid in dict.fromkeys(line_user_ids)
+                if uid and uid in users
+            }
+
+    # ===== 群組相關操作 =====
+
+    def create_group(self, group_name: str, created_by: str) -> Dict:
+        from models.group import Group
+
+        group = Group(group_name=group_name, created_by=created_by)
+        group_data = group.to_dict()
+        group_data['created_at'] = _now()
+        group_data['expense_counter'] = 0
+
+        group_id = self._new_id()
+        with self._lock:
+            self._put('groups', group_id, self._prepare(group_data))
+
+        return {
+            'id': group_id,
+            'group_code': group.group_code,
+            'group_name': group_name,
+            'created_by': created_by
+        }
+
+    def get_group_by_code(self, group_code: str) -> Optional[Dict]:
+        with self._lock:
+            rows = self._select('groups', [('group_code', '==', group_code)], limit=1)
+            return self._project(*rows[0], None) if rows else None
+
+    def join_group(self, group_id: str, user_id: str) -> bool:
+        with self._lock:
+            group = self._docs('groups').get(group_id)
+            if group is None:
+                logger.error(f"加入群組失敗: 群組 {group_id} 不存在")
+                return False
+            members = list(group.get('members') or [])
+            if user_id not in members:
+                members.append(user_id)
+                self._merge('groups', group_id, {'members': members})
+            return True
+
+    def get_user_groups(self, user_id: str, fields: Optional[List[str]] = None) -> List[Dict]:
+        fields = self._normalize_fields(fields)
+        with self._lock:
+            rows = self._select(
+                'groups',
+                [('members', 'array_contains', user_id), ('is_active', '==', True)],
+                order_by='created_at', descending=True
+            )
+            return [self._project(doc_id, data, fields) for doc_id, data in rows]
+
+    def delete_group(self, group_id: str, parallel: bool = False,
+                     progress_callback: Optional[Callable[[str, int], None]] = None) -> bool:
+        """刪除群組及其所有相關資料（parallel 參數僅為相容介面，記憶體後端一律依序刪除）"""
+        with self._lock:
+            deleted = {}
+            for collection in ('expenses', 'todos', 'settlements'):
+                ids = list(self._indexes.get(collection, {}).get('group_id', {}).get(group_id, ()))
+                for doc_id in ids:
+                    self._remove(collection, doc_id)
+                deleted[collection] = len(ids)
+                if progress_callback and ids:
+                    progress_callback(collection, len(ids))
+
+            for collection in ('group_balances', 'todo_meta', 'group_versions', 'groups'):
+                self._remove(collection, group_id)
+
+        logger.info(f"群組 {group_id} 及其所有相關資料已刪除: {deleted}")
+        return True
+
+    def start_group_deletion(self, group_id: str) -> bool:
+        """將群組標記為刪除中後直接刪除（記憶體後端刪除很快，不需背景執行緒）"""
+        with self._lock:
+            marked = self._merge('groups', group_id, {
+                'is_active': False,
+                'deletion_status': 'pending',
+                'deletion_requested_at': _now()
+            })
+        if not marked:
+            logger.error(f"標記群組刪除失敗: 群組 {group_id} 不存在")
+            return False
+        return self.delete_group(group_id)
+
+    def resume_group_deletions(self) -> int:
+        with self._lock:
+            group_ids = [doc_id for doc_id, _ in self._select('groups', [('deletion_status', '==', 'pending')])]
+        return sum(1 for group_id in group_ids if self.start_group_deletion(group_id))
+
+    # ===== 支出記錄相關操作 =====
+
+    def create_expense(self, expense_data: Dict) -> str:
+        """建立支出記錄（帳目編號由群組的 expense_counter 依序配發）"""
+        group_id = expense_data['group_id']
+        expense_data['created_at'] = _now()
+        expense_data['is_settled'] = False
+        expense_data['split_count'] = len(expense_data.get('splits', []))
+
+        expense_id = self._new_id()
+        with self._lock:
+            group = self._docs('groups').get(group_id)
+            if group is None:
+                raise LookupError(f'群組不存在: {group_id}')
+            counter = group.get('expense_counter')
+            if counter is None:
+                counter = max(
+                    (data.get('expense_number', 0) for _, data in self._select('expenses', [('group_id', '==', group_id)])),
+                    default=0
+                )
+
+            expense_data['expense_number'] = counter + 1
+            self._merge('groups', group_id, {'expense_counter': counter + 1})
+
+            ledger = self._load_ledger(group_id)
+            self._put('expenses', expense_id, self._prepare(expense_data))
+            self._apply_balance_delta(group_id, ledger, new_expense=expense_data)
+
+        return expense_id
+
+    def get_expense(self, expense_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._read('expenses', expense_id)
+
+    def get_group_expenses(self, group_id: str, is_settled: bool = None, limit: int = 50,
+                           start_after: Optional[str] = None,
+                           fields: Optional[List[str]] = None) -> List[Dict]:
+        fields = self._normalize_fields(fields)
+
+        conditions = [('group_id', '==', group_id)]
+        if is_settled is not None:
+            conditions.append(('is_settled', '==', is_settled))
+
+        with self._lock:
+            cursor = None
+            if start_after:
+                cursor_data = self._docs('expenses').get(start_after)
+                if cursor_data is None or cursor_data.get('group_id') != group_id:
+                    raise ValueError('無效的分頁游標')
+                cursor = (cursor_data.get('created_at'), start_after)
+
+            rows = self._select('expenses', conditions, order_by='created_at', descending=True,
+                                limit=limit, start_after=cursor)
+
+            result = []
+            for doc_id, data in rows:
+                expense = self._project(doc_id, data, fields)
+                if fields is not None and 'split_count' in fields and 'split_count' not in expense:
+                    expense['split_count'] = len(data.get('splits') or [])
+                result.append(expense)
+            return result
+
+    def get_expense_by_number(self, group_id: str, expense_number: int) -> Optional[Dict]:
+        with self._lock:
+            rows = self._select('expenses', [
+                ('group_id', '==', group_id),
+                ('expense_number', '==', expense_number)
+            ], limit=1)
+            return self._project(*rows[0], None) if rows else None
+
+    def update_expense(self, expense_id: str, updates: Dict) -> bool:
+        with self._lock:
+            old_expense = self._docs('expenses').get(expense_id)
+            if old_expense is None:
+                logger.error("更新支出記錄失敗: 支出記錄不存在")
+                return False
+
+            ledger = self._load_ledger(old_expense['group_id'])
+            if 'splits' in updates:
+                updates['split_count'] = len(updates['splits'])
+            self._merge('expenses', expense_id, updates)
+            self._apply_balance_delta(
+                old_expense['group_id'],
+                ledger,
+                old_expense=old_expense,
+                new_expense=self._docs('expenses')[expense_id]
+            )
+            return True
+
+    def delete_expense(self, expense_id: str) -> bool:
+        with self._lock:
+            old_expense = self._docs('expenses').get(expense_id)
+            if old_expense is None:
+                return True
+            ledger = self._load_ledger(old_expense['group_id'])
+            self._remove('expenses', expense_id)
+            self._apply_balance_delta(old_expense['group_id'], ledger, old_expense=old_expense)
+            return True
+
+    def settle_expenses(self, group_id: str, settlement_id: str, expense_ids: List[str]) -> int:
+        settled = 0
+        with self._lock:
+            ledger = self._load_ledger(group_id)
+            for expense_id in expense_ids:
+                data = self._docs('expenses').get(expense_id)
+                if data is None or data.get('group_id') != group_id or data.get('is_settled'):
+                    continue
+                ledger = self._apply_to_ledger(ledger, *self._balance_delta(old_expense=data))
+                self._merge('expenses', expense_id, {'is_settled': True, 'settlement_id': settlement_id})
+                settled += 1
+
+            self._write_ledger(group_id, ledger)
+            self._merge('settlements', settlement_id, {'status': 'completed'})
+
+        logger.info(f"群組 {group_id} 已結算 {settled} 筆支出（settlement: {settlement_id}）")
+        return settled
+
+    # ===== 群組收支帳本相關操作 =====
+
+    def _load_ledger(self, group_id: str) -> Dict:
+        """讀取群組收支帳本，不存在或為舊格式時由未結算帳目計算（呼叫端需持有鎖，並在異動帳目之前呼叫）"""
+        ledger = self._docs('group_balances').get(group_id)
+        if self._is_current_ledger(ledger):
+            return ledger
+        rows = self._select('expenses', [('group_id', '==', group_id), ('is_settled', '==', False)])
+        return self._ledger_from_expenses([data for _, data in rows])
+
+    def _write_ledger(self, group_id: str, ledger: Dict):
+        self._put('group_balances', group_id, {
+            self.LEDGER_FIELD: copy.deepcopy(ledger[self.LEDGER_FIELD]),
+            'expense_count': ledger['expense_count'],
+            'updated_at': _now()
+        })
+
+    def _apply_balance_delta(self, group_id: str, ledger: Dict,
+                             old_expense: Optional[Dict] = None,
+                             new_expense: Optional[Dict] = None):
+        """將支出異動造成的收支差額套用到帳本並寫回（呼叫端需持有鎖）"""
+        delta, count_delta = self._balance_delta(old_expense, new_expense)
+        if not delta and count_delta == 0:
+            return
+        self._write_ledger(group_id, self._apply_to_ledger(ledger, delta, count_delta))
+
+    def get_group_balances(self, group_id: str) -> Dict:
+        with self._lock:
+            ledger = self._docs('group_balances').get(group_id)
+            if not self._is_current_ledger(ledger):
+                return self.rebuild_group_balances(group_id)
+            return self._ledger_view(ledger)
+
+    def rebuild_group_balances(self, group_id: str) -> Dict:
+        with self._lock:
+            rows = self._select('expenses', [('group_id', '==', group_id), ('is_settled', '==', False)])
+            ledger = self._ledger_from_expenses([data for _, data in rows])
+            self._write_ledger(group_id, ledger)
+
+        logger.info(f"群組 {group_id} 收支帳本已重建（{ledger['expense_count']} 筆帳目）")
+        return self._ledger_view(ledger)
+
+    def verify_group_balances(self, group_id: str, repair: bool = False) -> bool:
+        with self._lock:
+            ledger = self._docs('group_balances').get(group_id)
+            rows = self._select('expenses', [('group_id', '==', group_id), ('is_settled', '==', False)])
+
+            consistent = self._ledger_matches(ledger, [data for _, data in rows])
+            if not consistent:
+                logger.warning(f"群組 {group_id} 收支帳本與帳目不一致")
+                if repair:
+                    self.rebuild_group_balances(group_id)
+
+            return consistent
+
+    # ===== 結算記錄相關操作 =====
+
+    def create_settlement(self, settlement_data: Dict) -> str:
+        settlement_data['settled_at'] = _now()
+        settlement_data['status'] = 'pending'
+        return self.create('settlements', settlement_data)
+
+    def get_pending_settlement(self, group_id: str) -> Optional[Dict]:
+        with self._lock:
+            rows = self._select('settlements', [
+                ('group_id', '==', group_id),
+                ('status', '==', 'pending')
+            ], limit=1)
+            return self._project(*rows[0], None) if rows else None
+
+    def get_settlement_expenses(self, settlement_id: str) -> List[Dict]:
+        return self.query('expenses', [('settlement_id', '==', settlement_id)])
+
+    def get_group_settlements(self, group_id: str, limit: int = 10) -> List[Dict]:
+        return self.query('settlements', [('group_id', '==', group_id)],
+                          order_by='settled_at', order_direction='desc', limit=limit)
+
+    # ===== 群組版本戳記相關操作 =====
+
+    def get_group_version(self, group_id: str) -> str:
+        with self._lock:
+            data = self._docs('group_versions').get(group_id)
+            return str(data.get('version', '0')) if data is not None else '0'
+
+    def set_group_version(self, group_id: str, version: str):
+        with self._lock:
+            self._put('group_versions', group_id, {'version': version, 'updated_at': _now()})
+
+    # ===== 待辦事項索引相關操作 =====
+
+    def add_todo_meta(self, group_id: str, category: Optional[str] = None,
+                      assignee_id: Optional[str] = None, assignee_name: Optional[str] = None):
+        if not category and not assignee_id:
+            return
+
+        with self._lock:
+            meta = self._docs('todo_meta').get(group_id) or {'categories': [], 'assignees': {}}
+            categories = list(meta.get('categories', []))
+            assignees = dict(meta.get('assignees', {}))
+            if category and category not in categories:
+                categories.append(category)
+            if assignee_id:
+                assignees[assignee_id] = assignee_name or ''
+            self._put('todo_meta', group_id, {
+                'categories': categories,
+                'assignees': assignees,
+                'rebuilt': meta.get('rebuilt', False),
+                'updated_at': _now()
+            })
+
+    def get_todo_meta(self, group_id: str) -> Dict:
+        with self._lock:
+            meta = self._docs('todo_meta').get(group_id)
+            if meta is None or not meta.get('rebuilt'):
+                return self.rebuild_todo_meta(group_id)
+            return {
+                'categories': list(meta.get('categories', [])),
+                'assignees': dict(meta.get('assignees', {}))
+            }
+
+    def rebuild_todo_meta(self, group_id: str) -> Dict:
+        categories = set()
+        assignees = {}
+
+        with self._lock:
+            # 與已存在的索引合併（可能已有 add_todo_meta 加入的項目）
+            existing = self._docs('todo_meta').get(group_id) or {}
+            categories.update(existing.get('categories', []))
+            assignees.update(existing.get('assignees', {}))
+
+            for _, data in self._select('todos', [('group_id', '==', group_id)]):
+                if data.get('category'):
+                    categories.add(data['category'])
+                if data.get('assignee_id'):
+                    assignees[data['assignee_id']] = data.get('assignee_name') or ''
+
+            meta = {'categories': sorted(categories), 'assignees': assignees}
+            self._put('todo_meta', group_id, {
+                'categories': list(meta['categories']),
+                'assignees': dict(assignees),
+                'rebuilt': True,
+                'updated_at': _now()
+            })
+
+        logger.info(f"群組 {group_id} 的待辦事項索引已重建")
+        return meta
+
+    # ===== Webhook 事件相關操作 =====
+
+    def claim_webhook_event(self, event_id: str, ttl_seconds: float) -> bool:
+        """記錄已處理的 webhook 事件（過期的記錄可被重新記錄）"""
+        now = _now()
+        with self._lock:
+            existing = self._docs('webhook_events').get(event_id)
+            if existing is not None and existing['expire_at'] > now:
+                return False
+            self._put('webhook_events', event_id, {
+                'created_at': now,
+                'expire_at': now + timedelta(seconds=ttl_seconds)
+            })
+            return True
+
+    def claim_lease(self, name: str, ttl_seconds: float) -> bool:
+        now = _now()
+        with self._lock:
+            existing = self._docs('leases').get(name)
+            if existing is not None and existing['expire_at'] > now:
+                return False
+            self._put('leases', name, {'claimed_at': now, 'expire_at': now + timedelta(seconds=ttl_seconds)})
+            return True
+
+    # ===== 通用 CRUD 操作 =====
+
+    def create(self, collection: str, data: Dict) -> str:
+        doc_id = self._new_id()
+        with self._lock:
+            self._put(collection, doc_id, self._prepare(data))
+        return doc_id
+
+    def get(self, collection: str, doc_id: str, model: Optional[type] = None) -> Optional[Any]:
+        with self._lock:
+            data = self._docs(collection).get(doc_id)
+            if data is None:
+                return None
+            if model is not None:
+                return model.from_snapshot(_Snapshot(doc_id, data))
+            return self._read(collection, doc_id)
+
+    def count(self, collection: str, conditions: List[tuple]) -> int:
+        with self._lock:
+            return len(self._select(collection, conditions))
+
+    def count_many(self, collection: str, queries: Dict[str, List[tuple]]) -> Dict[str, int]:
+        """依序計數（資料都在記憶體中，不需平行查詢）"""
+        return {name: self.count(collection, conditions) for name, conditions in queries.items()}
+
+    def update(self, collection: str, doc_id: str, data: Dict) -> bool:
+        with self._lock:
+            if not self._merge(collection, doc_id, data):
+                logger.error(f"更新文件失敗: {collection}/{doc_id} 不存在")
+                return False
+            return True
+
+    def delete(self, collection: str, doc_id: str) -> bool:
+        with self._lock:
+            self._remove(collection, doc_id)
+        return True
+
+    def query(self, collection: str, conditions: List[tuple],
+              order_by: Optional[str] = None,
+              order_direction: str = 'asc',
+              limit: Optional[int] = None,
+              model: Optional[type] = None,
+              fields: Optional[List[str]] = None) -> List[Any]:
+        fields = self._normalize_fields(fields)
+        with self._lock:
+            rows = self._select(collection, conditions, order_by=order_by,
+                                descending=order_direction == 'desc', limit=limit)
+            if model is not None:
+                return [model.from_snapshot(_Snapshot(doc_id, data)) for doc_id, data in rows]
+            return [self._project(doc_id, data, fields) for doc_id, data in rows]
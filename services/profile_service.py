@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+import logging
+import threading
+import time
+
+from services.storage_backend import StorageBackend
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileService:
+    """LINE 使用者名稱快取服務
+
+    取得顯示名稱的順序：
+    1. 行程內快取（未過期直接回傳；過期但仍在 stale 期間內則先回傳舊值，並於背景向 LINE 更新）
+    2. Firestore users 集合（回傳後於背景向 LINE 更新）
+    3. LINE get_profile（同步呼叫）
+    """
+
+    def __init__(self, firebase_service: StorageBackend, line_client,
+                 ttl: float = 3600, stale_ttl: float = 86400, maxsize: int = 2048):
+        self.firebase_service = firebase_service
+        self.line_client = line_client
+        self.ttl = ttl
+
+        # 快取值為 (display_name, fetched_at)，保留到 stale 期間結束
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl + stale_ttl)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+        # 統計資料
+        self._fresh_hits = 0
+        self._stale_hits = 0
+        self._store_hits = 0
+        self._line_fetches = 0
+        self._background_refreshes = 0
+        self._failures = 0
+
+    def get_display_name(self, user_id: str, default: str = '使用者') -> str:
+        """取得使用者顯示名稱"""
+        cached = self._cache.get(user_id)
+        if cached is not None:
+            display_name, fetched_at = cached
+            if time.monotonic() - fetched_at < self.ttl:
+                self._count('_fresh_hits')
+            else:
+                self._count('_stale_hits')
+                self._refresh_in_background(user_id)
+            return display_name
+
+        # 從 Firestore users 集合取得
+        try:
+            user = self.firebase_service.get_user(user_id)
+        except Exception as e:
+            logger.warning(f"從 users 集合取得使用者名稱失敗: {e}")
+            user = None
+
+        if user and user.get('display_name'):
+            self._count('_store_hits')
+            # 視為已過期，回傳後於背景向 LINE 確認是否改名
+            self._cache.set(user_id, (user['display_name'], time.monotonic() - self.ttl))
+            self._refresh_in_background(user_id)
+            return user['display_name']
+
+        display_name = self._fetch_from_line(user_id)
+        return display_name if display_name is not None else default
+
+    def _fetch_from_line(self, user_id: str, background: bool = False) -> Optional[str]:
+        """向 LINE 取得使用者名稱並寫入快取"""
+        self._count('_background_refreshes' if background else '_line_fetches')
+        try:
+            profile = self.line_client.messaging_api.get_profile(user_id)
+        except Exception as e:
+            self._count('_failures')
+            logger.warning(f"無法取得使用者名稱: {e}")
+            return None
+
+        self._cache.set(user_id, (profile.display_name, time.monotonic()))
+        return profile.display_name
+
+    def _refresh_in_background(self, user_id: str):
+        """於背景向 LINE 更新使用者名稱（同一使用者同時只會有一個更新）"""
+        with self._lock:
+            if user_id in self._refreshing:
+                return
+            self._refreshing.add(user_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='profile-refresh')
+
+        def _refresh():
+            try:
+                self._fetch_from_line(user_id, background=True)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(user_id)
+
+        self._executor.submit(_refresh)
+
+    def invalidate(self, user_id: str):
+        """移除使用者名稱快取"""
+        self._cache.invalidate(user_id)
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> Dict:
+        """取得快取命中統計"""
+        with self._lock:
+            total = self._fresh_hits + self._stale_hits + self._store_hits + self._line_fetches
+            served_without_line = self._fresh_hits + self._stale_hits + self._store_hits
+            return {
+                'size': len(self._cache),
+                'fresh_hits': self._fresh_hits,
+                'stale_hits': self._stale_hits,
+                'store_hits': self._store_hits,
+                'line_fetches': self._line_fetches,
+                'background_refreshes': self._background_refreshes,
+                'failures': self._failures,
+                'refreshing': len(self._refreshing),
+                'hit_ratio': (served_without_line / total) if total else 0
+            }
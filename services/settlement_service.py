@@ -1,10 +1,17 @@
 from typing import Dict, List, Tuple
+import heapq
 from models.settlement import PaymentPlan
 
 
 class SettlementService:
     """結算與分帳演算法服務"""
 
+    # 金額換算為整數最小單位的倍數（1 元 = 100 分）
+    MINOR_UNITS = 100
+
+    # 精確最少轉帳模式可處理的最大成員數（位元遮罩動態規劃為 O(n * 2^n)）
+    EXACT_MAX_PARTIES = 18
+
     @staticmethod
     def calculate_balances(expenses: List[Dict]) -> Dict[str, Dict]:
         """
@@ -44,9 +51,161 @@ class SettlementService:
         return balances
 
     @staticmethod
-    def calculate_optimal_payments(balances: Dict[str, Dict]) -> List[Dict]:
+    def calculate_optimal_payments(balances: Dict[str, Dict], exact: bool = False) -> List[Dict]:
+        """
+        計算最優化還款方案（最少轉帳次數）
+
+        金額先換算為整數最小單位（分）再計算，避免浮點誤差留下零頭。
+        - 預設：以 heap 實作的貪婪演算法，O(n log n)
+        - exact=True：先找出最多個總和為零的成員子集合，再於各子集合內貪婪配對，
+          可得到最少轉帳次數；成員數超過 EXACT_MAX_PARTIES 時退回貪婪演算法
+        """
+        names = {user_id: data.get('user_name', '未知') for user_id, data in balances.items()}
+        cents = SettlementService._to_minor_units(balances)
+
+        if exact and len(cents) <= SettlementService.EXACT_MAX_PARTIES:
+            groups = SettlementService._zero_sum_groups(cents)
+        else:
+            groups = [cents]
+
+        payment_plans = []
+        for group in groups:
+            for from_user_id, to_user_id, amount in SettlementService._settle_with_heap(group):
+                plan = PaymentPlan(
+                    from_user_id=from_user_id,
+                    from_user_name=names[from_user_id],
+                    to_user_id=to_user_id,
+                    to_user_name=names[to_user_id],
+                    amount=amount / SettlementService.MINOR_UNITS
+                )
+                payment_plans.append(plan.to_dict())
+
+        return payment_plans
+
+    @staticmethod
+    def _to_minor_units(balances: Dict[str, Dict]) -> Dict[str, int]:
+        """將淨收支換算為整數最小單位，並修正四捨五入造成的總和誤差
+
+        返回 {user_id: cents}，只包含非零的成員
+        """
+        cents = {
+            user_id: round(data.get('net_amount', 0) * SettlementService.MINOR_UNITS)
+            for user_id, data in balances.items()
+        }
+
+        # 四捨五入後總和可能不為零（例如 100 元三人均分），將差額歸給同方向金額最大的成員
+        residual = sum(cents.values())
+        if residual:
+            candidates = [uid for uid, amount in cents.items() if amount * residual > 0]
+            if candidates:
+                target = max(candidates, key=lambda uid: abs(cents[uid]))
+                cents[target] -= residual
+
+        return {user_id: amount for user_id, amount in cents.items() if amount != 0}
+
+    @staticmethod
+    def _settle_with_heap(cents: Dict[str, int]) -> List[Tuple[str, str, int]]:
+        """以 heap 貪婪配對：每次由最大債務人向最大債權人還款
+
+        返回 [(from_user_id, to_user_id, cents), ...]
+        """
+        creditors = [(-amount, user_id) for user_id, amount in cents.items() if amount > 0]
+        debtors = [(amount, user_id) for user_id, amount in cents.items() if amount < 0]
+        heapq.heapify(creditors)
+        heapq.heapify(debtors)
+
+        transfers = []
+        while creditors and debtors:
+            credit, creditor_id = heapq.heappop(creditors)
+            debt, debtor_id = heapq.heappop(debtors)
+
+            payment = min(-credit, -debt)
+            transfers.append((debtor_id, creditor_id, payment))
+
+            if -credit > payment:
+                heapq.heappush(creditors, (credit + payment, creditor_id))
+            if -debt > payment:
+                heapq.heappush(debtors, (debt + payment, debtor_id))
+
+        return transfers
+
+    @staticmethod
+    def _zero_sum_groups(cents: Dict[str, int]) -> List[Dict[str, int]]:
+        """將成員分成最多個總和為零的子集合
+
+        n 位成員分成 k 組時最少需要 n - k 筆轉帳。
+        先取出金額正好相反的成對成員（必定存在包含該組的最佳解），
+        其餘成員以位元遮罩動態規劃求解。
+        """
+        groups = []
+
+        # 成對抵銷
+        remaining = {}
+        waiting = {}
+        for user_id, amount in cents.items():
+            partners = waiting.get(-amount)
+            if partners:
+                partner_id = partners.pop()
+                groups.append({partner_id: -amount, user_id: amount})
+            else:
+                waiting.setdefault(amount, []).append(user_id)
+        for amount, user_ids in waiting.items():
+            for user_id in user_ids:
+                remaining[user_id] = amount
+
+        if not remaining:
+            return groups
+
+        user_ids = list(remaining)
+        values = [remaining[user_id] for user_id in user_ids]
+        n = len(values)
+        size = 1 << n
+
+        # sums[mask]: 子集合總和；dp[mask]: 子集合最多可分成幾個零和組
+        sums = [0] * size
+        dp = [0] * size
+        for mask in range(1, size):
+            low = mask & -mask
+            sums[mask] = sums[mask ^ low] + values[low.bit_length() - 1]
+
+            best = 0
+            rest = mask
+            while rest:
+                bit = rest & -rest
+                if dp[mask ^ bit] > best:
+                    best = dp[mask ^ bit]
+                rest ^= bit
+            dp[mask] = best + (1 if sums[mask] == 0 else 0)
+
+        # 回溯：依序移除成員，總和為零的前綴即為分組邊界
+        order = []
+        mask = size - 1
+        while mask:
+            target = dp[mask] - (1 if sums[mask] == 0 else 0)
+            rest = mask
+            while rest:
+                bit = rest & -rest
+                if dp[mask ^ bit] == target:
+                    break
+                rest ^= bit
+            order.append(bit.bit_length() - 1)
+            mask ^= bit
+
+        current = {}
+        running = 0
+        for index in reversed(order):
+            current[user_ids[index]] = values[index]
+            running += values[index]
+            if running == 0:
+                groups.append(current)
+                current = {}
+
+        return groups
+
+    @staticmethod
+    def calculate_greedy_payments_float(balances: Dict[str, Dict]) -> List[Dict]:
         """
-        使用貪婪演算法計算最優化還款方案（最少轉帳次數）
+        舊版浮點數貪婪演算法（每輪重新排序），保留供基準測試比較
         """
         # 分離債權人和債務人
         creditors = []  # (user_id, user_name, amount)
@@ -103,17 +262,21 @@ class SettlementService:
         balances: Dict[str, Dict],
         payment_plans: List[Dict],
         settled_by: str,
-        settled_by_name: str
+        settled_by_name: str,
+        expense_ids: List[str]
     ) -> Dict:
         """
         建立結算記錄資料
+        expense_ids 為計算結算時包含的支出，清帳（含中斷後續作）只標記這些支出
         """
         return {
             'group_id': group_id,
             'settlement_data': payment_plans,
             'balance_summary': balances,
             'settled_by': settled_by,
-            'settled_by_name': settled_by_name
+            'settled_by_name': settled_by_name,
+            'expense_count': len(expense_ids),
+            'expense_ids': expense_ids
         }
 
     @staticmethod
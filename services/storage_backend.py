@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+"""資料儲存後端介面
+
+FirebaseService（Firestore）與 MemoryBackend（記憶體，供離線基準測試使用）都實作此介面。
+Blueprint 與各服務一律透過 get_storage_backend() 取得目前設定的後端，
+由 Config.STORAGE_BACKEND 決定使用哪一個實作。
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Any, Tuple, Callable
+import re
+import threading
+
+from services.settlement_service import SettlementService
+
+
+class StorageBackend(ABC):
+    """資料儲存後端
+
+    子類別需實作各集合的讀寫操作；與儲存方式無關的邏輯（欄位投影驗證、分頁、
+    成員顯示資料、收支差額計算等）由此類別提供。
+    """
+
+    # 平行執行 count() 聚合查詢的執行緒數上限
+    COUNT_WORKERS = 8
+
+    # 欄位投影（fields=）允許的欄位名稱：僅限頂層欄位
+    _FIELD_NAME_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+    @classmethod
+    def _normalize_fields(cls, fields: Optional[List[str]]) -> Optional[List[str]]:
+        """整理欄位投影列表：去除重複與 id（id 一律回傳），並驗證欄位名稱
+
+        Raises:
+            ValueError: 欄位名稱不合法
+        """
+        if fields is None:
+            return None
+
+        normalized = []
+        for field in fields:
+            field = field.strip()
+            if not field or field == 'id' or field in normalized:
+                continue
+            if not cls._FIELD_NAME_PATTERN.match(field):
+                raise ValueError(f'無效的欄位名稱: {field}')
+            normalized.append(field)
+        return normalized
+
+    @staticmethod
+    def _is_same_profile(user: Dict, display_name: str, picture_url: str) -> bool:
+        """判斷使用者資料是否與傳入的名稱及頭像相同（picture_url 為空時不比較）"""
+        if user.get('display_name') != display_name:
+            return False
+        return not picture_url or user.get('picture_url') == picture_url
+
+    @staticmethod
+    def _to_cents(amount) -> int:
+        """金額轉為整數分（帳本以整數累加，避免浮點數誤差累積）"""
+        return int(round(float(amount or 0) * 100))
+
+    @classmethod
+    def _balance_delta(cls, old_expense: Optional[Dict] = None,
+                       new_expense: Optional[Dict] = None) -> Tuple[Dict[str, Dict], int]:
+        """計算支出異動造成的收支差額（以整數分計）
+
+        Args:
+            old_expense: 異動前的支出（新增時為 None）
+            new_expense: 異動後的支出（刪除時為 None）
+
+        Returns:
+            ({user_id: {user_name, net_cents}}, 未結算帳目數的變化)
+        """
+        delta = {}
+        count_delta = 0
+
+        for expense, sign in ((old_expense, -1), (new_expense, 1)):
+            # 已結算的帳目不計入帳本
+            if not expense or expense.get('is_settled'):
+                continue
+            count_delta += sign
+            for user_id, data in SettlementService.calculate_balances([expense]).items():
+                entry = delta.setdefault(user_id, {'user_name': data['user_name'], 'net_cents': 0})
+                entry['net_cents'] += sign * cls._to_cents(data['net_amount'])
+                if sign > 0:
+                    entry['user_name'] = data['user_name']
+
+        return delta, count_delta
+
+    # group_balances 文件中以整數分儲存的收支欄位；缺少此欄位的帳本（不存在或舊格式）需要重建
+    LEDGER_FIELD = 'balances_cents'
+
+    @classmethod
+    def _is_current_ledger(cls, ledger: Optional[Dict]) -> bool:
+        return ledger is not None and cls.LEDGER_FIELD in ledger
+
+    @classmethod
+    def _apply_to_ledger(cls, ledger: Optional[Dict], delta: Dict[str, Dict], count_delta: int) -> Dict:
+        """將收支差額套用到帳本，回傳新的帳本（不修改傳入的帳本）"""
+        ledger = ledger or {}
+        balances = {user_id: dict(entry) for user_id, entry in ledger.get(cls.LEDGER_FIELD, {}).items()}
+        for user_id, entry in delta.items():
+            current = balances.setdefault(user_id, {'user_name': entry['user_name'], 'net_cents': 0})
+            current['user_name'] = entry['user_name']
+            current['net_cents'] += entry['net_cents']
+        return {
+            cls.LEDGER_FIELD: balances,
+            'expense_count': ledger.get('expense_count', 0) + count_delta
+        }
+
+    @classmethod
+    def _ledger_from_expenses(cls, expenses: List[Dict]) -> Dict:
+        """由未結算的支出記錄計算帳本（逐筆累加，與增量維護的結果一致）"""
+        ledger = cls._apply_to_ledger(None, {}, 0)
+        for expense in expenses:
+            ledger = cls._apply_to_ledger(ledger, *cls._balance_delta(new_expense=expense))
+        return ledger
+
+    @classmethod
+    def _ledger_view(cls, ledger: Dict) -> Dict:
+        """帳本轉為對外格式 {balances: {user_id: {user_name, net_amount}}, expense_count}"""
+        return {
+            'balances': {
+                user_id: {'user_name': entry['user_name'], 'net_amount': entry['net_cents'] / 100}
+                for user_id, entry in ledger.get(cls.LEDGER_FIELD, {}).items()
+            },
+            'expense_count': ledger.get('expense_count', 0)
+        }
+
+    def _ledger_matches(self, ledger: Optional[Dict], expenses: List[Dict]) -> bool:
+        """帳本是否與未結算的支出記錄一致"""
+        if not self._is_current_ledger(ledger):
+            return False
+        expected = self._ledger_from_expenses(expenses)
+        if ledger.get('expense_count', 0) != expected['expense_count']:
+            return False
+        actual = ledger[self.LEDGER_FIELD]
+        for user_id in set(actual) | set(expected[self.LEDGER_FIELD]):
+            if actual.get(user_id, {}).get('net_cents', 0) != \
+                    expected[self.LEDGER_FIELD].get(user_id, {}).get('net_cents', 0):
+                return False
+        return True
+
+    def ping(self, timeout: Optional[float] = None):
+        """檢查儲存後端是否可連線（預設一律可用）；失敗時拋出例外"""
+
+    def warm_up(self):
+        """預先建立連線，讓第一個請求不必等待；失敗時拋出例外"""
+        self.ping()
+
+    # ===== 使用者相關操作 =====
+
+    @abstractmethod
+    def create_or_update_user(self, line_user_id: str, display_name: str, picture_url: str = '') -> Dict:
+        """建立或更新使用者"""
+
+    @abstractmethod
+    def get_user(self, line_user_id: str) -> Optional[Dict]:
+        """取得使用者資料"""
+
+    @abstractmethod
+    def invalidate_user(self, line_user_id: str):
+        """使快取中的使用者資料失效"""
+
+    @abstractmethod
+    def get_user_cache_stats(self) -> Dict:
+        """取得使用者快取的命中統計"""
+
+    @abstractmethod
+    def get_users(self, line_user_ids: List[str]) -> Dict[str, Dict]:
+        """批次取得多位使用者資料，不存在的使用者不會出現在結果中"""
+
+    def get_member_profiles(self, member_ids: List[str]) -> List[Dict]:
+        """取得群組成員的顯示資料（供成員列表與表單使用）
+
+        Args:
+            member_ids: 群組成員 ID 列表
+
+        Returns:
+            [{id, name, picture_url}, ...]，順序與 member_ids 相同
+        """
+        users = self.get_users(member_ids)
+
+        members = []
+        for user_id in member_ids:
+            user = users.get(user_id)
+            if user:
+                members.append({
+                    'id': user_id,
+                    'name': user.get('display_name', '未知用戶'),
+                    'picture_url': user.get('picture_url', '')
+                })
+
+        return members
+
+    # ===== 群組相關操作 =====
+
+    @abstractmethod
+    def create_group(self, group_name: str, created_by: str) -> Dict:
+        """建立群組，回傳包含 id 與 group_code 的群組資料"""
+
+    @abstractmethod
+    def get_group_by_code(self, group_code: str) -> Optional[Dict]:
+        """透過群組代碼取得群組"""
+
+    @abstractmethod
+    def join_group(self, group_id: str, user_id: str) -> bool:
+        """加入群組"""
+
+    @abstractmethod
+    def get_user_groups(self, user_id: str, fields: Optional[List[str]] = None) -> List[Dict]:
+        """取得使用者加入的所有群組（依 created_at 由新到舊）"""
+
+    @abstractmethod
+    def delete_group(self, group_id: str, parallel: bool = False,
+                     progress_callback: Optional[Callable[[str, int], None]] = None) -> bool:
+        """刪除群組及其所有相關資料"""
+
+    @abstractmethod
+    def start_group_deletion(self, group_id: str) -> bool:
+        """將群組標記為刪除中並排程刪除"""
+
+    @abstractmethod
+    def resume_group_deletions(self) -> int:
+        """重新排程所有尚未完成的群組刪除，回傳排程的群組數"""
+
+    # ===== 支出記錄相關操作 =====
+
+    @abstractmethod
+    def create_expense(self, expense_data: Dict) -> str:
+        """建立支出記錄（配發帳目編號並更新群組收支帳本），回傳支出記錄 ID
+
+        Raises:
+            LookupError: 群組不存在
+        """
+
+    @abstractmethod
+    def get_expense(self, expense_id: str) -> Optional[Dict]:
+        """取得單筆支出記錄"""
+
+    @abstractmethod
+    def get_group_expenses(self, group_id: str, is_settled: bool = None, limit: int = 50,
+                           start_after: Optional[str] = None,
+                           fields: Optional[List[str]] = None) -> List[Dict]:
+        """取得群組的支出記錄（依 created_at 由新到舊）
+
+        Raises:
+            ValueError: 分頁游標或欄位名稱不合法
+        """
+
+    def get_group_expenses_page(self, group_id: str, is_settled: bool = None, page_size: int = 50,
+                                cursor: Optional[str] = None,
+                                fields: Optional[List[str]] = None) -> Tuple[List[Dict], Optional[str]]:
+        """分頁取得群組的支出記錄
+
+        Args:
+            group_id: 群組 ID
+            is_settled: 是否已結算。None 表示取得所有帳目
+            page_size: 每頁數量
+            cursor: 上一頁回傳的游標，None 表示第一頁
+            fields: 只取得指定欄位，None 表示取得完整文件
+
+        Returns:
+            (支出記錄列表, 下一頁游標)，沒有下一頁時游標為 None
+        """
+        # 多取一筆以判斷是否還有下一頁
+        expenses = self.get_group_expenses(group_id, is_settled, limit=page_size + 1,
+                                           start_after=cursor, fields=fields)
+
+        next_cursor = None
+        if len(expenses) > page_size:
+            expenses = expenses[:page_size]
+            next_cursor = expenses[-1]['id']
+
+        return expenses, next_cursor
+
+    @abstractmethod
+    def get_expense_by_number(self, group_id: str, expense_number: int) -> Optional[Dict]:
+        """根據帳目編號取得支出記錄"""
+
+    @abstractmethod
+    def update_expense(self, expense_id: str, updates: Dict) -> bool:
+        """更新支出記錄，並同步更新群組收支帳本"""
+
+    @abstractmethod
+    def delete_expense(self, expense_id: str) -> bool:
+        """刪除支出記錄，並同步更新群組收支帳本"""
+
+    @abstractmethod
+    def settle_expenses(self, group_id: str, settlement_id: str, expense_ids: List[str]) -> int:
+        """將結算記錄包含的支出標記為已結算並從收支帳本扣除，回傳本次標記的支出數量
+
+        已結算、已刪除或不屬於群組的支出會略過，因此中途失敗後以相同參數重試即可繼續
+        """
+
+    # ===== 群組收支帳本相關操作 =====
+
+    @abstractmethod
+    def get_group_balances(self, group_id: str) -> Dict:
+        """取得群組收支帳本 {balances: {user_id: {user_name, net_amount}}, expense_count}"""
+
+    @abstractmethod
+    def rebuild_group_balances(self, group_id: str) -> Dict:
+        """由未結算的支出記錄重新計算並覆寫群組收支帳本"""
+
+    @abstractmethod
+    def verify_group_balances(self, group_id: str, repair: bool = False) -> bool:
+        """檢查群組收支帳本是否與未結算的支出記錄一致"""
+
+    # ===== 結算記錄相關操作 =====
+
+    @abstractmethod
+    def create_settlement(self, settlement_data: Dict) -> str:
+        """建立結算記錄（狀態為 pending），回傳結算記錄 ID"""
+
+    @abstractmethod
+    def get_pending_settlement(self, group_id: str) -> Optional[Dict]:
+        """取得群組尚未完成標記的結算記錄"""
+
+    @abstractmethod
+    def get_settlement_expenses(self, settlement_id: str) -> List[Dict]:
+        """取得某次結算所包含的支出記錄"""
+
+    @abstractmethod
+    def get_group_settlements(self, group_id: str, limit: int = 10) -> List[Dict]:
+        """取得群組的結算記錄（依 settled_at 由新到舊）"""
+
+    # ===== 群組版本戳記相關操作 =====
+
+    @abstractmethod
+    def get_group_version(self, group_id: str) -> str:
+        """取得群組資料的版本戳記（從未寫入過時為 '0'）"""
+
+    @abstractmethod
+    def set_group_version(self, group_id: str, version: str):
+        """寫入群組資料的版本戳記"""
+
+    # ===== 待辦事項索引相關操作 =====
+
+    @abstractmethod
+    def add_todo_meta(self, group_id: str, category: Optional[str] = None,
+                      assignee_id: Optional[str] = None, assignee_name: Optional[str] = None):
+        """將類別與負責人加入群組的待辦事項索引（只增不減）"""
+
+    @abstractmethod
+    def get_todo_meta(self, group_id: str) -> Dict:
+        """取得群組的待辦事項索引 {'categories': [...], 'assignees': {...}}"""
+
+    @abstractmethod
+    def rebuild_todo_meta(self, group_id: str) -> Dict:
+        """以群組現有的待辦事項重建索引"""
+
+    # ===== Webhook 事件相關操作 =====
+
+    @abstractmethod
+    def claim_webhook_event(self, event_id: str, ttl_seconds: float) -> bool:
+        """記錄已處理的 webhook 事件，重複事件回傳 False"""
+
+    @abstractmethod
+    def claim_lease(self, name: str, ttl_seconds: float) -> bool:
+        """取得具期限的租約（多個 process 或實例中只有一個會成功，期限過後可再次取得）"""
+
+    # ===== 通用 CRUD 操作 =====
+
+    @abstractmethod
+    def create(self, collection: str, data: Dict) -> str:
+        """建立文件，回傳文件 ID"""
+
+    @abstractmethod
+    def get(self, collection: str, doc_id: str, model: Optional[type] = None) -> Optional[Any]:
+        """取得文件；指定 model 時以 model.from_snapshot 建立模型物件"""
+
+    @abstractmethod
+    def count(self, collection: str, conditions: List[tuple]) -> int:
+        """計算符合條件的文件數"""
+
+    def count_many(self, collection: str, queries: Dict[str, List[tuple]]) -> Dict[str, int]:
+        """平行執行多個計數查詢
+
+        Args:
+            collection: Collection 名稱
+            queries: {名稱: 查詢條件列表}
+
+        Returns:
+            {名稱: 文件數}
+        """
+        if not queries:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(len(queries), self.COUNT_WORKERS)) as executor:
+            futures = {
+                name: executor.submit(self.count, collection, conditions)
+                for name, conditions in queries.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
+
+    @abstractmethod
+    def update(self, collection: str, doc_id: str, data: Dict) -> bool:
+        """更新文件"""
+
+    @abstractmethod
+    def delete(self, collection: str, doc_id: str) -> bool:
+        """刪除文件"""
+
+    @abstractmethod
+    def query(self, collection: str, conditions: List[tuple],
+              order_by: Optional[str] = None,
+              order_direction: str = 'asc',
+              limit: Optional[int] = None,
+              model: Optional[type] = None,
+              fields: Optional[List[str]] = None) -> List[Any]:
+        """查詢文件
+
+        Args:
+            collection: Collection 名稱
+            conditions: 查詢條件列表 [('field', 'operator', 'value'), ...]
+            order_by: 排序欄位
+            order_direction: 排序方向 ('asc' or 'desc')
+            limit: 限制數量
+            model: 指定時以 model.from_snapshot 建立模型物件，而非回傳字典
+            fields: 只取得指定欄位，None 表示取得完整文件
+        """
+
+
+def create_storage_backend(name: str) -> StorageBackend:
+    """依名稱建立儲存後端
+
+    Args:
+        name: 'firestore' 或 'memory'
+
+    Raises:
+        ValueError: 不支援的後端名稱
+    """
+    if name == 'firestore':
+        from services.firebase_service import FirebaseService
+        return FirebaseService()
+    if name == 'memory':
+        from services.memory_backend import MemoryBackend
+        return MemoryBackend()
+    raise ValueError(f"不支援的儲存後端: {name}")
+
+
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_storage_backend() -> StorageBackend:
+    """取得 Config.STORAGE_BACKEND 設定的儲存後端（整個 process 共用同一個實例）
+
+    METRICS_ENABLED 時回傳的物件會量測每次呼叫的耗時，並計入目前請求的統計
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                from config import Config
+                backend = create_storage_backend(Config.STORAGE_BACKEND)
+                if Config.METRICS_ENABLED:
+                    from utils.metrics import InstrumentedProxy
+                    backend = InstrumentedProxy(backend, 'storage')
+                _backend = backend
+    return _backend
@@ -2,7 +2,7 @@
 from typing import List, Dict, Optional
 from datetime import datetime
 from models.todo import Todo
-from services.firebase_service import FirebaseService
+from services.storage_backend import get_storage_backend
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,19 +11,26 @@ logger = logging.getLogger(__name__)
 class TodoService:
     """待辦事項服務"""
 
+    STATUSES = ('pending', 'in_progress', 'completed', 'cancelled')
+    DEFAULT_CATEGORIES = ['一般', '工作', '學習', '生活', '購物', '其他']
+
     def __init__(self):
-        self.db = FirebaseService()
+        self.db = get_storage_backend()
 
     def create_todo(self, todo_data: Dict) -> Dict:
-        """建立待辦事項"""
+        """建立待辦事項（未提供的欄位寫入 Todo 模型的預設值，如 status 與 category）"""
         try:
-            # 設置時間戳
-            if 'created_at' not in todo_data:
-                todo_data['created_at'] = datetime.now()
-            if 'updated_at' not in todo_data:
-                todo_data['updated_at'] = datetime.now()
+            todo = Todo.from_dict(todo_data)
+            todo_data = {**todo_data, **todo.to_dict()}
+            todo_data.pop('id', None)
+
+            # 時間欄位以 datetime 儲存（to_dict 會轉為字串）
+            todo_data['created_at'] = todo.created_at
+            todo_data['updated_at'] = todo.updated_at
+            todo_data['completed_at'] = todo.completed_at
 
             todo_id = self.db.create('todos', todo_data)
+            self._update_meta(todo_data.get('group_id'), todo_data)
             return {'success': True, 'todo_id': todo_id}
         except Exception as e:
             logger.error(f"建立待辦事項失敗: {e}")
@@ -32,10 +39,7 @@ class TodoService:
     def get_todo(self, todo_id: str) -> Optional[Todo]:
         """取得單一待辦事項"""
         try:
-            data = self.db.get('todos', todo_id)
-            if data:
-                return Todo.from_dict(data)
-            return None
+            return self.db.get('todos', todo_id, model=Todo)
         except Exception as e:
             logger.error(f"取得待辦事項失敗: {e}")
             return None
@@ -52,9 +56,7 @@ class TodoService:
             if category:
                 conditions.append(('category', '==', category))
 
-            results = self.db.query('todos', conditions, order_by='created_at', order_direction='desc')
-
-            return [Todo.from_dict(data) for data in results]
+            return self.db.query('todos', conditions, order_by='created_at', order_direction='desc', model=Todo)
         except Exception as e:
             logger.error(f"取得群組待辦事項失敗: {e}")
             return []
@@ -70,10 +72,8 @@ class TodoService:
             if status:
                 conditions.append(('status', '==', status))
 
-            results = self.db.query('todos', conditions, order_by='created_at',
-                                   order_direction='desc')
-
-            return [Todo.from_dict(data) for data in results]
+            return self.db.query('todos', conditions, order_by='created_at',
+                                 order_direction='desc', model=Todo)
         except Exception as e:
             logger.error(f"取得使用者待辦事項失敗: {e}")
             return []
@@ -88,6 +88,12 @@ class TodoService:
                 updates['completed_at'] = datetime.now()
 
             success = self.db.update('todos', todo_id, updates)
+            if success and (updates.get('category') or updates.get('assignee_id')):
+                group_id = updates.get('group_id')
+                if not group_id:
+                    todo = self.db.get('todos', todo_id)
+                    group_id = todo.get('group_id') if todo else None
+                self._update_meta(group_id, updates)
             return {'success': success}
         except Exception as e:
             logger.error(f"更新待辦事項失敗: {e}")
@@ -113,52 +119,85 @@ class TodoService:
         """標記為進行中"""
         return self.update_todo(todo_id, {'status': 'in_progress'})
 
-    def get_categories(self, group_id: str) -> List[str]:
-        """取得群組的所有類別"""
+    def _update_meta(self, group_id: Optional[str], data: Dict):
+        """將類別與負責人加入群組的待辦事項索引（失敗不影響待辦事項本身）"""
+        if not group_id:
+            return
         try:
-            todos = self.get_group_todos(group_id)
-            categories = set()
+            self.db.add_todo_meta(
+                group_id,
+                category=data.get('category'),
+                assignee_id=data.get('assignee_id'),
+                assignee_name=data.get('assignee_name')
+            )
+        except Exception as e:
+            logger.warning(f"更新待辦事項索引失敗: {e}")
 
-            for todo in todos:
-                if todo.category:
-                    categories.add(todo.category)
+    def get_categories(self, group_id: str) -> List[str]:
+        """取得群組的所有類別（由群組待辦事項索引取得，不需讀取所有待辦事項）"""
+        try:
+            categories = set(self.db.get_todo_meta(group_id)['categories'])
 
             # 加入預設類別
-            default_categories = ['一般', '工作', '學習', '生活', '購物', '其他']
-            categories.update(default_categories)
+            categories.update(self.DEFAULT_CATEGORIES)
 
             return sorted(list(categories))
         except Exception as e:
             logger.error(f"取得類別失敗: {e}")
-            return ['一般', '工作', '學習', '生活', '購物', '其他']
+            return sorted(self.DEFAULT_CATEGORIES)
 
     def get_statistics(self, group_id: str) -> Dict:
-        """取得待辦事項統計"""
-        try:
-            todos = self.get_group_todos(group_id)
-
-            total = len(todos)
-            pending = len([t for t in todos if t.status == 'pending'])
-            in_progress = len([t for t in todos if t.status == 'in_progress'])
-            completed = len([t for t in todos if t.status == 'completed'])
+        """取得待辦事項統計
 
-            # 按類別統計
+        以 count() 聚合查詢計算各狀態、類別與負責人的數量，
+        查詢數取決於類別與負責人數量，與待辦事項總數無關。
+        舊資料可能沒有 status / category 欄位，依 Todo 模型的預設值分別計為 pending 與「一般」
+        """
+        try:
+            meta = self.db.get_todo_meta(group_id)
+            base = [('group_id', '==', group_id)]
+
+            queries = {'total': base}
+            for status in self.STATUSES:
+                queries[('status', status)] = base + [('status', '==', status)]
+            for category in meta['categories']:
+                queries[('category', category)] = base + [('category', '==', category)]
+            queries[('category', '')] = base + [('category', '==', '')]
+            for assignee_id in meta['assignees']:
+                queries[('assignee', assignee_id)] = base + [('assignee_id', '==', assignee_id)]
+
+            counts = self.db.count_many('todos', queries)
+
+            total = counts['total']
+            completed = counts[('status', 'completed')]
+            # 沒有 status 欄位的舊資料視為 pending
+            missing_status = total - sum(counts[('status', status)] for status in self.STATUSES)
+            pending = counts[('status', 'pending')] + max(missing_status, 0)
+
+            # 按類別統計（類別為空字串的歸為「未分類」，沒有 category 欄位的舊資料視為「一般」）
             by_category = {}
-            for todo in todos:
-                category = todo.category or '未分類'
-                by_category[category] = by_category.get(category, 0) + 1
+            for category in meta['categories']:
+                if counts[('category', category)]:
+                    by_category[category] = counts[('category', category)]
+            uncategorized = counts[('category', '')]
+            missing_category = total - sum(by_category.values()) - uncategorized
+            if missing_category > 0:
+                by_category['一般'] = by_category.get('一般', 0) + missing_category
+            if uncategorized > 0:
+                by_category['未分類'] = uncategorized
 
             # 按負責人統計
             by_assignee = {}
-            for todo in todos:
-                if todo.assignee_name:
-                    assignee = todo.assignee_name
-                    by_assignee[assignee] = by_assignee.get(assignee, 0) + 1
+            for assignee_id, assignee_name in meta['assignees'].items():
+                count = counts[('assignee', assignee_id)]
+                if count:
+                    name = assignee_name or assignee_id
+                    by_assignee[name] = by_assignee.get(name, 0) + count
 
             return {
                 'total': total,
                 'pending': pending,
-                'in_progress': in_progress,
+                'in_progress': counts[('status', 'in_progress')],
                 'completed': completed,
                 'completion_rate': (completed / total * 100) if total > 0 else 0,
                 'by_category': by_category,
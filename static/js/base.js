@@ -237,8 +237,56 @@ function showConfirm(message, options = {}) {
   });
 }
 
+// ETag 快取（sessionStorage），key 為 GET 請求的 URL
+const ETAG_CACHE_PREFIX = 'etag:';
+
+/**
+ * 取得 URL 對應的 ETag 快取
+ * @param {string} url - API 端點
+ * @returns {Object|null} {etag, data}
+ */
+function getEtagCache(url) {
+  try {
+    const cached = sessionStorage.getItem(ETAG_CACHE_PREFIX + url);
+    return cached ? JSON.parse(cached) : null;
+  } catch (error) {
+    return null;
+  }
+}
+
+/**
+ * 寫入 URL 對應的 ETag 快取
+ * @param {string} url - API 端點
+ * @param {string} etag - 伺服器回傳的 ETag
+ * @param {Object} data - 回應內容
+ */
+function setEtagCache(url, etag, data) {
+  try {
+    sessionStorage.setItem(ETAG_CACHE_PREFIX + url, JSON.stringify({ etag, data }));
+  } catch (error) {
+    // 空間不足時清除舊的快取，下次再重新取得
+    clearEtagCache();
+  }
+}
+
+/**
+ * 清除所有 ETag 快取
+ */
+function clearEtagCache() {
+  try {
+    Object.keys(sessionStorage)
+      .filter(key => key.startsWith(ETAG_CACHE_PREFIX))
+      .forEach(key => sessionStorage.removeItem(key));
+  } catch (error) {
+    // sessionStorage 無法使用時忽略
+  }
+}
+
 /**
  * API 請求輔助函數
+ *
+ * GET 請求會帶上 If-None-Match，伺服器回應 304 時直接使用快取的內容；
+ * 其他請求成功後會清除 ETag 快取，確保之後讀到自己寫入的資料
  * @param {string} url - API 端點
  * @param {Object} options - fetch 選項
  * @returns {Promise} API 回應
@@ -259,14 +307,36 @@ async function apiRequest(url, options = {}) {
     },
   };
 
+  const isGet = (mergedOptions.method || 'GET').toUpperCase() === 'GET';
+  const cached = isGet ? getEtagCache(url) : null;
+  if (cached) {
+    mergedOptions.headers['If-None-Match'] = cached.etag;
+    // 由這裡自行處理 304，不經過瀏覽器 HTTP 快取
+    mergedOptions.cache = 'no-store';
+  }
+
   try {
     const response = await fetch(url, mergedOptions);
+
+    if (response.status === 304 && cached) {
+      return cached.data;
+    }
+
     const data = await response.json();
 
     if (!response.ok) {
       throw new Error(data.error || `HTTP error! status: ${response.status}`);
     }
 
+    if (isGet) {
+      const etag = response.headers.get('ETag');
+      if (etag) {
+        setEtagCache(url, etag, data);
+      }
+    } else {
+      clearEtagCache();
+    }
+
     return data;
   } catch (error) {
     console.error('API request failed:', error);
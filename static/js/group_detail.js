@@ -123,7 +123,8 @@ function displayGroupInfo(group) {
  */
 async function loadExpenses() {
   try {
-    const response = await apiRequest(`/api/groups/${groupId}/expenses`, {
+    const fields = 'description,amount,payer_name,split_type,split_count,is_settled,created_at';
+    const response = await apiRequest(`/api/groups/${groupId}/expenses?fields=${fields}`, {
       method: 'GET'
     });
 
@@ -198,7 +199,7 @@ function displayExpenses(expenses) {
                 <div class="expense-info">
                     付款人：${escapeHtml(expense.payer_name)} |
                     分帳方式：${getSplitTypeText(expense.split_type)} |
-                    分帳人數：${expense.splits ? expense.splits.length : 0} 人
+                    分帳人數：${expense.split_count !== undefined ? expense.split_count : (expense.splits ? expense.splits.length : 0)} 人
                 </div>
                 <div class="expense-footer">
                     <span class="expense-date">${date}</span>
@@ -32,7 +32,8 @@ async function initGroupsListPage(liffId) {
  */
 async function loadGroups() {
   try {
-    const response = await apiRequest(`/api/groups?user_id=${userId}`, {
+    const fields = 'group_name,group_code,created_by,members';
+    const response = await apiRequest(`/api/groups?user_id=${userId}&fields=${fields}`, {
       method: 'GET'
     });
 
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""群組待辦事項索引（todo_meta）測試 - 以記憶體儲存後端執行"""
+
+from datetime import datetime
+from unittest import mock
+import unittest
+
+from services.memory_backend import MemoryBackend
+from services.todo_service import TodoService
+
+
+class TodoMetaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.storage = MemoryBackend()
+        with mock.patch('services.todo_service.get_storage_backend', return_value=self.storage):
+            self.service = TodoService()
+        self.group_id = self.storage.create_group('測試群組', 'U1')['id']
+
+    def _create_legacy_todo(self, **fields):
+        """直接寫入待辦事項，不經過 TodoService（模擬索引建立前的舊資料）"""
+        data = {'group_id': self.group_id, 'title': '舊待辦', 'created_at': datetime.now(), **fields}
+        return self.storage.create('todos', data)
+
+    def test_add_before_first_read_keeps_existing_todos(self):
+        self._create_legacy_todo(category='旅遊', assignee_id='U2', assignee_name='小明', status='pending')
+        self._create_legacy_todo(category='旅遊', assignee_id='U2', assignee_name='小明', status='completed')
+
+        # 索引尚不存在時先新增一筆：只會建立部分索引，讀取時必須以現有待辦事項補齊
+        result = self.service.create_todo({'group_id': self.group_id, 'title': '新待辦', 'category': '購物'})
+        self.assertTrue(result['success'])
+
+        categories = self.service.get_categories(self.group_id)
+        self.assertIn('旅遊', categories)
+        self.assertIn('購物', categories)
+
+        stats = self.service.get_statistics(self.group_id)
+        self.assertEqual(stats['total'], 3)
+        self.assertEqual(stats['pending'], 2)
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(stats['by_category'], {'旅遊': 2, '購物': 1})
+        self.assertEqual(stats['by_assignee'], {'小明': 2})
+
+    def test_update_before_first_read_keeps_existing_todos(self):
+        self._create_legacy_todo(category='旅遊', assignee_id='U2', assignee_name='小明')
+        todo_id = self._create_legacy_todo(category='工作')
+
+        self.service.update_todo(todo_id, {'assignee_id': 'U3', 'assignee_name': '小華'})
+
+        stats = self.service.get_statistics(self.group_id)
+        self.assertEqual(stats['by_category'], {'旅遊': 1, '工作': 1})
+        self.assertEqual(stats['by_assignee'], {'小明': 1, '小華': 1})
+        self.assertEqual(stats['pending'], 2)
+
+    def test_rebuild_runs_once(self):
+        self._create_legacy_todo(category='旅遊')
+        self.service.get_categories(self.group_id)
+
+        with mock.patch.object(self.storage, 'rebuild_todo_meta') as rebuild:
+            self.service.create_todo({'group_id': self.group_id, 'title': '新待辦'})
+            self.service.get_categories(self.group_id)
+            rebuild.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
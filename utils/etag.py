@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""群組版本戳記與條件式 GET（ETag / If-None-Match）"""
+
+from flask import Response, make_response, request
+from functools import wraps
+from typing import Callable
+import hashlib
+import logging
+import uuid
+
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class GroupVersionCache:
+    """群組資料版本戳記
+
+    任何寫入都會以新的隨機戳記取代舊值（寫入 Firestore group_versions 集合並更新本機快取）。
+    讀取時在 ttl 秒內直接使用本機快取，不需查詢 Firestore；
+    其他 process 的寫入最多在 ttl 秒後才會被看見。
+    """
+
+    def __init__(self, store, ttl: float = 5, maxsize: int = 4096):
+        self.store = store
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, group_id: str) -> str:
+        """取得群組目前的版本戳記"""
+        version = self._cache.get(group_id)
+        if version is None:
+            version = self.store.get_group_version(group_id)
+            self._cache.set(group_id, version)
+        return version
+
+    def bump(self, group_id: str):
+        """群組資料有變動時更新版本戳記"""
+        if not group_id:
+            return
+        version = uuid.uuid4().hex[:16]
+        try:
+            self.store.set_group_version(group_id, version)
+            self._cache.set(group_id, version)
+        except Exception as e:
+            # 寫入失敗時至少讓本機快取失效，下次重新讀取
+            self._cache.invalidate(group_id)
+            logger.warning(f"更新群組版本戳記失敗: {e}")
+
+    def forget(self, group_id: str):
+        """群組已刪除時移除本機快取（版本戳記文件由刪除群組的流程一併刪除，不再寫入）"""
+        self._cache.invalidate(group_id)
+
+    def stats(self):
+        """取得快取統計"""
+        return self._cache.stats()
+
+
+def make_etag(version: str, full_path: str) -> str:
+    """由群組版本戳記與請求路徑（含查詢參數）產生 ETag"""
+    path_hash = hashlib.blake2b(full_path.encode('utf-8'), digest_size=8).hexdigest()
+    return f"{version}-{path_hash}"
+
+
+def group_etag(versions: GroupVersionCache, deletes_group: bool = False) -> Callable:
+    """群組資料 GET API 的條件式請求裝飾器
+
+    - GET：先比對 If-None-Match 與目前版本，相同時直接回應 304，不查詢資料；
+      讀取版本戳記失敗時不處理 ETag，直接執行路由（回應格式與一般情況相同）
+    - 其他方法（寫入）：回應 2xx 時才更新群組版本戳記，失敗的寫入不會讓用戶端快取失效
+    - deletes_group：此路由的 DELETE 會刪除群組本身，成功時只移除本機快取，
+      不再寫入版本戳記（避免重新建立已刪除群組的 group_versions 文件）
+    路由必須包含 group_id 參數；?by=code 以群組代碼查詢時不處理 ETag
+
+    版本戳記在各 process 的本機快取 ETAG_VERSION_TTL 秒，多個 gunicorn worker 時，
+    其他 worker 在這段時間內仍可能以舊版本回應 304
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(group_id, *args, **kwargs):
+            if request.method != 'GET':
+                response = make_response(view(group_id, *args, **kwargs))
+                if 200 <= response.status_code < 300:
+                    if deletes_group and request.method == 'DELETE':
+                        versions.forget(group_id)
+                    else:
+                        versions.bump(group_id)
+                return response
+
+            if request.args.get('by') == 'code':
+                return view(group_id, *args, **kwargs)
+
+            # 先取得版本再查詢資料：查詢期間若有寫入，版本已不同，不會誤判為未變更
+            try:
+                version = versions.get(group_id)
+            except Exception as e:
+                logger.warning(f"取得群組版本戳記失敗，略過 ETag: {e}")
+                return view(group_id, *args, **kwargs)
+
+            etag = make_etag(version, request.full_path)
+            if request.if_none_match.contains(etag):
+                not_modified = Response(status=304)
+                not_modified.set_etag(etag)
+                not_modified.headers['Cache-Control'] = 'no-cache'
+                return not_modified
+
+            response = make_response(view(group_id, *args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        return wrapper
+
+    return decorator
@@ -3,6 +3,8 @@ from linebot.v3.messaging import FlexMessage, FlexContainer
 from typing import Dict, List
 import json
 from utils.liff_enum import LIFF
+from utils.flex_template import FlexTemplate, Slot
+from utils.timestamp import format_date
 
 
 class FlexMessageHelper:
@@ -28,70 +30,21 @@ class FlexMessageHelper:
         - RFC 2822 字串格式（如 'Mon, 22 Dec 2025 03:52:24 GMT'）
         - ISO 格式字串
         """
-        if not created_at:
-            return default
-        
-        from datetime import datetime
-        from email.utils import parsedate_to_datetime
-        
-        # 如果是 datetime 物件
-        if hasattr(created_at, 'strftime'):
-            return created_at.strftime('%Y-%m-%d')
-        
-        # 如果是 Firestore Timestamp 字典
-        if isinstance(created_at, dict) and 'seconds' in created_at:
-            return datetime.fromtimestamp(created_at['seconds']).strftime('%Y-%m-%d')
-        
-        # 如果是字串
-        if isinstance(created_at, str):
-            try:
-                # 嘗試解析 RFC 2822 格式（如 'Mon, 22 Dec 2025 03:52:24 GMT'）
-                dt = parsedate_to_datetime(created_at)
-                return dt.strftime('%Y-%m-%d')
-            except (ValueError, TypeError):
-                try:
-                    # 嘗試解析 ISO 格式
-                    dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                    return dt.strftime('%Y-%m-%d')
-                except (ValueError, TypeError):
-                    # 如果都解析失敗，返回預設值
-                    return default
-        
-        return default
+        return format_date(created_at, default=default) if created_at else default
 
     @staticmethod
     def _create_row(label: str, value: str) -> Dict:
         """建立詳細資訊的一行"""
-        return {
-            "type": "box",
-            "layout": "baseline",
-            "contents": [
-                {
-                    "type": "text",
-                    "text": label,
-                    "color": FlexMessageHelper.COLOR_TEXT_SUB,
-                    "size": "sm",
-                    "flex": 1
-                },
-                {
-                    "type": "text",
-                    "text": str(value),
-                    "wrap": True,
-                    "color": FlexMessageHelper.COLOR_TEXT_MAIN,
-                    "size": "sm",
-                    "flex": 3
-                }
-            ],
-            "margin": "md"
-        }
+        return _ROW_TEMPLATE.render({'label': label, 'value': str(value)})
 
     @staticmethod
-    def create_expense_success(expense: Dict, splits: List[Dict], is_edit: bool = False) -> Dict:
-        """建立記帳成功／更新成功的 Flex Message bubble
+    def _create_mini_row(name: str, amount_text: str, color: str) -> Dict:
+        """建立結算概況的一行（名稱靠左、金額靠右）"""
+        return _MINI_ROW_TEMPLATE.render({'name': name, 'amount': amount_text, 'color': color})
 
-        回傳純 bubble 字典，前端需自行包裝成 {type: 'flex', altText: '...', contents: bubble}
-        後端若要使用 FlexMessage，需自行用 FlexMessage(contents=FlexContainer.from_dict(bubble))
-        """
+    @staticmethod
+    def _expense_success_values(expense: Dict, splits: List[Dict], is_edit: bool = False) -> Dict:
+        """記帳成功 bubble 的變動欄位"""
         split_type_names = {
             'equal': '平均分帳',
             'selected': '指定成員',
@@ -100,245 +53,59 @@ class FlexMessageHelper:
         }
 
         # 建立分帳明細
-        split_contents = []
-        for split in splits:
-            split_contents.append({
-                "type": "box",
-                "layout": "horizontal",
-                "contents": [
-                    {
-                        "type": "text",
-                        "text": split['user_name'],
-                        "size": "sm",
-                        "color": FlexMessageHelper.COLOR_TEXT_MAIN,
-                        "flex": 0
-                    },
-                    {
-                        "type": "text",
-                        "text": f"NT$ {int(split['amount']):,}",
-                        "size": "sm",
-                        "color": FlexMessageHelper.COLOR_TEXT_MAIN,
-                        "align": "end"
-                    }
-                ],
-                "margin": "sm"
+        split_rows = [
+            _SPLIT_ROW_TEMPLATE.render({
+                'user_name': split['user_name'],
+                'amount': f"NT$ {int(split['amount']):,}"
             })
+            for split in splits
+        ]
 
-        # 格式化日期
-        date_str = FlexMessageHelper._format_date(expense.get('created_at'), default='剛剛')
+        return {
+            # 依據模式決定標題與顏色
+            'header_title': "帳目已更新" if is_edit else "記帳成功",
+            'header_color': FlexMessageHelper.COLOR_WARNING if is_edit else FlexMessageHelper.COLOR_SUCCESS,
+            'amount': f"{int(expense['amount']):,}",
+            'description': str(expense['description']),
+            'payer_name': str(expense['payer_name']),
+            'split_type': split_type_names.get(expense['split_type'], '平均分帳'),
+            'date': FlexMessageHelper._format_date(expense.get('created_at'), default='剛剛'),
+            'split_rows': split_rows,
+            'expense_id': f"Expense ID: #{expense.get('expense_number', 0):03d}",
+            'uri': f"https://liff.line.me/{LIFF.get_liff_id('FULL')}/expenses/{expense.get('expense_number', 0)}"
+        }
 
-        # 依據模式決定標題與顏色
-        header_title = "帳目已更新" if is_edit else "記帳成功"
-        header_color = FlexMessageHelper.COLOR_WARNING if is_edit else FlexMessageHelper.COLOR_SUCCESS
+    @staticmethod
+    def create_expense_success(expense: Dict, splits: List[Dict], is_edit: bool = False) -> Dict:
+        """建立記帳成功／更新成功的 Flex Message bubble
 
-        bubble = {
-            "type": "bubble",
-            "size": "giga",
-            "header": {
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    {
-                        "type": "text",
-                        "text": "RECEIPT",
-                        "weight": "bold",
-                        "color": "#ffffff",
-                        "size": "xxs",
-                        "align": "center",
-                        "lineSpacing": "2px"
-                    },
-                    {
-                        "type": "text",
-                        "text": header_title,
-                        "weight": "bold",
-                        "color": "#ffffff",
-                        "size": "lg",
-                        "align": "center",
-                        "margin": "sm"
-                    }
-                ],
-                "backgroundColor": header_color,
-                "paddingAll": "20px"
-            },
-            "body": {
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    # 金額顯示
-                    {
-                        "type": "text",
-                        "text": "NT$",
-                        "size": "sm",
-                        "color": FlexMessageHelper.COLOR_TEXT_SUB,
-                        "align": "center"
-                    },
-                    {
-                        "type": "text",
-                        "text": f"{int(expense['amount']):,}",
-                        "size": "4xl",
-                        "weight": "bold",
-                        "color": FlexMessageHelper.COLOR_TEXT_MAIN,
-                        "align": "center"
-                    },
-                    {
-                        "type": "separator",
-                        "margin": "xl"
-                    },
-                    # 詳細資訊
-                    {
-                        "type": "box",
-                        "layout": "vertical",
-                        "margin": "xl",
-                        "spacing": "md",
-                        "contents": [
-                            FlexMessageHelper._create_row("項目", expense['description']),
-                            FlexMessageHelper._create_row("付款人", expense['payer_name']),
-                            FlexMessageHelper._create_row("分帳方式", split_type_names.get(expense['split_type'], '平均分帳')),
-                            FlexMessageHelper._create_row("日期", date_str),
-                        ]
-                    },
-                    {
-                        "type": "separator",
-                        "margin": "xl"
-                    },
-                    # 分帳明細標題
-                    {
-                        "type": "text",
-                        "text": "分帳明細",
-                        "size": "xs",
-                        "color": FlexMessageHelper.COLOR_TEXT_SUB,
-                        "margin": "xl",
-                        "weight": "bold"
-                    },
-                    # 分帳明細列表
-                    {
-                        "type": "box",
-                        "layout": "vertical",
-                        "margin": "md",
-                        "contents": split_contents
-                    }
-                ]
-            },
-            "footer": {
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    {
-                        "type": "text",
-                        "text": f"Expense ID: #{expense.get('expense_number', 0):03d}",
-                        "size": "xxs",
-                        "color": "#bbbbbb",
-                        "align": "center"
-                    }
-                ],
-                "paddingAll": "15px"
-            },
-            "action": {
-                "type": "uri",
-                "label": "action",
-                "uri": f"https://liff.line.me/{LIFF.get_liff_id('FULL')}/expenses/{expense.get('expense_number', 0)}"
-            }
-        }
+        回傳純 bubble 字典，前端需自行包裝成 {type: 'flex', altText: '...', contents: bubble}
+        後端若要使用 FlexMessage，需自行用 FlexMessage(contents=FlexContainer.from_dict(bubble))
+        """
+        return _EXPENSE_SUCCESS_TEMPLATE.render(
+            FlexMessageHelper._expense_success_values(expense, splits, is_edit)
+        )
 
-        return bubble
+    @staticmethod
+    def _expense_deleted_values(expense: Dict) -> Dict:
+        """帳目刪除 bubble 的變動欄位"""
+        return {
+            'description': str(expense.get('description', '未命名')),
+            'amount': f"NT$ {int(expense.get('amount', 0)):,}",
+            'payer_name': str(expense.get('payer_name', '未知')),
+            'date': FlexMessageHelper._format_date(expense.get('created_at'), default='未知日期'),
+            'expense_id': f"Expense ID: #{expense.get('expense_number', 0):03d}",
+            'uri': f"https://liff.line.me/{LIFF.get_liff_id('FULL')}/groups/{expense.get('group_id', '')}"
+        }
 
     @staticmethod
     def create_expense_deleted_message(expense: Dict) -> Dict:
         """建立帳目刪除的 Flex Message bubble"""
-        
-        # 格式化日期
-        date_str = FlexMessageHelper._format_date(expense.get('created_at'), default='未知日期')
-
-        bubble = {
-            "type": "bubble",
-            "size": "giga",
-            "header": {
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    {
-                        "type": "text",
-                        "text": "RECEIPT",
-                        "weight": "bold",
-                        "color": "#ffffff",
-                        "size": "xxs",
-                        "align": "center",
-                        "lineSpacing": "2px"
-                    },
-                    {
-                        "type": "text",
-                        "text": "帳目已刪除",
-                        "weight": "bold",
-                        "color": "#ffffff",
-                        "size": "lg",
-                        "align": "center",
-                        "margin": "sm"
-                    }
-                ],
-                "backgroundColor": FlexMessageHelper.COLOR_DANGER,
-                "paddingAll": "20px"
-            },
-            "body": {
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    # 刪除提示
-                    {
-                        "type": "text",
-                        "text": "以下帳目已被移除",
-                        "size": "sm",
-                        "color": FlexMessageHelper.COLOR_TEXT_SUB,
-                        "align": "center",
-                        "margin": "md"
-                    },
-                    {
-                        "type": "separator",
-                        "margin": "xl"
-                    },
-                    # 詳細資訊
-                    {
-                        "type": "box",
-                        "layout": "vertical",
-                        "margin": "xl",
-                        "spacing": "md",
-                        "contents": [
-                            FlexMessageHelper._create_row("項目", expense.get('description', '未命名')),
-                            FlexMessageHelper._create_row("金額", f"NT$ {int(expense.get('amount', 0)):,}"),
-                            FlexMessageHelper._create_row("付款人", expense.get('payer_name', '未知')),
-                            FlexMessageHelper._create_row("建立日期", date_str),
-                        ]
-                    }
-                ]
-            },
-            "footer": {
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    {
-                        "type": "text",
-                        "text": f"Expense ID: #{expense.get('expense_number', 0):03d}",
-                        "size": "xxs",
-                        "color": "#bbbbbb",
-                        "align": "center"
-                    }
-                ],
-                "paddingAll": "15px"
-            },
-            "action": {
-                "type": "uri",
-                "label": "action",
-                "uri": f"https://liff.line.me/{LIFF.get_liff_id('FULL')}/groups/{expense.get('group_id', '')}"
-            }
-        }
-
-        return bubble
+        return _EXPENSE_DELETED_TEMPLATE.render(FlexMessageHelper._expense_deleted_values(expense))
 
     @staticmethod
-    def create_todo_action_bubble(todo: Dict, action: str) -> Dict:
-        """建立待辦事項操作的 Flex bubble
-
-        action: 'created' | 'updated' | 'deleted'
-        """
+    def _todo_action_values(todo: Dict, action: str) -> Dict:
+        """待辦事項 bubble 的變動欄位"""
         action_titles = {
             'created': '新增待辦',
             'updated': '待辦已更新',
@@ -363,97 +130,29 @@ class FlexMessageHelper:
             'cancelled': '已取消',
         }
 
-        title = todo.get('title', '未命名待辦')
-        assignee_name = todo.get('assignee_name') or '未指派'
-        category = todo.get('category') or '一般'
-        priority = priority_names.get(todo.get('priority', 'medium'), '中')
-        status = status_names.get(todo.get('status', 'pending'), '待處理')
-        due_date = todo.get('due_date') or '未設定'
+        return {
+            'header_title': action_titles.get(action, '待辦更新'),
+            'header_color': action_colors.get(action, FlexMessageHelper.COLOR_PRIMARY),
+            'title': todo.get('title', '未命名待辦'),
+            'assignee_name': str(todo.get('assignee_name') or '未指派'),
+            'category': str(todo.get('category') or '一般'),
+            'priority': priority_names.get(todo.get('priority', 'medium'), '中'),
+            'status': status_names.get(todo.get('status', 'pending'), '待處理'),
+            'due_date': str(todo.get('due_date') or '未設定'),
+            'uri': f"https://liff.line.me/{LIFF.get_liff_id('FULL')}/groups/{todo.get('group_id', '')}?feature=todo"
+        }
 
-        header_title = action_titles.get(action, '待辦更新')
-        header_color = action_colors.get(action, FlexMessageHelper.COLOR_PRIMARY)
+    @staticmethod
+    def create_todo_action_bubble(todo: Dict, action: str) -> Dict:
+        """建立待辦事項操作的 Flex bubble
 
-        bubble = {
-            "type": "bubble",
-            "size": "giga",
-            "header": {
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    {
-                        "type": "text",
-                        "text": "TODO",
-                        "weight": "bold",
-                        "color": "#ffffff",
-                        "size": "xxs",
-                        "align": "center",
-                        "lineSpacing": "2px"
-                    },
-                    {
-                        "type": "text",
-                        "text": header_title,
-                        "weight": "bold",
-                        "color": "#ffffff",
-                        "size": "lg",
-                        "align": "center",
-                        "margin": "sm"
-                    }
-                ],
-                "backgroundColor": header_color,
-                "paddingAll": "20px"
-            },
-            "body": {
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    {
-                        "type": "text",
-                        "text": title,
-                        "size": "lg",
-                        "weight": "bold",
-                        "color": FlexMessageHelper.COLOR_TEXT_MAIN,
-                        "wrap": True
-                    },
-                    {
-                        "type": "box",
-                        "layout": "vertical",
-                        "margin": "xl",
-                        "spacing": "md",
-                        "contents": [
-                            FlexMessageHelper._create_row("負責人", assignee_name),
-                            FlexMessageHelper._create_row("類別", category),
-                            FlexMessageHelper._create_row("優先度", priority),
-                            FlexMessageHelper._create_row("狀態", status),
-                            FlexMessageHelper._create_row("到期日", due_date),
-                        ]
-                    },
-                ]
-            },
-            "footer": {
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    {
-                        "type": "text",
-                        "text": "前往待辦清單",
-                        "size": "xxs",
-                        "color": "#bbbbbb",
-                        "align": "center"
-                    }
-                ],
-                "paddingAll": "12px"
-            },
-            "action": {
-                "type": "uri",
-                "label": "action",
-                "uri": f"https://liff.line.me/{LIFF.get_liff_id('FULL')}/groups/{todo.get('group_id', '')}?feature=todo"
-            }
-        }
+        action: 'created' | 'updated' | 'deleted'
+        """
+        return _TODO_ACTION_TEMPLATE.render(FlexMessageHelper._todo_action_values(todo, action))
 
-        return bubble
     @staticmethod
-    def create_settlement_bubble(balance_summary: Dict, payment_plans: List[Dict]) -> Dict:
-        """建立結算結果的 Flex Message bubble（供前端或後端重用）"""
+    def _settlement_values(balance_summary: Dict, payment_plans: List[Dict]) -> Dict:
+        """結算報告 bubble 的變動欄位"""
         # 分類應收和應付
         creditors = []
         debtors = []
@@ -466,79 +165,6 @@ class FlexMessageHelper:
             elif net_amount < 0:
                 debtors.append((user_name, abs(net_amount)))
 
-        # 建立還款計畫內容
-        payment_contents = []
-        for i, plan in enumerate(payment_plans, 1):
-            payment_contents.append({
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    {
-                        "type": "box",
-                        "layout": "horizontal",
-                        "contents": [
-                            {
-                                "type": "box",
-                                "layout": "vertical",
-                                "contents": [
-                                    {
-                                        "type": "text",
-                                        "text": plan['from_user_name'],
-                                        "size": "sm",
-                                        "color": FlexMessageHelper.COLOR_TEXT_MAIN,
-                                        "align": "center",
-                                        "weight": "bold"
-                                    }
-                                ],
-                                "flex": 3
-                            },
-                            {
-                                "type": "box",
-                                "layout": "vertical",
-                                "contents": [
-                                    {
-                                        "type": "text",
-                                        "text": "➤",
-                                        "size": "xs",
-                                        "color": "#aaaaaa",
-                                        "align": "center"
-                                    },
-                                    {
-                                        "type": "text",
-                                        "text": f"NT$ {int(plan['amount']):,}",
-                                        "size": "xs",
-                                        "color": FlexMessageHelper.COLOR_SUCCESS,
-                                        "align": "center",
-                                        "weight": "bold"
-                                    }
-                                ],
-                                "flex": 2
-                            },
-                            {
-                                "type": "box",
-                                "layout": "vertical",
-                                "contents": [
-                                    {
-                                        "type": "text",
-                                        "text": plan['to_user_name'],
-                                        "size": "sm",
-                                        "color": FlexMessageHelper.COLOR_TEXT_MAIN,
-                                        "align": "center",
-                                        "weight": "bold"
-                                    }
-                                ],
-                                "flex": 3
-                            }
-                        ],
-                        "alignItems": "center"
-                    }
-                ],
-                "backgroundColor": FlexMessageHelper.COLOR_BG_LIGHT,
-                "cornerRadius": "md",
-                "paddingAll": "md",
-                "margin": "sm"
-            })
-
         # 應收列表
         creditor_rows = []
         for name, amount in sorted(creditors, key=lambda x: x[1], reverse=True):
@@ -550,104 +176,444 @@ class FlexMessageHelper:
             debtor_rows.append(FlexMessageHelper._create_mini_row(name, f"-{int(amount):,}", FlexMessageHelper.COLOR_DANGER))
 
         body_contents = []
-        
+
         # 概況區塊
         if creditor_rows or debtor_rows:
             overview_contents = []
             if creditor_rows:
-                overview_contents.append({
-                    "type": "text",
-                    "text": "誰該收錢",
-                    "size": "xs",
-                    "color": FlexMessageHelper.COLOR_TEXT_SUB,
-                    "weight": "bold",
-                    "margin": "md"
-                })
+                overview_contents.append(_CREDITORS_LABEL)
                 overview_contents.extend(creditor_rows)
-            
+
             if debtor_rows:
-                overview_contents.append({
-                    "type": "text",
-                    "text": "誰該付錢",
-                    "size": "xs",
-                    "color": FlexMessageHelper.COLOR_TEXT_SUB,
-                    "weight": "bold",
-                    "margin": "lg"
-                })
+                overview_contents.append(_DEBTORS_LABEL)
                 overview_contents.extend(debtor_rows)
 
-            body_contents.append({
-                "type": "box",
-                "layout": "vertical",
-                "contents": overview_contents,
-                "backgroundColor": "#ffffff",
-                "cornerRadius": "lg",
-                "paddingAll": "md"
-            })
+            body_contents.append(_OVERVIEW_TEMPLATE.render({'contents': overview_contents}))
 
         # 建議轉帳區塊
-        if payment_contents:
-            body_contents.append({
+        if payment_plans:
+            body_contents.append(_PAYMENT_TITLE)
+            for plan in payment_plans:
+                body_contents.append(_PAYMENT_ROW_TEMPLATE.render({
+                    'from_user_name': plan['from_user_name'],
+                    'amount': f"NT$ {int(plan['amount']):,}",
+                    'to_user_name': plan['to_user_name']
+                }))
+            body_contents.append(_PAYMENT_COUNT_TEMPLATE.render({
+                'text': f"共需 {len(payment_plans)} 筆轉帳以結清所有帳目"
+            }))
+        else:
+            body_contents.append(_ALL_SETTLED_TEXT)
+
+        return {'body_contents': body_contents}
+
+    @staticmethod
+    def create_settlement_bubble(balance_summary: Dict, payment_plans: List[Dict]) -> Dict:
+        """建立結算結果的 Flex Message bubble（供前端或後端重用）"""
+        return _SETTLEMENT_TEMPLATE.render(
+            FlexMessageHelper._settlement_values(balance_summary, payment_plans)
+        )
+
+
+# ===== 預先編譯的樣板（import 時建立一次） =====
+
+def _header_skeleton(label: str, title, color) -> Dict:
+    """bubble 標頭：上方小字標籤與標題"""
+    return {
+        "type": "box",
+        "layout": "vertical",
+        "contents": [
+            {
                 "type": "text",
-                "text": "建議轉帳路徑",
-                "size": "sm",
+                "text": label,
                 "weight": "bold",
-                "color": FlexMessageHelper.COLOR_PRIMARY,
-                "margin": "xl"
-            })
-            body_contents.extend(payment_contents)
-            body_contents.append({
+                "color": "#ffffff",
+                "size": "xxs",
+                "align": "center",
+                "lineSpacing": "2px"
+            },
+            {
+                "type": "text",
+                "text": title,
+                "weight": "bold",
+                "color": "#ffffff",
+                "size": "lg",
+                "align": "center",
+                "margin": "sm"
+            }
+        ],
+        "backgroundColor": color,
+        "paddingAll": "20px"
+    }
+
+
+def _row_skeleton(label, value) -> Dict:
+    """詳細資訊的一行"""
+    return {
+        "type": "box",
+        "layout": "baseline",
+        "contents": [
+            {
                 "type": "text",
-                "text": f"共需 {len(payment_plans)} 筆轉帳以結清所有帳目",
+                "text": label,
+                "color": FlexMessageHelper.COLOR_TEXT_SUB,
+                "size": "sm",
+                "flex": 1
+            },
+            {
+                "type": "text",
+                "text": value,
+                "wrap": True,
+                "color": FlexMessageHelper.COLOR_TEXT_MAIN,
+                "size": "sm",
+                "flex": 3
+            }
+        ],
+        "margin": "md"
+    }
+
+
+def _footer_skeleton(text, padding: str) -> Dict:
+    """bubble 底部的小字說明"""
+    return {
+        "type": "box",
+        "layout": "vertical",
+        "contents": [
+            {
+                "type": "text",
+                "text": text,
                 "size": "xxs",
-                "color": "#aaaaaa",
-                "margin": "md",
+                "color": "#bbbbbb",
                 "align": "center"
-            })
-        else:
-             body_contents.append({
+            }
+        ],
+        "paddingAll": padding
+    }
+
+
+def _uri_action_skeleton(uri) -> Dict:
+    return {
+        "type": "uri",
+        "label": "action",
+        "uri": uri
+    }
+
+
+_SEPARATOR = {
+    "type": "separator",
+    "margin": "xl"
+}
+
+_ROW_TEMPLATE = FlexTemplate('row', _row_skeleton(Slot('label'), Slot('value')))
+
+_MINI_ROW_TEMPLATE = FlexTemplate('mini_row', {
+    "type": "box",
+    "layout": "horizontal",
+    "contents": [
+        {
+            "type": "text",
+            "text": Slot('name'),
+            "size": "sm",
+            "color": FlexMessageHelper.COLOR_TEXT_MAIN,
+            "flex": 0
+        },
+        {
+            "type": "text",
+            "text": Slot('amount'),
+            "size": "sm",
+            "color": Slot('color'),
+            "align": "end",
+            "weight": "bold"
+        }
+    ],
+    "margin": "sm"
+})
+
+_SPLIT_ROW_TEMPLATE = FlexTemplate('split_row', {
+    "type": "box",
+    "layout": "horizontal",
+    "contents": [
+        {
+            "type": "text",
+            "text": Slot('user_name'),
+            "size": "sm",
+            "color": FlexMessageHelper.COLOR_TEXT_MAIN,
+            "flex": 0
+        },
+        {
+            "type": "text",
+            "text": Slot('amount'),
+            "size": "sm",
+            "color": FlexMessageHelper.COLOR_TEXT_MAIN,
+            "align": "end"
+        }
+    ],
+    "margin": "sm"
+})
+
+_EXPENSE_SUCCESS_TEMPLATE = FlexTemplate('expense_success', {
+    "type": "bubble",
+    "size": "giga",
+    "header": _header_skeleton("RECEIPT", Slot('header_title'), Slot('header_color')),
+    "body": {
+        "type": "box",
+        "layout": "vertical",
+        "contents": [
+            # 金額顯示
+            {
+                "type": "text",
+                "text": "NT$",
+                "size": "sm",
+                "color": FlexMessageHelper.COLOR_TEXT_SUB,
+                "align": "center"
+            },
+            {
                 "type": "text",
-                "text": "🎉 所有帳目都已經結清囉！",
-                "size": "md",
+                "text": Slot('amount'),
+                "size": "4xl",
+                "weight": "bold",
                 "color": FlexMessageHelper.COLOR_TEXT_MAIN,
+                "align": "center"
+            },
+            _SEPARATOR,
+            # 詳細資訊
+            {
+                "type": "box",
+                "layout": "vertical",
+                "margin": "xl",
+                "spacing": "md",
+                "contents": [
+                    _row_skeleton("項目", Slot('description')),
+                    _row_skeleton("付款人", Slot('payer_name')),
+                    _row_skeleton("分帳方式", Slot('split_type')),
+                    _row_skeleton("日期", Slot('date')),
+                ]
+            },
+            _SEPARATOR,
+            # 分帳明細標題
+            {
+                "type": "text",
+                "text": "分帳明細",
+                "size": "xs",
+                "color": FlexMessageHelper.COLOR_TEXT_SUB,
+                "margin": "xl",
+                "weight": "bold"
+            },
+            # 分帳明細列表
+            {
+                "type": "box",
+                "layout": "vertical",
+                "margin": "md",
+                "contents": Slot('split_rows')
+            }
+        ]
+    },
+    "footer": _footer_skeleton(Slot('expense_id'), "15px"),
+    "action": _uri_action_skeleton(Slot('uri'))
+})
+
+_EXPENSE_DELETED_TEMPLATE = FlexTemplate('expense_deleted', {
+    "type": "bubble",
+    "size": "giga",
+    "header": _header_skeleton("RECEIPT", "帳目已刪除", FlexMessageHelper.COLOR_DANGER),
+    "body": {
+        "type": "box",
+        "layout": "vertical",
+        "contents": [
+            # 刪除提示
+            {
+                "type": "text",
+                "text": "以下帳目已被移除",
+                "size": "sm",
+                "color": FlexMessageHelper.COLOR_TEXT_SUB,
                 "align": "center",
-                "margin": "xl"
-            })
-
-        bubble = {
-            "type": "bubble",
-            "size": "giga",
-            "header": {
+                "margin": "md"
+            },
+            _SEPARATOR,
+            # 詳細資訊
+            {
                 "type": "box",
                 "layout": "vertical",
+                "margin": "xl",
+                "spacing": "md",
                 "contents": [
-                    {
-                        "type": "text",
-                        "text": "SETTLEMENT",
-                        "weight": "bold",
-                        "color": "#ffffff",
-                        "size": "xxs",
-                        "align": "center",
-                        "lineSpacing": "2px"
-                    },
-                    {
-                        "type": "text",
-                        "text": "結算報告",
-                        "weight": "bold",
-                        "color": "#ffffff",
-                        "size": "lg",
-                        "align": "center",
-                        "margin": "sm"
-                    }
-                ],
-                "backgroundColor": FlexMessageHelper.COLOR_PRIMARY,
-                "paddingAll": "20px"
+                    _row_skeleton("項目", Slot('description')),
+                    _row_skeleton("金額", Slot('amount')),
+                    _row_skeleton("付款人", Slot('payer_name')),
+                    _row_skeleton("建立日期", Slot('date')),
+                ]
+            }
+        ]
+    },
+    "footer": _footer_skeleton(Slot('expense_id'), "15px"),
+    "action": _uri_action_skeleton(Slot('uri'))
+})
+
+_TODO_ACTION_TEMPLATE = FlexTemplate('todo_action', {
+    "type": "bubble",
+    "size": "giga",
+    "header": _header_skeleton("TODO", Slot('header_title'), Slot('header_color')),
+    "body": {
+        "type": "box",
+        "layout": "vertical",
+        "contents": [
+            {
+                "type": "text",
+                "text": Slot('title'),
+                "size": "lg",
+                "weight": "bold",
+                "color": FlexMessageHelper.COLOR_TEXT_MAIN,
+                "wrap": True
             },
-            "body": {
+            {
                 "type": "box",
                 "layout": "vertical",
-                "contents": body_contents
+                "margin": "xl",
+                "spacing": "md",
+                "contents": [
+                    _row_skeleton("負責人", Slot('assignee_name')),
+                    _row_skeleton("類別", Slot('category')),
+                    _row_skeleton("優先度", Slot('priority')),
+                    _row_skeleton("狀態", Slot('status')),
+                    _row_skeleton("到期日", Slot('due_date')),
+                ]
+            },
+        ]
+    },
+    "footer": _footer_skeleton("前往待辦清單", "12px"),
+    "action": _uri_action_skeleton(Slot('uri'))
+})
+
+_CREDITORS_LABEL = {
+    "type": "text",
+    "text": "誰該收錢",
+    "size": "xs",
+    "color": FlexMessageHelper.COLOR_TEXT_SUB,
+    "weight": "bold",
+    "margin": "md"
+}
+
+_DEBTORS_LABEL = {
+    "type": "text",
+    "text": "誰該付錢",
+    "size": "xs",
+    "color": FlexMessageHelper.COLOR_TEXT_SUB,
+    "weight": "bold",
+    "margin": "lg"
+}
+
+_OVERVIEW_TEMPLATE = FlexTemplate('settlement_overview', {
+    "type": "box",
+    "layout": "vertical",
+    "contents": Slot('contents'),
+    "backgroundColor": "#ffffff",
+    "cornerRadius": "lg",
+    "paddingAll": "md"
+})
+
+_PAYMENT_TITLE = {
+    "type": "text",
+    "text": "建議轉帳路徑",
+    "size": "sm",
+    "weight": "bold",
+    "color": FlexMessageHelper.COLOR_PRIMARY,
+    "margin": "xl"
+}
+
+
+def _payment_user_skeleton(name) -> Dict:
+    return {
+        "type": "box",
+        "layout": "vertical",
+        "contents": [
+            {
+                "type": "text",
+                "text": name,
+                "size": "sm",
+                "color": FlexMessageHelper.COLOR_TEXT_MAIN,
+                "align": "center",
+                "weight": "bold"
             }
-        }
+        ],
+        "flex": 3
+    }
+
 
-        return bubble
+_PAYMENT_ROW_TEMPLATE = FlexTemplate('payment_row', {
+    "type": "box",
+    "layout": "vertical",
+    "contents": [
+        {
+            "type": "box",
+            "layout": "horizontal",
+            "contents": [
+                _payment_user_skeleton(Slot('from_user_name')),
+                {
+                    "type": "box",
+                    "layout": "vertical",
+                    "contents": [
+                        {
+                            "type": "text",
+                            "text": "➤",
+                            "size": "xs",
+                            "color": "#aaaaaa",
+                            "align": "center"
+                        },
+                        {
+                            "type": "text",
+                            "text": Slot('amount'),
+                            "size": "xs",
+                            "color": FlexMessageHelper.COLOR_SUCCESS,
+                            "align": "center",
+                            "weight": "bold"
+                        }
+                    ],
+                    "flex": 2
+                },
+                _payment_user_skeleton(Slot('to_user_name'))
+            ],
+            "alignItems": "center"
+        }
+    ],
+    "backgroundColor": FlexMessageHelper.COLOR_BG_LIGHT,
+    "cornerRadius": "md",
+    "paddingAll": "md",
+    "margin": "sm"
+})
+
+_PAYMENT_COUNT_TEMPLATE = FlexTemplate('payment_count', {
+    "type": "text",
+    "text": Slot('text'),
+    "size": "xxs",
+    "color": "#aaaaaa",
+    "margin": "md",
+    "align": "center"
+})
+
+_ALL_SETTLED_TEXT = {
+    "type": "text",
+    "text": "🎉 所有帳目都已經結清囉！",
+    "size": "md",
+    "color": FlexMessageHelper.COLOR_TEXT_MAIN,
+    "align": "center",
+    "margin": "xl"
+}
+
+_SETTLEMENT_TEMPLATE = FlexTemplate('settlement', {
+    "type": "bubble",
+    "size": "giga",
+    "header": _header_skeleton("SETTLEMENT", "結算報告", FlexMessageHelper.COLOR_PRIMARY),
+    "body": {
+        "type": "box",
+        "layout": "vertical",
+        "contents": Slot('body_contents')
+    }
+})
+
+# 各 bubble 的欄位計算函式與樣板（benchmarks/flex_benchmark.py 依此逐一量測）
+_BUBBLE_TEMPLATES = {
+    'expense_success': (FlexMessageHelper._expense_success_values, _EXPENSE_SUCCESS_TEMPLATE),
+    'expense_deleted': (FlexMessageHelper._expense_deleted_values, _EXPENSE_DELETED_TEMPLATE),
+    'todo_action': (FlexMessageHelper._todo_action_values, _TODO_ACTION_TEMPLATE),
+    'settlement': (FlexMessageHelper._settlement_values, _SETTLEMENT_TEMPLATE),
+}
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Flex Message 樣板 - 骨架於 import 時建立一次，之後只填入變動的欄位"""
+
+from typing import Any, Callable, Dict, Optional
+
+
+class Slot:
+    """樣板中的變動欄位"""
+
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self):
+        return f"Slot({self.name!r})"
+
+
+class FlexTemplate:
+    """預先編譯的 Flex bubble 樣板
+
+    - render：只複製「通往 Slot 的路徑」上的 dict / list，其餘不含 Slot 的子樹直接共用，
+      因此回傳的 bubble 必須視為唯讀
+    """
+
+    def __init__(self, name: str, skeleton: Dict):
+        self.name = name
+        self.skeleton = skeleton
+        self.slot_names = set()
+        self._build = self._compile(skeleton)
+
+    def _compile(self, node: Any) -> Optional[Callable[[Dict], Any]]:
+        """將骨架編譯成填值函式；不含 Slot 的節點回傳 None（直接共用）"""
+        if isinstance(node, Slot):
+            name = node.name
+            self.slot_names.add(name)
+            return lambda values: values[name]
+
+        if isinstance(node, dict):
+            parts = [(key, self._compile(value), value) for key, value in node.items()]
+            if all(build is None for _, build, _ in parts):
+                return None
+            return lambda values: {
+                key: (build(values) if build is not None else value)
+                for key, build, value in parts
+            }
+
+        if isinstance(node, list):
+            parts = [(self._compile(item), item) for item in node]
+            if all(build is None for build, _ in parts):
+                return None
+            return lambda values: [
+                build(values) if build is not None else item
+                for build, item in parts
+            ]
+
+        return None
+
+    def render(self, values: Dict) -> Dict:
+        """填入變動欄位，回傳 bubble 字典"""
+        missing = self.slot_names.difference(values)
+        if missing:
+            raise KeyError(f"樣板 {self.name} 缺少欄位: {', '.join(sorted(missing))}")
+        if self._build is None:
+            return self.skeleton
+        return self._build(values)
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""Flask JSON 輸出設定 - 直接序列化資料模型"""
+
+from flask.json.provider import DefaultJSONProvider
+from typing import Any
+
+
+class ModelJSONProvider(DefaultJSONProvider):
+    """支援資料模型的 JSON provider
+
+    具有 __slots__ 與 to_dict 的模型（如 Todo）可直接放進 jsonify，
+    序列化時才轉換，不需事先建立整份字典列表
+    """
+
+    @staticmethod
+    def default(o: Any) -> Any:
+        if hasattr(type(o), '__slots__') and hasattr(o, 'to_dict'):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""LINE Messaging API 共用客戶端"""
+
+from linebot.v3.messaging import (
+    Configuration,
+    ApiClient,
+    MessagingApi
+)
+from typing import Dict
+import logging
+import os
+import threading
+import time
+
+from config import Config
+from utils.metrics import record_call
+
+logger = logging.getLogger(__name__)
+
+
+class _TimeoutMessagingApi:
+    """為每次 MessagingApi 呼叫加上預設逾時設定，並統計呼叫次數與耗時"""
+
+    def __init__(self, messaging_api: MessagingApi, manager: 'LineClientManager'):
+        self._api = messaging_api
+        self._manager = manager
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        def _call(*args, **kwargs):
+            kwargs.setdefault('_request_timeout', self._manager.timeout)
+            self._manager._record_call()
+            started = time.perf_counter()
+            error = False
+            try:
+                return attr(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                record_call('line', name, time.perf_counter() - started, error)
+
+        return _call
+
+
+class LineClientManager:
+    """共用、執行緒安全的 LINE API 客戶端
+
+    整個 process 共用同一個 ApiClient（urllib3 連線池），保持 keep-alive 連線，
+    避免每次呼叫都重新建立連線與 TLS 交握。fork 後的子 process 會自動重建連線池。
+    """
+
+    def __init__(self, access_token: str, pool_size: int = 10,
+                 connect_timeout: float = 3, read_timeout: float = 10, host: str = ''):
+        self.access_token = access_token
+        self.host = host
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+
+        self._lock = threading.Lock()
+        self._api_client = None
+        self._messaging_api = None
+        self._pid = None
+        self._calls = 0
+
+    @property
+    def messaging_api(self) -> MessagingApi:
+        """取得共用的 MessagingApi（第一次使用時建立）"""
+        if self._messaging_api is None or self._pid != os.getpid():
+            with self._lock:
+                if self._messaging_api is None or self._pid != os.getpid():
+                    self._create_client()
+        return self._messaging_api
+
+    def _create_client(self):
+        """建立 ApiClient 與連線池"""
+        configuration = Configuration(access_token=self.access_token, host=self.host or None)
+        configuration.connection_pool_maxsize = self.pool_size
+
+        self._api_client = ApiClient(configuration)
+        self._messaging_api = _TimeoutMessagingApi(MessagingApi(self._api_client), self)
+        self._pid = os.getpid()
+        logger.info(f"LINE API 客戶端已建立（pool size: {self.pool_size}）")
+
+    def _record_call(self):
+        with self._lock:
+            self._calls += 1
+
+    def close(self):
+        """關閉連線池"""
+        with self._lock:
+            if self._api_client is not None:
+                self._api_client.close()
+            self._api_client = None
+            self._messaging_api = None
+            self._pid = None
+
+    def stats(self) -> Dict:
+        """取得連線重用統計
+
+        new_connections 為實際建立的連線數，requests 為透過連線池送出的請求數，
+        兩者差距即為重用的連線次數
+        """
+        new_connections = 0
+        requests = 0
+        pools = 0
+
+        api_client = self._api_client
+        if api_client is not None:
+            pool_manager = api_client.rest_client.pool_manager
+            for key in list(pool_manager.pools.keys()):
+                pool = pool_manager.pools.get(key)
+                if pool is None:
+                    continue
+                pools += 1
+                new_connections += pool.num_connections
+                requests += pool.num_requests
+
+        return {
+            'calls': self._calls,
+            'pools': pools,
+            'pool_size': self.pool_size,
+            'new_connections': new_connections,
+            'requests': requests,
+            'reused_connections': max(requests - new_connections, 0),
+            'reuse_ratio': (1 - new_connections / requests) if requests else 0
+        }
+
+
+# 建立全域實例
+line_client = LineClientManager(
+    access_token=Config.CHANNEL_ACCESS_TOKEN,
+    pool_size=Config.LINE_POOL_SIZE,
+    connect_timeout=Config.LINE_CONNECT_TIMEOUT,
+    read_timeout=Config.LINE_READ_TIMEOUT,
+    host=Config.LINE_API_HOST
+)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""日誌設定 - 非阻塞佇列輸出、結構化格式、依路由取樣與大小限制的內容摘錄"""
+
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+
+from config import Config
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional['DroppingQueueHandler'] = None
+_sample_rates: Dict[str, float] = {}
+
+# LogRecord 內建屬性，其餘屬性視為 extra 欄位輸出
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class DroppingQueueHandler(QueueHandler):
+    """佇列已滿時直接丟棄紀錄，確保請求執行緒不會被日誌 I/O 阻塞"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """不在呼叫端格式化訊息：保留 msg / args，由背景執行緒的 handler 格式化（含 PayloadExcerpt 的序列化）
+
+        預設實作會先在呼叫端組好訊息字串以便跨 process 傳遞；此佇列只在同一個 process 內使用，
+        因此直接放入原始紀錄。傳入日誌的參數在輸出前不應再被修改
+        """
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredFormatter(logging.Formatter):
+    """以 JSON 一行一筆輸出日誌，extra 參數會成為額外欄位"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class PayloadExcerpt:
+    """延遲序列化的內容摘錄：只有在日誌真正輸出時才轉成字串，並限制長度"""
+
+    __slots__ = ('payload', 'limit')
+
+    def __init__(self, payload: Any, limit: Optional[int] = None):
+        self.payload = payload
+        self.limit = Config.LOG_PAYLOAD_MAX if limit is None else limit
+
+    def __str__(self) -> str:
+        if isinstance(self.payload, (str, bytes)):
+            text = self.payload.decode('utf-8', 'replace') if isinstance(self.payload, bytes) else self.payload
+        else:
+            text = json.dumps(self.payload, ensure_ascii=False, default=str)
+
+        if len(text) > self.limit:
+            return f"{text[:self.limit]}...(+{len(text) - self.limit} chars)"
+        return text
+
+
+def _parse_sample_rates(value: str) -> Dict[str, float]:
+    """解析取樣設定，例如 'callback=0.01,expense_detail=0.1'"""
+    rates = {}
+    for item in value.split(','):
+        if '=' not in item:
+            continue
+        route, rate = item.split('=', 1)
+        try:
+            rates[route.strip()] = max(0.0, min(float(rate), 1.0))
+        except ValueError:
+            continue
+    return rates
+
+
+def should_sample(route: str) -> bool:
+    """依路由取樣率決定是否記錄（未設定的路由一律記錄）"""
+    rate = _sample_rates.get(route, 1.0)
+    return rate >= 1.0 or (rate > 0 and random.random() < rate)
+
+
+def log_payload(logger: logging.Logger, route: str, message: str, payload: Any,
+                level: int = logging.INFO):
+    """依取樣率記錄請求內容摘錄
+
+    Args:
+        logger: Logger
+        route: 取樣設定使用的路由名稱
+        message: 含一個 %s 的訊息格式
+        payload: 要記錄的內容（字串或可 JSON 序列化的物件）
+        level: 日誌等級
+    """
+    if not logger.isEnabledFor(level) or not should_sample(route):
+        return
+    logger.log(level, message, PayloadExcerpt(payload), extra={'route': route})
+
+
+def setup_logging():
+    """設定根 logger：請求執行緒只將紀錄放入佇列，由背景執行緒負責輸出"""
+    global _listener, _queue_handler, _sample_rates
+
+    if _listener is not None:
+        return
+
+    _sample_rates = _parse_sample_rates(Config.LOG_SAMPLE_RATES)
+
+    if Config.LOG_FORMAT == 'json':
+        formatter = StructuredFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(getattr(logging, Config.LOG_LEVEL))
+
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def _restart_after_fork():
+    """fork 後子 process 沒有背景輸出執行緒（例如 gunicorn --preload 的 worker），重新建立佇列與輸出執行緒"""
+    global _listener
+    if _listener is None:
+        return
+    _listener = None
+    setup_logging()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def shutdown_logging():
+    """停止背景輸出執行緒，並輸出佇列中剩餘的紀錄"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> Dict:
+    """取得日誌佇列統計"""
+    if _queue_handler is None:
+        return {}
+    return {
+        'queue_size': _queue_handler.queue.qsize(),
+        'max_queue_size': Config.LOG_QUEUE_SIZE,
+        'dropped': _queue_handler.dropped,
+        'sample_rates': dict(_sample_rates)
+    }
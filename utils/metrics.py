@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""請求層級的效能量測 - 儲存後端與 LINE API 呼叫次數、延遲，依 Flask endpoint 彙總
+
+- 每個請求以 ContextVar 保存呼叫統計，回應時加上 Server-Timing 標頭
+- 全域統計以 Prometheus 文字格式由 /metrics 輸出
+- 不在請求內的呼叫（背景執行緒、啟動時的工作）歸在 endpoint="background"
+
+多個 worker process 時，每個 process 各自統計，/metrics 只反映回應該請求的 process。
+"""
+
+from bisect import bisect_left
+from concurrent.futures import Executor, Future
+from contextvars import ContextVar, copy_context
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
+from flask import Flask, Response, request
+
+from utils import startup
+
+# 未在請求內的呼叫所使用的 endpoint 標籤
+BACKGROUND_ENDPOINT = 'background'
+
+# 以 collection 為第一個參數的通用 CRUD 方法，統計時以「方法:collection」區分
+COLLECTION_METHODS = frozenset({'create', 'get', 'update', 'delete', 'query', 'count', 'count_many'})
+
+# 請求耗時（秒）的分布區間
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 每個請求對外呼叫次數的分布區間（用於找出 N+1 查詢）
+CALLS_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestStats:
+    """單一請求的對外呼叫統計"""
+
+    __slots__ = ('endpoint', 'started', 'calls', '_lock')
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        # {service: [次數, 秒數]}
+        self.calls: Dict[str, List[float]] = {}
+        # 背景執行緒可能共用同一個請求的統計
+        self._lock = threading.Lock()
+
+    def add(self, service: str, seconds: float):
+        with self._lock:
+            entry = self.calls.setdefault(service, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def server_timing(self, total: float) -> str:
+        """產生 Server-Timing 標頭值（毫秒）"""
+        with self._lock:
+            parts = [
+                f'{service};dur={seconds * 1000:.2f};desc="{service} x{count}"'
+                for service, (count, seconds) in sorted(self.calls.items())
+            ]
+        parts.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(parts)
+
+
+class _Histogram:
+    """累積分布統計（Prometheus histogram）"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((_format_number(bound), total))
+        result.append(('+Inf', self.count))
+        return result
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class MetricsRegistry:
+    """全域統計（執行緒安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # {(endpoint, method, status): 次數}
+            self._requests: Dict[Tuple[str, str, int], int] = {}
+            # {endpoint: 請求耗時分布}
+            self._durations: Dict[str, _Histogram] = {}
+            # {(endpoint, service, operation): [次數, 錯誤數, 秒數]}
+            self._calls: Dict[Tuple[str, str, str], List[float]] = {}
+            # {(endpoint, service): 每個請求的呼叫次數分布}
+            self._calls_per_request: Dict[Tuple[str, str], _Histogram] = {}
+
+    def record_call(self, endpoint: str, service: str, operation: str, seconds: float, error: bool):
+        with self._lock:
+            entry = self._calls.get((endpoint, service, operation))
+            if entry is None:
+                entry = self._calls[(endpoint, service, operation)] = [0, 0, 0.0]
+            entry[0] += 1
+            entry[1] += error
+            entry[2] += seconds
+
+    def record_request(self, stats: RequestStats, method: str, status: int, seconds: float,
+                       services: Tuple[str, ...]):
+        endpoint = stats.endpoint
+        with self._lock:
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+            histogram = self._durations.get(endpoint)
+            if histogram is None:
+                histogram = self._durations[endpoint] = _Histogram(DURATION_BUCKETS)
+            histogram.observe(seconds)
+
+            for service in services:
+                count = stats.calls.get(service, (0, 0.0))[0]
+                histogram = self._calls_per_request.get((endpoint, service))
+                if histogram is None:
+                    histogram = self._calls_per_request[(endpoint, service)] = _Histogram(CALLS_BUCKETS)
+                histogram.observe(count)
+
+    def render(self) -> str:
+        """以 Prometheus 文字格式輸出"""
+        lines = []
+        with self._lock:
+            lines.append('# HELP app_requests_total HTTP 請求數')
+            lines.append('# TYPE app_requests_total counter')
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f'app_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+            lines.append('# HELP app_request_duration_seconds HTTP 請求耗時')
+            lines.append('# TYPE app_request_duration_seconds histogram')
+            for endpoint, histogram in sorted(self._durations.items()):
+                self._render_histogram(lines, 'app_request_duration_seconds', histogram, endpoint=endpoint)
+
+            lines.append('# HELP app_backend_calls_total 儲存後端與 LINE API 呼叫次數')
+            lines.append('# TYPE app_backend_calls_total counter')
+            for (endpoint, service, operation), (count, _, _) in sorted(self._calls.items()):
+                labels = _labels(endpoint=endpoint, service=service, operation=operation)
+                lines.append(f'app_backend_calls_total{labels} {count}')
+
+            lines.append('# HELP app_backend_errors_total 儲存後端與 LINE API 呼叫失敗次數')
+            lines.append('# TYPE app_backend_errors_total counter')
+            for (endpoint, service, operation), (_, errors, _) in sorted(self._calls.items()):
+                labels = _labels(endpoint=endpoint, service=service, operation=operation)
+                lines.append(f'app_backend_errors_total{labels} {errors}')
+
+            lines.append('# HELP app_backend_call_seconds_total 儲存後端與 LINE API 呼叫累計耗時')
+            lines.append('# TYPE app_backend_call_seconds_total counter')
+            for (endpoint, service, operation), (_, _, seconds) in sorted(self._calls.items()):
+                labels = _labels(endpoint=endpoint, service=service, operation=operation)
+                lines.append(f'app_backend_call_seconds_total{labels} {seconds:.6f}')
+
+            lines.append('# HELP app_backend_calls_per_request 每個請求的對外呼叫次數')
+            lines.append('# TYPE app_backend_calls_per_request histogram')
+            for (endpoint, service), histogram in sorted(self._calls_per_request.items()):
+                self._render_histogram(lines, 'app_backend_calls_per_request', histogram,
+                                       endpoint=endpoint, service=service)
+
+        lines.append('# HELP app_startup_seconds 啟動各階段耗時')
+        lines.append('# TYPE app_startup_seconds gauge')
+        for phase, seconds in startup.timings().items():
+            lines.append(f'app_startup_seconds{_labels(phase=phase)} {seconds:.6f}')
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histogram(lines: List[str], name: str, histogram: _Histogram, **labels):
+        for bound, count in histogram.cumulative():
+            lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {count}')
+        lines.append(f'{name}_sum{_labels(**labels)} {histogram.sum:.6f}')
+        lines.append(f'{name}_count{_labels(**labels)} {histogram.count}')
+
+
+registry = MetricsRegistry()
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar('request_stats', default=None)
+
+# 出現過的服務名稱（依序），每個請求都會記錄這些服務的呼叫次數（包含 0 次）
+_services: Tuple[str, ...] = ()
+_services_lock = threading.Lock()
+
+
+def _register_service(service: str):
+    global _services
+    if service not in _services:
+        with _services_lock:
+            if service not in _services:
+                _services = _services + (service,)
+
+
+def record_call(service: str, operation: str, seconds: float, error: bool = False):
+    """記錄一次對外呼叫（儲存後端或 LINE API）"""
+    stats = _current.get()
+    if stats is not None:
+        stats.add(service, seconds)
+    registry.record_call(stats.endpoint if stats is not None else BACKGROUND_ENDPOINT,
+                         service, operation, seconds, error)
+
+
+def timed_call(service: str, operation: str, func: Callable) -> Callable:
+    """包裝函式，每次呼叫時記錄耗時與是否失敗"""
+    _register_service(service)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        error = False
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            error = True
+            raise
+        finally:
+            record_call(service, operation, time.perf_counter() - started, error)
+
+    return wrapper
+
+
+class InstrumentedProxy:
+    """為物件的每個公開方法加上量測（例如儲存後端）
+
+    只量測經由此物件的呼叫；方法內部呼叫自己的其他方法不會重複計算。
+    通用 CRUD 方法以「方法:collection」作為 operation，方便區分各集合的讀寫次數。
+    """
+
+    def __init__(self, target: Any, service: str):
+        self._target = target
+        self._service = service
+        _register_service(service)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        if name in COLLECTION_METHODS:
+            wrapped = self._collection_call(name, attr)
+        else:
+            wrapped = timed_call(self._service, name, attr)
+
+        # 快取包裝後的方法，之後不再經過 __getattr__
+        self.__dict__[name] = wrapped
+        return wrapped
+
+    def _collection_call(self, name: str, func: Callable) -> Callable:
+        service = self._service
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            collection = args[0] if args else kwargs.get('collection', '')
+            started = time.perf_counter()
+            error = False
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                error = True
+                raise
+            finally:
+                record_call(service, f'{name}:{collection}', time.perf_counter() - started, error)
+
+        return wrapper
+
+    def __repr__(self) -> str:
+        return f'InstrumentedProxy({self._target!r})'
+
+
+def submit_in_context(executor: Executor, func: Callable, *args, **kwargs) -> Future:
+    """在執行緒池中執行，並沿用目前請求的統計（呼叫會計入發出請求的 endpoint）"""
+    return executor.submit(copy_context().run, func, *args, **kwargs)
+
+
+def _before_request():
+    _current.set(RequestStats(request.endpoint or 'unknown'))
+
+
+def _after_request(response: Response) -> Response:
+    stats = _current.get()
+    if stats is None:
+        return response
+
+    from config import Config
+
+    elapsed = time.perf_counter() - stats.started
+    if Config.SERVER_TIMING_ENABLED:
+        response.headers['Server-Timing'] = stats.server_timing(elapsed)
+    registry.record_request(stats, request.method, response.status_code, elapsed, _services)
+    return response
+
+
+def _teardown_request(exc: Optional[BaseException]):
+    _current.set(None)
+
+
+def metrics_response() -> Response:
+    """以 Prometheus 文字格式回應目前的統計"""
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_app(app: Flask):
+    """註冊請求量測的 hooks"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""就緒檢查 - 確認儲存後端可連線，供負載平衡器與部署平台判斷是否將流量導入"""
+
+from typing import Dict, Optional, Tuple
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessCheck:
+    """檢查儲存後端連線，結果快取 ttl 秒
+
+    健康檢查通常每幾秒就會呼叫一次，快取結果可避免每次都讀取 Firestore；
+    同時只會有一個執行緒實際檢查，其餘執行緒沿用上一次的結果。
+    """
+
+    def __init__(self, storage, timeout: float = 2, ttl: float = 10):
+        self.storage = storage
+        self.timeout = timeout
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._result: Optional[Tuple[bool, Dict]] = None
+        self._checked_at = 0.0
+
+    def check(self) -> Tuple[bool, Dict]:
+        """回傳 (是否就緒, 檢查結果)"""
+        if self._result is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._result
+
+        with self._lock:
+            if self._result is not None and time.monotonic() - self._checked_at < self.ttl:
+                return self._result
+
+            started = time.perf_counter()
+            try:
+                self.storage.ping(timeout=self.timeout)
+                result = (True, {'storage': 'ok'})
+            except Exception as e:
+                logger.warning(f"就緒檢查失敗: {e}")
+                result = (False, {'storage': 'unavailable'})
+            result[1]['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+            self._result = result
+            self._checked_at = time.monotonic()
+            return result
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""啟動耗時統計
+
+app.py 最先匯入此模組作為計時起點，之後以 mark() 標記各階段（匯入、配置驗證、Blueprint 載入）；
+延遲到第一次使用才發生的工作（如 Firestore 客戶端建立）以 record() 另外記錄。
+"""
+
+from typing import Dict
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_origin = time.perf_counter()
+_last_mark = _origin
+_timings: Dict[str, float] = {}
+_lock = threading.Lock()
+
+# gunicorn 預先載入 app 時，背景工作由 worker 在 fork 後啟動（避免在 master 建立 gRPC 連線）
+_background_tasks_deferred = False
+
+
+def mark(phase: str) -> float:
+    """記錄從上一個標記（或計時起點）到現在的耗時，回傳秒數"""
+    global _last_mark
+    now = time.perf_counter()
+    with _lock:
+        seconds = now - _last_mark
+        _last_mark = now
+        _timings[phase] = seconds
+    return seconds
+
+
+def record(phase: str, seconds: float):
+    """記錄不在啟動流程內的階段耗時（例如延遲初始化的客戶端）"""
+    with _lock:
+        _timings[phase] = seconds
+
+
+def timings() -> Dict[str, float]:
+    """取得各階段耗時（秒）"""
+    with _lock:
+        return dict(_timings)
+
+
+def report() -> str:
+    """以一行文字描述各階段耗時"""
+    parts = [f'{phase}={seconds:.3f}s' for phase, seconds in timings().items()]
+    return '啟動耗時: ' + ', '.join(parts)
+
+
+def defer_background_tasks():
+    """由 fork 後的 worker 啟動背景工作（預熱、續刪群組），app 載入時不啟動"""
+    global _background_tasks_deferred
+    _background_tasks_deferred = True
+
+
+def background_tasks_deferred() -> bool:
+    return _background_tasks_deferred
+
+
+def start_warmup(backend) -> threading.Thread:
+    """在背景執行緒預先建立儲存後端的連線，完成後記錄 storage_warmup 並輸出啟動耗時"""
+    def _run():
+        started = time.perf_counter()
+        try:
+            backend.warm_up()
+        except Exception as e:
+            logger.warning(f"儲存後端預熱失敗: {e}")
+            return
+        record('storage_warmup', time.perf_counter() - started)
+        logger.info(report())
+
+    thread = threading.Thread(target=_run, name='storage-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""時間欄位正規化工具
+
+Firestore 讀出的 DatetimeWithNanoseconds、API 回傳後再送回來的 RFC 2822 字串、
+ISO 字串與 {seconds: ...} 字典，一律轉成標準的 datetime。
+文件讀取時轉換一次，之後的模型建立與 Flex 產生都只需處理 datetime。
+"""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional
+
+# 會被正規化的時間欄位
+TIMESTAMP_FIELDS = ('created_at', 'updated_at', 'completed_at', 'settled_at', 'expire_at')
+
+
+@lru_cache(maxsize=4096)
+def _parse_string(value: str) -> Optional[datetime]:
+    """解析日期字串（結果會被快取）
+
+    以第一個字元判斷格式，不靠例外切換解析方式：
+    數字開頭視為 ISO 格式（如 '2025-12-22T03:52:24Z'），
+    英文字母開頭視為 RFC 2822 格式（如 'Mon, 22 Dec 2025 03:52:24 GMT'）
+    """
+    value = value.strip()
+    if not value:
+        return None
+
+    try:
+        if value[0].isdigit():
+            if value.endswith('Z'):
+                value = value[:-1] + '+00:00'
+            return datetime.fromisoformat(value)
+        return parsedate_to_datetime(value)
+    except (ValueError, TypeError, IndexError):
+        return None
+
+
+def to_datetime(value: Any) -> Optional[datetime]:
+    """將各種時間格式轉換為 datetime，無法辨識時回傳 None"""
+    if value is None:
+        return None
+
+    value_type = type(value)
+    if value_type is datetime:
+        return value
+
+    # Firestore DatetimeWithNanoseconds 等 datetime 子類別，轉成標準 datetime
+    if isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day, value.hour, value.minute,
+                        value.second, value.microsecond, tzinfo=value.tzinfo)
+
+    if value_type is str:
+        return _parse_string(value)
+
+    # Firestore Timestamp 字典
+    if value_type is dict:
+        seconds = value.get('seconds')
+        if seconds is None:
+            return None
+        return datetime.fromtimestamp(seconds + value.get('nanoseconds', 0) / 1e9, tz=timezone.utc)
+
+    if value_type in (int, float):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+
+    # protobuf Timestamp 等提供轉換方法的物件
+    if hasattr(value, 'to_pydatetime'):
+        return to_datetime(value.to_pydatetime())
+    if hasattr(value, 'ToDatetime'):
+        return value.ToDatetime(tzinfo=timezone.utc)
+
+    return None
+
+
+def format_date(value: Any, default: str = '', fmt: str = '%Y-%m-%d') -> str:
+    """格式化日期，無法辨識時回傳 default"""
+    dt = to_datetime(value)
+    if dt is None:
+        return default
+    return dt.strftime(fmt)
+
+
+def normalize_timestamps(data: Dict, fields: Iterable[str] = TIMESTAMP_FIELDS) -> Dict:
+    """將字典中的時間欄位就地轉換為 datetime（無法辨識的值保持原樣）"""
+    for field in fields:
+        value = data.get(field)
+        if value is None or type(value) is datetime:
+            continue
+        dt = to_datetime(value)
+        if dt is not None:
+            data[field] = dt
+    return data